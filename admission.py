@@ -0,0 +1,225 @@
+"""
+Admission control for the browser-heavy endpoints.
+
+Every scrape may start its own Chrome, so a burst of requests can exhaust the
+container's memory. Each endpoint gets a concurrency limit, and all of them
+share a browser capacity derived from available memory. Requests over
+capacity wait in a bounded per-endpoint queue for at most ADMIT_MAX_WAIT_S;
+a full queue is rejected at once with 429, a queue wait that runs out with
+503, both carrying Retry-After. Free memory only limits concurrency: with
+nothing in flight one browser is always admitted, as before admission control.
+
+    ADMIT_LIMIT_TIKTOK=2 ADMIT_LIMIT_YOUTUBE_SCRAPE=2 ADMIT_LIMIT_YOUTUBE_FULL=2
+    ADMIT_MAX_BROWSERS=4           hard cap across endpoints (per process)
+    ADMIT_BROWSER_MB=600           memory one scrape's Chrome is expected to use
+    ADMIT_MEMORY_HEADROOM_MB=512   memory kept free for the app itself
+    ADMIT_INTERACTIVE_RESERVE=1    slots per endpoint (and browsers overall) batch jobs may not take
+
+Limits are per process; with several gunicorn workers the memory check is
+what keeps the container as a whole in bounds.
+"""
+import os
+import math
+import time
+import threading
+from collections import defaultdict
+
+ENDPOINT_LIMITS = {
+    "tiktok": int(os.environ.get("ADMIT_LIMIT_TIKTOK", 2)),
+    "youtube_scrape": int(os.environ.get("ADMIT_LIMIT_YOUTUBE_SCRAPE", 2)),
+    "youtube_full": int(os.environ.get("ADMIT_LIMIT_YOUTUBE_FULL", 2)),
+}
+MAX_BROWSERS = int(os.environ.get("ADMIT_MAX_BROWSERS", 4))
+BROWSER_MB = float(os.environ.get("ADMIT_BROWSER_MB", 600))
+MEMORY_HEADROOM_MB = float(os.environ.get("ADMIT_MEMORY_HEADROOM_MB", 512))
+MAX_QUEUE = int(os.environ.get("ADMIT_MAX_QUEUE", 8))
+MAX_WAIT_S = float(os.environ.get("ADMIT_MAX_WAIT_S", 20))
+# Batch jobs leave this much room for interactive ones, but always get at least one slot
+INTERACTIVE_RESERVE = int(os.environ.get("ADMIT_INTERACTIVE_RESERVE", 1))
+MEMORY_CHECK_INTERVAL_S = 1.0
+# Service time assumed for Retry-After before any request has finished
+DEFAULT_SERVICE_S = 60.0
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+        return None if value == "max" else int(value)
+    except (OSError, ValueError):
+        return None
+
+
+def available_memory_mb():
+    """Free memory for new browsers: MemAvailable, capped by the cgroup (container) limit"""
+    available = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) / 1024
+                    break
+    except OSError:
+        pass
+    limit = _read_int("/sys/fs/cgroup/memory.max") or _read_int("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    usage = _read_int("/sys/fs/cgroup/memory.current") or _read_int("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+    if limit and usage is not None and limit < 1 << 60:
+        cgroup_free = (limit - usage) / 1_048_576
+        available = cgroup_free if available is None else min(available, cgroup_free)
+    return available
+
+
+class AdmissionRejected(Exception):
+    """Request not admitted; ``status`` is 429 (queue full) or 503 (no capacity in time)"""
+
+    def __init__(self, endpoint, status, reason, retry_after):
+        super().__init__(f"{endpoint}: {reason}")
+        self.endpoint = endpoint
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    def __init__(self, endpoint, waited_s):
+        self.endpoint = endpoint
+        self.waited_s = waited_s
+        self.admitted_at = time.monotonic()
+
+
+def _empty_stats():
+    return {"admitted": 0, "rejected": defaultdict(int), "total_wait_s": 0.0, "max_wait_s": 0.0,
+            "completed": 0, "total_service_s": 0.0}
+
+
+class AdmissionController:
+    """Per-endpoint concurrency limits plus a shared, memory-derived browser capacity"""
+
+    def __init__(self, limits=None, max_browsers=MAX_BROWSERS, max_queue=MAX_QUEUE, max_wait_s=MAX_WAIT_S,
+                 memory_probe=available_memory_mb):
+        self.limits = dict(ENDPOINT_LIMITS if limits is None else limits)
+        self.max_browsers = max_browsers
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self._memory_probe = memory_probe
+        self._cond = threading.Condition()
+        self._inflight = defaultdict(int)
+        self._waiting = defaultdict(int)
+        self._stats = defaultdict(_empty_stats)
+        self._memory_slots = None
+        self._memory_checked_at = 0.0
+
+    def _total_inflight(self):
+        return sum(self._inflight.values())
+
+    def _browser_capacity(self):
+        """Browsers that may run at once: in-flight ones plus what free memory allows, capped, never below one"""
+        now = time.monotonic()
+        if now - self._memory_checked_at >= MEMORY_CHECK_INTERVAL_S:
+            free_mb = self._memory_probe()
+            self._memory_slots = None if free_mb is None else max(0, int((free_mb - MEMORY_HEADROOM_MB) // BROWSER_MB))
+            self._memory_checked_at = now
+        inflight = self._total_inflight()
+        if self._memory_slots is None:
+            return self.max_browsers
+        return max(1, min(self.max_browsers, inflight + self._memory_slots))
+
+    def _can_admit(self, endpoint, batch=False):
+        limit, capacity = self.limits.get(endpoint, 1), self._browser_capacity()
+        if batch:
+            limit, capacity = max(1, limit - INTERACTIVE_RESERVE), max(1, capacity - INTERACTIVE_RESERVE)
+        return self._inflight[endpoint] < limit and self._total_inflight() < capacity
+
+    def retry_after(self, endpoint):
+        """Seconds until a slot is likely free: queue ahead of us times average service time per slot"""
+        stats = self._stats[endpoint]
+        service_s = stats["total_service_s"] / stats["completed"] if stats["completed"] else DEFAULT_SERVICE_S
+        slots = max(1, self.limits.get(endpoint, 1))
+        return max(1, math.ceil(service_s * (self._waiting[endpoint] + 1) / slots))
+
+    def _reject(self, endpoint, status, reason):
+        self._stats[endpoint]["rejected"][reason] += 1
+        print(f"[ADMISSION] Rejected {endpoint} ({reason}), inflight={dict(self._inflight)}")
+        return AdmissionRejected(endpoint, status, reason, self.retry_after(endpoint))
+
+    def try_acquire(self, endpoint, max_wait_s=None, batch=False):
+        """Admit a request, waiting in the endpoint queue if needed; raises AdmissionRejected.
+
+        ``batch`` requests are held to the limits minus INTERACTIVE_RESERVE.
+        """
+        max_wait_s = self.max_wait_s if max_wait_s is None else max_wait_s
+        start = time.monotonic()
+        with self._cond:
+            if not self._can_admit(endpoint, batch):
+                if self._waiting[endpoint] >= self.max_queue:
+                    raise self._reject(endpoint, 429, "queue_full")
+                self._waiting[endpoint] += 1
+                try:
+                    while not self._can_admit(endpoint, batch):
+                        remaining = max_wait_s - (time.monotonic() - start)
+                        if remaining <= 0:
+                            raise self._reject(endpoint, 503, "queue_timeout")
+                        self._cond.wait(min(remaining, MEMORY_CHECK_INTERVAL_S))
+                finally:
+                    self._waiting[endpoint] -= 1
+            waited = time.monotonic() - start
+            self._inflight[endpoint] += 1
+            stats = self._stats[endpoint]
+            stats["admitted"] += 1
+            stats["total_wait_s"] += waited
+            stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+        return Ticket(endpoint, waited)
+
+    def release(self, ticket):
+        with self._cond:
+            self._inflight[ticket.endpoint] -= 1
+            stats = self._stats[ticket.endpoint]
+            stats["completed"] += 1
+            stats["total_service_s"] += time.monotonic() - ticket.admitted_at
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            endpoints = {}
+            for endpoint in sorted(set(self.limits) | set(self._stats)):
+                stats = self._stats[endpoint]
+                admitted = stats["admitted"]
+                endpoints[endpoint] = {
+                    "limit": self.limits.get(endpoint, 1),
+                    "batch_limit": max(1, self.limits.get(endpoint, 1) - INTERACTIVE_RESERVE),
+                    "inflight": self._inflight[endpoint],
+                    "waiting": self._waiting[endpoint],
+                    "admitted": admitted,
+                    "rejected": dict(stats["rejected"]),
+                    "avg_wait_s": round(stats["total_wait_s"] / admitted, 3) if admitted else 0.0,
+                    "max_wait_s": round(stats["max_wait_s"], 3),
+                    "avg_service_s": round(stats["total_service_s"] / stats["completed"], 2) if stats["completed"] else None,
+                }
+            return {
+                "browser_capacity": self._browser_capacity(),
+                "max_browsers": self.max_browsers,
+                "memory_slots": self._memory_slots,
+                "inflight": self._total_inflight(),
+                "max_queue": self.max_queue,
+                "max_wait_s": self.max_wait_s,
+                "endpoints": endpoints,
+            }
+
+    def reset(self):
+        with self._cond:
+            self._stats.clear()
+
+
+ADMISSION = AdmissionController()
+
+
+def try_acquire(endpoint, max_wait_s=None, batch=False):
+    return ADMISSION.try_acquire(endpoint, max_wait_s, batch)
+
+
+def release(ticket):
+    ADMISSION.release(ticket)
+
+
+def get_admission_stats():
+    return ADMISSION.snapshot()
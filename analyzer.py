@@ -11,11 +11,16 @@ import pandas as pd
 
 # DeepSeek API Integration
 from openai import OpenAI
+from llm_metrics import tracked_completion, record_fallback, creator_scope
+import storage
+from deadline import unlimited
+
+# Initialize DeepSeek client (DEEPSEEK_BASE_URL can point at mock_llm_server.py)
+DEEPSEEK_BASE_URL = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 
-# Initialize DeepSeek client
 client = OpenAI(
-    api_key="sk-90b8397488ed4726a77af9f4b0da34f4",
-    base_url="https://api.deepseek.com"
+    api_key=os.environ.get("DEEPSEEK_API_KEY", "sk-90b8397488ed4726a77af9f4b0da34f4"),
+    base_url=DEEPSEEK_BASE_URL
 )
 
 def _num(x):
@@ -61,17 +66,53 @@ def _is_geo_kw(phrase: str) -> bool:
 
 HASHTAG_RE = re.compile(r"#(\w{2,40})")
 
+# Bump these whenever the prompt text changes so metrics stay comparable
+TOPICS_PROMPT_VERSION = "tiktok-topics-v1"
+IDEAS_PROMPT_VERSION = "tiktok-ideas-v1"
+
+# Budget each stage needs for its normal path. Earlier stages also keep IDEAS_MIN_S
+# back, so a slow topic pass degrades itself rather than the ideas.
+TOPICS_BATCH_MIN_S = float(os.environ.get("TIKTOK_TOPICS_BATCH_MIN_S", 12))
+TRENDING_MIN_S = float(os.environ.get("TIKTOK_TRENDING_MIN_S", 6))
+IDEAS_MIN_S = float(os.environ.get("TIKTOK_IDEAS_MIN_S", 15))
+LLM_TIMEOUT_S = 60
+# Without a fresh scrape only the most recently seen stored videos are analyzed, so LLM cost stays flat
+STORED_ANALYSIS_MAX_VIDEOS = int(os.environ.get("TIKTOK_STORED_ANALYSIS_MAX_VIDEOS", 60))
+
+def _llm_client(deadline):
+    """DeepSeek client whose timeout (and retries) fit the remaining budget"""
+    if deadline.budget_s is None:
+        return client
+    timeout = deadline.timeout(LLM_TIMEOUT_S)
+    retries = client.max_retries if deadline.remaining() >= 2 * timeout else 0
+    return client.with_options(timeout=timeout, max_retries=retries)
+
+def _local_topics_keywords(desc: str) -> dict:
+    """Topic row built from the description alone, for when there is no budget for DeepSeek"""
+    native_tags = HASHTAG_RE.findall(desc)
+    words = [w for w in re.findall(r"[a-z]{4,}", desc.lower()) if w not in STOP_WORDS and not _is_geo_kw(w)]
+    keywords = list(dict.fromkeys([t.lower() for t in native_tags] + [w for w, _ in Counter(words).most_common(5)]))
+    return {
+        "description": desc,
+        "topics": ["general"],
+        "keywords": keywords[:6] or ["content"],
+        "hashtags": native_tags
+    }
+
 def extract_topics_keywords(
     descriptions: list[str],
     max_per_req: int = 6,  # Reduced batch size for better reliability
     sleep_s: float = 1.5,  # Increased delay
-    trim_chars: int = 250   # Shorter descriptions to avoid token limits
+    trim_chars: int = 250,  # Shorter descriptions to avoid token limits
+    deadline=None
 ) -> pd.DataFrame:
     """
     • Calls DeepSeek for topics & keywords.
     • Extracts native hashtags from each description.
     • Cleans geo / long / dup keywords.
+    • Out of budget: remaining descriptions get local keywords instead.
     """
+    deadline = deadline or unlimited()
     out_rows, to_do = [], descriptions.copy()
     print(f"[TIKTOK ANALYZER] Processing {len(descriptions)} descriptions...")
 
@@ -85,6 +126,10 @@ def extract_topics_keywords(
 
     batch_count = 0
     while to_do:
+        if not deadline.has(TOPICS_BATCH_MIN_S + IDEAS_MIN_S):
+            deadline.degrade("topics", f"local keywords for {len(to_do)} of {len(descriptions)} descriptions")
+            out_rows.extend(_local_topics_keywords(desc) for desc in to_do)
+            break
         batch, to_do = to_do[:max_per_req], to_do[max_per_req:]
         batch_count += 1
         
@@ -100,7 +145,8 @@ def extract_topics_keywords(
         print(f"[TIKTOK ANALYZER] Processing batch {batch_count} ({len(batch)} items)...")
 
         try:
-            resp = client.chat.completions.create(
+            resp = tracked_completion(
+                _llm_client(deadline), "tiktok.topics", TOPICS_PROMPT_VERSION,
                 model="deepseek-chat",
                 temperature=0.3,  # Lower temperature for more consistent output
                 max_tokens=1500,  # Limit response length
@@ -149,6 +195,7 @@ def extract_topics_keywords(
             remaining_count = len(batch) - len(parsed_objs)
             if remaining_count > 0:
                 print(f"[TIKTOK ANALYZER] Using fallback for {remaining_count} items")
+                record_fallback("tiktok.topics")
                 for i in range(len(parsed_objs), len(batch)):
                     desc = batch[i]
                     native_tags = HASHTAG_RE.findall(desc)
@@ -159,10 +206,11 @@ def extract_topics_keywords(
                         "hashtags": native_tags
                     })
 
-            time.sleep(sleep_s)
+            time.sleep(min(sleep_s, deadline.remaining()))
 
         except Exception as e:
             print(f"[TIKTOK ANALYZER] DeepSeek API error: {e}")
+            record_fallback("tiktok.topics")
             # Fallback for failed batch
             for desc in batch:
                 native_tags = HASHTAG_RE.findall(desc)
@@ -176,26 +224,33 @@ def extract_topics_keywords(
     print(f"[TIKTOK ANALYZER] Completed topic extraction: {len(out_rows)} total items")
     return pd.DataFrame(out_rows)
 
-def get_trending_keywords(seed_kw, max_total=5):
-    """Get trending keywords from autocomplete APIs"""
+def get_trending_keywords(seed_kw, max_total=5, deadline=None):
+    """Get trending keywords from autocomplete APIs (skipped when out of budget)"""
+    deadline = deadline or unlimited()
     trending = []
+    if not deadline.has(TRENDING_MIN_S + IDEAS_MIN_S):
+        deadline.degrade("trending", "skipped autocomplete lookups")
+        return trending
     print(f"[TIKTOK ANALYZER] Getting trending keywords for: {seed_kw}")
     
     for kw in seed_kw[:3]:  # Limit to avoid too many requests
         if not kw or len(kw) < 3:  # Skip very short keywords
             continue
+        if not deadline.has(TRENDING_MIN_S + IDEAS_MIN_S):
+            deadline.degrade("trending", f"stopped before '{kw}'")
+            break
             
         print(f"[TIKTOK ANALYZER] 🔍 Autocomplete for: '{kw}'")
         try:
             # Google suggestions
             url = "https://suggestqueries.google.com/complete/search"
             params = {"client": "firefox", "q": kw}
-            response = requests.get(url, params=params, timeout=4)
+            response = requests.get(url, params=params, timeout=deadline.timeout(4))
             google_suggestions = response.json()[1] if response.status_code == 200 else []
             
             # YouTube suggestions
             params = {"client": "firefox", "ds": "yt", "q": kw}
-            response = requests.get(url, params=params, timeout=4)
+            response = requests.get(url, params=params, timeout=deadline.timeout(4))
             youtube_suggestions = response.json()[1] if response.status_code == 200 else []
             
             all_suggestions = google_suggestions + youtube_suggestions
@@ -298,8 +353,26 @@ def distill_core_keywords(analysis_df: pd.DataFrame, n_core: int = 5, min_video_
     print(f"[TIKTOK ANALYZER] Core keywords: {top_tokens}")
     return top_tokens
 
-def generate_video_ideas(topics: list[str], trending_kw: list[str], n_ideas: int = 10) -> pd.DataFrame:
-    """Generate video ideas using DeepSeek API"""
+def _fallback_ideas(topics: list[str], trending_kw: list[str], n_ideas: int) -> pd.DataFrame:
+    """Template ideas used when DeepSeek fails or there is no budget left for it"""
+    fallback_ideas = []
+    for i in range(min(n_ideas, 5)):
+        topic = topics[i % len(topics)] if topics else "content"
+        trending_term = trending_kw[i % len(trending_kw)] if trending_kw else "viral"
+        
+        fallback_ideas.append({
+            "hook": f"Why {topic} creators are doing this now",
+            "content": f"Film yourself exploring {topic} trends with {trending_term} approach",
+            "cta": "Tell me your thoughts in the comments",
+            "hashtags": ["fyp", "trending", topic.lower().replace(" ", ""), "viral"]
+        })
+    
+    print(f"[TIKTOK ANALYZER] Using {len(fallback_ideas)} fallback ideas")
+    return pd.DataFrame(fallback_ideas)
+
+def generate_video_ideas(topics: list[str], trending_kw: list[str], n_ideas: int = 10, deadline=None) -> pd.DataFrame:
+    """Generate video ideas using DeepSeek API (fallback ideas when out of budget)"""
+    deadline = deadline or unlimited()
     print(f"[TIKTOK ANALYZER] Generating {n_ideas} video ideas...")
     print(f"[TIKTOK ANALYZER] Topics: {topics}")
     print(f"[TIKTOK ANALYZER] Trending: {trending_kw}")
@@ -309,6 +382,10 @@ def generate_video_ideas(topics: list[str], trending_kw: list[str], n_ideas: int
     if not trending_kw:
         trending_kw = ["viral", "fyp", "trending"]
     
+    if not deadline.has(IDEAS_MIN_S):
+        deadline.degrade("ideas", "fallback ideas instead of DeepSeek")
+        return _fallback_ideas(topics, trending_kw, n_ideas)
+    
     prompt = f"""Generate {n_ideas} TikTok video ideas in JSON format. Each line should be a separate JSON object.
 
 Channel focuses on: {', '.join(topics[:3])}
@@ -326,7 +403,8 @@ Example format:
 Generate {n_ideas} unique ideas now:"""
 
     try:
-        response = client.chat.completions.create(
+        response = tracked_completion(
+            _llm_client(deadline), "tiktok.ideas", IDEAS_PROMPT_VERSION,
             model="deepseek-chat",
             temperature=0.7,
             max_tokens=2000,
@@ -367,6 +445,8 @@ Generate {n_ideas} unique ideas now:"""
         print(f"[TIKTOK ANALYZER] Successfully generated {len(ideas)} ideas")
         
         # Fill remaining spots with fallback ideas if needed
+        if len(ideas) < min(n_ideas, 5):
+            record_fallback("tiktok.ideas")
         while len(ideas) < min(n_ideas, 5):
             topic = topics[len(ideas) % len(topics)] if topics else "trending"
             trending_term = trending_kw[len(ideas) % len(trending_kw)] if trending_kw else "viral"
@@ -384,22 +464,10 @@ Generate {n_ideas} unique ideas now:"""
 
     except Exception as e:
         print(f"[TIKTOK ANALYZER] Video ideas generation error: {e}")
+        record_fallback("tiktok.ideas")
         
         # Return meaningful fallback ideas
-        fallback_ideas = []
-        for i in range(min(n_ideas, 5)):
-            topic = topics[i % len(topics)] if topics else "content"
-            trending_term = trending_kw[i % len(trending_kw)] if trending_kw else "viral"
-            
-            fallback_ideas.append({
-                "hook": f"Why {topic} creators are doing this now",
-                "content": f"Film yourself exploring {topic} trends with {trending_term} approach",
-                "cta": "Tell me your thoughts in the comments",
-                "hashtags": ["fyp", "trending", topic.lower().replace(" ", ""), "viral"]
-            })
-        
-        print(f"[TIKTOK ANALYZER] Using {len(fallback_ideas)} fallback ideas")
-        return pd.DataFrame(fallback_ideas)
+        return _fallback_ideas(topics, trending_kw, n_ideas)
 
 def calculate_engagement_metrics(df: pd.DataFrame) -> dict:
     """Calculate engagement metrics from video data"""
@@ -467,21 +535,29 @@ def generate_recommendations(metrics: dict, analysis_df: pd.DataFrame) -> list[s
     
     return recommendations[:6]  # Return up to 6 recommendations
 
-def run_analysis(username: str) -> dict:
-    """Main analysis function called by Flask app"""
+def run_analysis(username: str, videos: pd.DataFrame = None, deadline=None) -> dict:
+    """Main analysis function called by Flask app.
+
+    Pass the DataFrame returned by scrape_tiktok as ``videos`` to skip the
+    creator store; otherwise the stored videos for the username are used.
+    Stages degrade as ``deadline`` runs out; the result lists which did.
+    """
+    deadline = deadline or unlimited()
+    with creator_scope(f"tiktok:{username}"):
+        result = _run_analysis(username, videos, deadline)
+    result["degraded"] = deadline.degraded
+    return result
+
+def _run_analysis(username: str, videos: pd.DataFrame = None, deadline=None) -> dict:
     try:
         print(f"[TIKTOK ANALYZER] Starting comprehensive analysis for @{username}")
         
-        # Load CSV file created by scraper
-        csv_filename = f"{username}_tiktok_videos.csv"
-        
-        if not os.path.exists(csv_filename):
-            return {"error": f"CSV file {csv_filename} not found. Run scraper first."}
-        
-        df = pd.read_csv(csv_filename)
+        # Use the scraper's rows when handed over, else load stored videos
+        df = videos if videos is not None else storage.load_videos("tiktok", username,
+                                                                   limit=STORED_ANALYSIS_MAX_VIDEOS)
         
         if df.empty:
-            return {"error": "No video data found in CSV file."}
+            return {"error": f"No stored videos for @{username}. Run scraper first."}
         
         print(f"[TIKTOK ANALYZER] Loaded {len(df)} videos for analysis")
         
@@ -491,14 +567,14 @@ def run_analysis(username: str) -> dict:
             return {"error": "No valid descriptions found in video data."}
         
         print("[TIKTOK ANALYZER] 🤖 Extracting topics and keywords with DeepSeek AI...")
-        analysis_df = extract_topics_keywords(descriptions)
+        analysis_df = extract_topics_keywords(descriptions, deadline=deadline)
         
         # Get core keywords and trending terms
         print("[TIKTOK ANALYZER] 🔍 Distilling core keywords...")
         core_kw = distill_core_keywords(analysis_df, n_core=5)
         
         print("[TIKTOK ANALYZER] 📈 Fetching trending keywords...")
-        trending_kw = get_trending_keywords(core_kw, max_total=5)
+        trending_kw = get_trending_keywords(core_kw, max_total=5, deadline=deadline)
         
         # Calculate metrics
         print("[TIKTOK ANALYZER] 📊 Calculating engagement metrics...")
@@ -522,7 +598,7 @@ def run_analysis(username: str) -> dict:
             top_topics = ["lifestyle", "entertainment", "trending"]
             
         print(f"[TIKTOK ANALYZER] Top topics for content generation: {top_topics}")
-        ideas_df = generate_video_ideas(top_topics, trending_kw, n_ideas=8)
+        ideas_df = generate_video_ideas(top_topics, trending_kw, n_ideas=8, deadline=deadline)
         
         # Find top and bottom performing clips
         df_sorted = df.copy()
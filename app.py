@@ -1,7 +1,12 @@
 import os
+import json
 import logging
 import traceback
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory
+from deadline import Deadline, TIKTOK_REQUEST_BUDGET_S, YOUTUBE_REQUEST_BUDGET_S
+import admission
+import scheduler
+import jobs
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -41,6 +46,34 @@ def index():
     <p>API is running correctly!</p>
     """
 
+def _tenant():
+    """API client the job is accounted to: the caller's address, or X-Tenant-Id from a trusted gateway"""
+    tenant = request.headers.get("X-Tenant-Id", "").strip() if scheduler.TRUST_CLIENT_HEADERS else ""
+    return tenant or request.remote_addr or "anonymous"
+
+def _priority():
+    """X-Priority from a trusted gateway; otherwise every single-creator request is interactive"""
+    if not scheduler.TRUST_CLIENT_HEADERS:
+        return "interactive"
+    priority = request.headers.get("X-Priority", "interactive").strip().lower()
+    return priority if priority in scheduler.PRIORITIES else "interactive"
+
+def _run_scheduled(kind, fn, *args, **kwargs):
+    """Queue a job for this request's tenant and wait for its payload (queue time is bounded)"""
+    try:
+        future = scheduler.submit(_tenant(), _priority(), kind, fn, *args, **kwargs)
+        payload = scheduler.wait(future, kind)
+    except (scheduler.JobRejected, admission.AdmissionRejected) as e:
+        logger.warning(f"Rejected {kind} for tenant {_tenant()}: {e.reason}")
+        quota = isinstance(e, scheduler.JobRejected) and e.status == 429
+        cause = "Job quota reached" if quota else "Server is at scraping capacity"
+        return jsonify({
+            "status": "error",
+            "message": f"{cause} ({e.reason}). Retry in {e.retry_after}s.",
+            "retry_after": e.retry_after
+        }), e.status, {"Retry-After": str(e.retry_after)}
+    return jsonify(payload)
+
 @app.route("/scrape", methods=["POST"])
 @app.route("/api/tiktok/analyze", methods=["POST"])
 def scrape():
@@ -50,8 +83,10 @@ def scrape():
         if request.is_json:
             data = request.get_json()
             username = data.get("username", "").strip().lstrip("@")
+            full_scrape = str(data.get("full_scrape", "false")).lower() == "true"
         else:
             username = request.form.get("username", "").strip().lstrip("@")
+            full_scrape = request.form.get("full_scrape", "false").lower() == "true"
         
         if not username:
             return jsonify({
@@ -59,66 +94,9 @@ def scrape():
                 "message": "Username cannot be empty."
             })
 
-        logger.info(f"Starting TikTok scrape for username: {username}")
-
-        # Import here to avoid import errors on startup
-        try:
-            from scraper import scrape_tiktok
-            from analyzer import run_analysis
-        except ImportError as e:
-            logger.error(f"Import error: {e}")
-            return jsonify({
-                "status": "error",
-                "message": f"Missing dependencies: {str(e)}. Please install: pip install -r requirements.txt"
-            })
-
-        # Run scraper
-        logger.info("Running TikTok scraper...")
-        profile_stats = scrape_tiktok(username)
-        
-        if "error" in profile_stats:
-            return jsonify({
-                "status": "error", 
-                "message": profile_stats["error"]
-            })
-
-        # Run analysis
-        logger.info("Running TikTok analysis...")
-        analysis = run_analysis(username)
-        
-        if "error" in analysis:
-            return jsonify({
-                "status": "error", 
-                "message": analysis["error"]
-            })
-
-        # Prepare successful response with proper structure
-        response_data = {
-            "status": "success",
-            "message": f"TikTok data for @{username} analyzed successfully!",
-            "stats": {
-                "username": username,
-                "name": profile_stats.get("name", "N/A"),
-                "followers": profile_stats.get("followers", "N/A"),
-                "following": profile_stats.get("following", "N/A"),
-                "total_likes": profile_stats.get("total_likes", "N/A"),
-                "engagement": profile_stats.get("engagement_rate", "N/A"),
-            },
-            "metrics": {
-                "avg_engagement": analysis.get("average_engagement_rate", 0),
-                "mean_views": analysis.get("mean_views", 0),
-                "num_videos": analysis.get("num_videos", 0),
-            },
-            "recommendations": analysis.get("recommendations", []),
-            "content_plan": analysis.get("plan", []),
-            "top_clips": analysis.get("top_clips", []),
-            "bottom_clips": analysis.get("bottom_clips", []),
-            "core_keywords": analysis.get("core_keywords", []),
-            "trending_keywords": analysis.get("trending_keywords", [])
-        }
-
-        logger.info("TikTok analysis completed successfully")
-        return jsonify(response_data)
+        # One time budget for queueing + scrape + analysis; stages degrade instead of overrunning it
+        deadline = Deadline(TIKTOK_REQUEST_BUDGET_S)
+        return _run_scheduled("tiktok", jobs.analyze_tiktok, username, full_scrape=full_scrape, deadline=deadline)
 
     except Exception as e:
         logger.error(f"TikTok scrape endpoint error: {str(e)}")
@@ -145,63 +123,8 @@ def scrape_youtube():
                 "message": "Channel ID cannot be empty."
             })
 
-        logger.info(f"Starting YouTube scrape for channel: {channel_id}")
-
-        # Import here to avoid import errors on startup
-        try:
-            import importlib.util
-            spec = importlib.util.spec_from_file_location("scraper_yt", "scraper_yt.py")
-            scraper_yt = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(scraper_yt)
-            get_youtube_channel_stats = scraper_yt.get_youtube_channel_stats
-        except ImportError as e:
-            logger.error(f"Import error: {e}")
-            return jsonify({
-                "status": "error",
-                "message": f"Missing YouTube scraper dependencies: {str(e)}"
-            })
-
-        # Run YouTube scraper
-        logger.info("Running YouTube scraper...")
-        try:
-            result = get_youtube_channel_stats(channel_id)
-            
-            if result and "error" in result:
-                return jsonify({
-                    "status": "error", 
-                    "message": result["error"]
-                })
-
-            # Check if CSV was created
-            csv_filename = f"{channel_id}_youtube_videos.csv"
-            if os.path.exists(csv_filename):
-                # Count videos in CSV
-                import pandas as pd
-                df = pd.read_csv(csv_filename)
-                video_count = len(df)
-                
-                response_data = {
-                    "status": "success",
-                    "message": f"YouTube channel @{channel_id} scraped successfully!",
-                    "channel_id": channel_id,
-                    "video_count": video_count,
-                    "csv_file": csv_filename
-                }
-            else:
-                response_data = {
-                    "status": "error",
-                    "message": "Scraping completed but CSV file was not created."
-                }
-
-            logger.info("YouTube scraping completed successfully")
-            return jsonify(response_data)
-            
-        except Exception as scrape_error:
-            logger.error(f"YouTube scraping failed: {str(scrape_error)}")
-            return jsonify({
-                "status": "error",
-                "message": f"YouTube scraping failed: {str(scrape_error)}"
-            })
+        deadline = Deadline(YOUTUBE_REQUEST_BUDGET_S)
+        return _run_scheduled("youtube_scrape", jobs.scrape_youtube, channel_id, deadline=deadline)
 
     except Exception as e:
         logger.error(f"YouTube scrape endpoint error: {str(e)}")
@@ -240,7 +163,7 @@ def analyze_youtube():
 
         # Import YouTube analyzer
         try:
-            from youtubeanalyzer import run_youtube_analysis
+            from youtubeanalyzer import run_youtube_analysis, channel_id_from_csv
         except ImportError as e:
             logger.error(f"YouTube analyzer import error: {e}")
             return jsonify({
@@ -255,7 +178,10 @@ def analyze_youtube():
         try:
             # Run YouTube analysis
             logger.info("Running YouTube analysis...")
-            analysis_result = run_youtube_analysis(temp_csv_path)
+            mode = request.form.get("mode", "multi").strip() or "multi"
+            # Taken from the uploaded name: the temp_ prefix would otherwise end up in the id
+            channel_id = channel_id_from_csv(file.filename)
+            analysis_result = run_youtube_analysis(temp_csv_path, mode=mode, channel_id=channel_id)
             
             if "error" in analysis_result:
                 return jsonify({
@@ -269,7 +195,9 @@ def analyze_youtube():
                 "signature": analysis_result.get("signature", {}),
                 "video_ideas": analysis_result.get("video_ideas", []),
                 "growth_tips": analysis_result.get("growth_tips", []),
-                "video_count": analysis_result.get("video_count", 0)
+                "video_count": analysis_result.get("video_count", 0),
+                "mode": analysis_result.get("mode", mode),
+                "repaired_sections": analysis_result.get("repaired_sections", [])
             }
 
             logger.info("YouTube analysis completed successfully")
@@ -295,45 +223,154 @@ def full_youtube_analysis():
         if request.is_json:
             data = request.get_json()
             channel_id = data.get("channel_id", "").strip().replace('@', '')
+            mode = data.get("mode", "multi")
         else:
             channel_id = request.form.get("channel_id", "").strip().replace('@', '')
+            mode = request.form.get("mode", "multi")
         
         if not channel_id:
             return jsonify({"status": "error", "message": "Channel ID cannot be empty."})
 
-        logger.info(f"Starting full YouTube analysis for channel: {channel_id}")
-
-        # Import and run the complete workflow
-        try:
-            import importlib.util
-            spec = importlib.util.spec_from_file_location("scraper_yt", "scraper_yt.py")
-            scraper_yt = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(scraper_yt)
-            
-            result = scraper_yt.scrape_and_analyze(channel_id)
-            
-            if "error" in result:
-                return jsonify({"status": "error", "message": result["error"]})
-            
-            logger.info("Full YouTube analysis completed successfully")
-            return jsonify(result)
-            
-        except Exception as e:
-            logger.error(f"Analysis error: {str(e)}")
-            logger.error(traceback.format_exc())
-            return jsonify({"status": "error", "message": f"Analysis failed: {str(e)}"})
+        deadline = Deadline(YOUTUBE_REQUEST_BUDGET_S)
+        return _run_scheduled("youtube_full", jobs.analyze_youtube_full, channel_id, mode=mode, deadline=deadline)
 
     except Exception as e:
         logger.error(f"Endpoint error: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"})
 
+@app.route("/api/batch/analyze", methods=["POST"])
+def batch_analysis():
+    """Analyze a list of TikTok usernames and/or YouTube channels, streaming one NDJSON line per creator"""
+    data = request.get_json(silent=True) or {}
+    tiktok, youtube = data.get("tiktok") or [], data.get("youtube") or []
+    if not isinstance(tiktok, list) or not isinstance(youtube, list):
+        return jsonify({"status": "error", "message": "'tiktok' and 'youtube' must be lists."}), 400
+    items = jobs.batch_items(tiktok, youtube)
+    if not items:
+        return jsonify({"status": "error", "message": "Provide at least one TikTok username or YouTube channel."}), 400
+    if len(items) > jobs.BATCH_MAX_ITEMS:
+        return jsonify({"status": "error",
+                        "message": f"At most {jobs.BATCH_MAX_ITEMS} creators per batch (got {len(items)})."}), 400
+
+    full_scrape = str(data.get("full_scrape", "false")).lower() == "true"
+    results = jobs.run_batch(_tenant(), items, full_scrape=full_scrape, mode=data.get("mode", "multi"))
+    lines = (json.dumps(record, default=str) + "\n" for record in results)
+    return Response(lines, mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
 @app.route("/health", methods=["GET"])
 @app.route("/api/status", methods=["GET"])
 def health():
     """Health check endpoint"""
     return jsonify({"status": "healthy", "message": "Social Media Analytics Hub is running"})
 
+@app.route("/api/metrics/llm", methods=["GET"])
+def llm_metrics():
+    """Token, latency and cost aggregates for every LLM call, per endpoint and per creator"""
+    from llm_metrics import get_llm_metrics
+
+    recent = request.args.get("recent", 20, type=int)
+    return jsonify({"status": "success", "metrics": get_llm_metrics(recent=recent)})
+
+@app.route("/api/metrics/network", methods=["GET"])
+def network_metrics():
+    """Bytes, requests, blocked requests and load time per scraped page, by platform and resource type"""
+    from browser import get_network_metrics, blocked_url_patterns
+
+    recent = request.args.get("recent", 20, type=int)
+    return jsonify({
+        "status": "success",
+        "metrics": get_network_metrics(recent=recent),
+        "blocked_patterns": {p: blocked_url_patterns(p) for p in ("tiktok", "youtube")},
+    })
+
+@app.route("/api/metrics/fetch", methods=["GET"])
+def fetch_metrics():
+    """HTTP fast-path hits vs browser escalations per platform and page kind"""
+    from fetch_backend import get_fetch_metrics
+
+    return jsonify({"status": "success", "metrics": get_fetch_metrics()})
+
+@app.route("/api/metrics/driver", methods=["GET"])
+def driver_metrics():
+    """Chrome driver cold-start timings and chromedriver cache hits per platform"""
+    from driver_cache import get_driver_metrics
+
+    recent = request.args.get("recent", 20, type=int)
+    return jsonify({"status": "success", "metrics": get_driver_metrics(recent=recent)})
+
+@app.route("/api/metrics/admission", methods=["GET"])
+def admission_metrics():
+    """In-flight, queued, admitted and rejected requests per browser-heavy endpoint"""
+    return jsonify({"status": "success", "metrics": admission.get_admission_stats()})
+
+@app.route("/api/metrics/scheduler", methods=["GET"])
+def scheduler_metrics():
+    """Queue depth, running jobs and queue wait per priority class, plus per-tenant usage"""
+    return jsonify({"status": "success", "metrics": scheduler.get_scheduler_stats()})
+
+@app.route("/api/metrics/selectors", methods=["GET"])
+def selector_metrics():
+    """Per-selector hit rate and latency for every scraper selector chain, with recent winner changes"""
+    from selector_stats import get_selector_stats, load_chains
+
+    load_chains()
+
+    recent = request.args.get("recent", 20, type=int)
+    return jsonify({"status": "success", "metrics": get_selector_stats(recent=recent)})
+
+@app.route("/api/history/<platform>/<handle>", methods=["GET"])
+def creator_history(platform, handle):
+    """Profile (and optionally per-video) snapshots for a creator in a time range"""
+    import history
+
+    if platform not in ("tiktok", "youtube"):
+        return jsonify({"status": "error", "message": f"Unknown platform '{platform}'"}), 400
+
+    since = request.args.get("since", type=float)
+    until = request.args.get("until", type=float)
+    profile = history.profile_history(platform, handle, since, until)
+    response = {
+        "status": "success",
+        "platform": platform,
+        "handle": handle,
+        "profile": profile.astype(object).where(profile.notna(), None).to_dict("records"),
+    }
+    if request.args.get("videos", "false").lower() == "true":
+        videos = history.video_history(platform, handle, since, until)
+        response["videos"] = videos.astype(object).where(videos.notna(), None).to_dict("records")
+    return jsonify(response)
+
+@app.route("/api/probe/<platform>/<handle>", methods=["GET"])
+def probe_creator(platform, handle):
+    """Cheap HTTP pre-flight: does the profile exist, is it private, are we rate limited"""
+    if platform not in ("tiktok", "youtube"):
+        return jsonify({"status": "error", "message": f"Unknown platform '{platform}'"}), 400
+
+    from fetch_backend import probe_profile
+
+    probe = probe_profile(platform, handle.lstrip("@"))
+    probe.pop("data", None)
+    return jsonify({"status": "success", "platform": platform, "handle": handle, "probe": probe})
+
+@app.route("/api/velocity/<platform>/<handle>", methods=["GET"])
+def creator_velocity(platform, handle):
+    """Likes/comments/views per hour, follower growth and decay curve from scrape history"""
+    if platform not in ("tiktok", "youtube"):
+        return jsonify({"status": "error", "message": f"Unknown platform '{platform}'"}), 400
+
+    from velocity import creator_velocity as compute_velocity
+
+    since = request.args.get("since", type=float)
+    until = request.args.get("until", type=float)
+    top_n = request.args.get("top", 5, type=int)
+    return jsonify({
+        "status": "success",
+        "platform": platform,
+        "handle": handle,
+        "velocity": compute_velocity(platform, handle, since, until, top_n=top_n),
+    })
+
 @app.errorhandler(404)
 def not_found(error):
     logger.error(f"404 error: {request.url}")
@@ -364,6 +401,17 @@ if __name__ == "__main__":
     logger.info("  POST /api/tiktok/analyze - TikTok analysis")
     logger.info("  POST /api/youtube/full - Complete YouTube workflow")
     logger.info("  POST /api/youtube/analyze - YouTube CSV analysis")
+    logger.info("  POST /api/batch/analyze - Many creators at once, streamed as NDJSON")
+    logger.info("  GET  /api/metrics/llm - LLM usage metrics")
+    logger.info("  GET  /api/metrics/network - Scraper bandwidth per page")
+    logger.info("  GET  /api/metrics/fetch - HTTP fast path vs browser escalations")
+    logger.info("  GET  /api/metrics/driver - Chrome driver cold-start timings")
+    logger.info("  GET  /api/metrics/admission - Scrape concurrency, queue and rejections")
+    logger.info("  GET  /api/metrics/scheduler - Job queues per priority class and tenant")
+    logger.info("  GET  /api/metrics/selectors - Selector chain hit rates and winner changes")
+    logger.info("  GET  /api/probe/<platform>/<handle> - Pre-flight existence/privacy check")
+    logger.info("  GET  /api/history/<platform>/<handle> - Profile/video snapshot history")
+    logger.info("  GET  /api/velocity/<platform>/<handle> - Engagement velocity")
     logger.info("  GET  /api/status - Health check")
     
     app.run(debug=debug, host="0.0.0.0", port=port)
\ No newline at end of file
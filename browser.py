@@ -0,0 +1,421 @@
+"""
+Chrome request filtering and per-page network accounting for the scrapers.
+
+Blocking goes through the DevTools protocol (Network.setBlockedURLs), since
+Chrome ignores the old --disable-images switch. Transferred bytes are read
+from the performance log, so the driver must be created with options that
+went through enable_network_logging().
+
+Per-platform lists can be tuned without code changes:
+
+    BROWSER_BLOCK_TIKTOK="*example.com/*"        extra URL patterns to block
+    BROWSER_ALLOW_YOUTUBE="image,*i.ytimg.com*"   resource classes / patterns to let through
+
+Drivers also run on persistent profile directories (cookies, consent state,
+local storage, HTTP cache) so consent walls and first-visit redirects are only
+paid once per slot. Each platform has BROWSER_PROFILE_SLOTS slots under
+BROWSER_PROFILE_DIR, locked with fcntl while a driver uses them; slots older
+than BROWSER_PROFILE_MAX_AGE_DAYS are wiped and re-seeded.
+
+    python browser.py profiles     list slots
+    python browser.py clean        rotate expired slots and trim oversized caches
+"""
+import os
+import json
+import time
+import shutil
+import threading
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+import fixtures
+
+try:
+    import fcntl
+except ImportError:  # Windows: run without persistent profiles
+    fcntl = None
+
+# Wildcard URL patterns per resource class, in Network.setBlockedURLs syntax
+RESOURCE_CLASSES = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.ico*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*"],
+    "media": ["*.mp4*", "*.webm*", "*.m4s*", "*.m3u8*"],
+    "analytics": [
+        "*doubleclick.net*", "*google-analytics.com*", "*googletagmanager.com*",
+        "*googlesyndication.com*", "*googleadservices.com*", "*facebook.net*",
+    ],
+    "tiktok_media": ["*tiktokcdn*/video/*", "*tiktokcdn*.com/obj/*", "*ibyteimg.com*", "*mon.tiktokv.com*",
+                     "*mcs.tiktokv.com*", "*tiktokw.us/web/report*"],
+    "youtube_media": ["*googlevideo.com/videoplayback*", "*i.ytimg.com/*", "*yt3.ggpht.com/*",
+                      "*youtube.com/api/stats/*", "*youtube.com/ptracking*", "*youtube.com/pagead/*"],
+}
+
+PLATFORM_POLICY = {
+    "tiktok": {"block": ["image", "font", "media", "analytics", "tiktok_media"], "allow": []},
+    "youtube": {"block": ["image", "font", "media", "analytics", "youtube_media"], "allow": []},
+}
+
+RECENT_PAGES_KEPT = 200
+
+
+def _env_list(name):
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
+
+
+def blocked_url_patterns(platform):
+    """Effective block list for a platform after the env allow/block overrides"""
+    policy = PLATFORM_POLICY.get(platform, {"block": [], "allow": []})
+    allow = set(policy["allow"]) | set(_env_list(f"BROWSER_ALLOW_{platform.upper()}"))
+    patterns = []
+    for cls in policy["block"]:
+        if cls in allow:
+            continue
+        patterns += [p for p in RESOURCE_CLASSES[cls] if p not in allow]
+    patterns += _env_list(f"BROWSER_BLOCK_{platform.upper()}")
+    return list(dict.fromkeys(patterns))
+
+
+def enable_network_logging(options):
+    """Ask chromedriver to keep DevTools network events in the performance log"""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def install_request_filter(driver, platform):
+    """Block the platform's unneeded resources for every later page load in this driver"""
+    patterns = blocked_url_patterns(platform)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        print(f"[BROWSER] Blocking {len(patterns)} URL patterns for {platform}")
+    except Exception as e:
+        print(f"[BROWSER] ⚠️ Request filter not installed: {e}")
+    return patterns
+
+
+def _empty_bucket():
+    return {"pages": 0, "bytes": 0, "requests": 0, "blocked": 0, "total_load_ms": 0.0,
+            "by_type": defaultdict(lambda: {"requests": 0, "bytes": 0, "blocked": 0})}
+
+
+class NetworkMetrics:
+    """Thread-safe per-platform totals of bytes, requests and load time per page"""
+
+    def __init__(self, keep_recent=RECENT_PAGES_KEPT):
+        self._lock = threading.Lock()
+        self._by_platform = defaultdict(_empty_bucket)
+        self._recent = deque(maxlen=keep_recent)
+
+    def record_page(self, platform, page, by_type, blocked, load_ms, run_id=None):
+        record = {
+            "ts": time.time(),
+            "platform": platform,
+            "page": page,
+            "run_id": run_id,
+            "bytes": sum(v["bytes"] for v in by_type.values()),
+            "requests": sum(v["requests"] for v in by_type.values()),
+            "blocked": blocked,
+            "load_ms": load_ms,
+            "by_type": by_type,
+        }
+        with self._lock:
+            bucket = self._by_platform[platform]
+            bucket["pages"] += 1
+            bucket["bytes"] += record["bytes"]
+            bucket["requests"] += record["requests"]
+            bucket["blocked"] += blocked
+            bucket["total_load_ms"] += load_ms or 0
+            for kind, stats in by_type.items():
+                bucket["by_type"][kind]["requests"] += stats["requests"]
+                bucket["by_type"][kind]["bytes"] += stats["bytes"]
+                bucket["by_type"][kind]["blocked"] += stats.get("blocked", 0)
+            self._recent.append(record)
+        return record
+
+    @staticmethod
+    def _summarize(bucket):
+        pages = bucket["pages"]
+        return {
+            "pages": pages,
+            "bytes": bucket["bytes"],
+            "requests": bucket["requests"],
+            "blocked": bucket["blocked"],
+            "avg_bytes_per_page": round(bucket["bytes"] / pages) if pages else 0,
+            "avg_load_ms": round(bucket["total_load_ms"] / pages, 1) if pages else 0.0,
+            "by_type": {k: dict(v) for k, v in sorted(bucket["by_type"].items(), key=lambda kv: -kv[1]["bytes"])},
+        }
+
+    def snapshot(self, recent=20):
+        with self._lock:
+            return {
+                "platforms": {k: self._summarize(v) for k, v in self._by_platform.items()},
+                "recent_pages": list(self._recent)[-recent:] if recent else [],
+            }
+
+    def run_totals(self, run_id):
+        """Bytes, requests and load time summed over the pages of one scrape run"""
+        with self._lock:
+            pages = [r for r in self._recent if r["run_id"] == run_id]
+        return {
+            "pages": len(pages),
+            "bytes": sum(r["bytes"] for r in pages),
+            "requests": sum(r["requests"] for r in pages),
+            "blocked": sum(r["blocked"] for r in pages),
+            "load_ms": round(sum(r["load_ms"] or 0 for r in pages), 1),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._by_platform.clear()
+            self._recent.clear()
+
+
+NETWORK_METRICS = NetworkMetrics()
+
+
+def _page_load_ms(driver):
+    try:
+        return driver.execute_script(
+            "const n = performance.getEntriesByType('navigation')[0];"
+            "return n && n.loadEventEnd ? n.loadEventEnd - n.startTime : null;"
+        )
+    except Exception:
+        return None
+
+
+def record_page(driver, platform, page, run_id=None):
+    """Drain the performance log and record bytes per resource type for the current page"""
+    fixtures.record_driver_page(driver, platform, page)
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None  # driver was built without enable_network_logging
+
+    types, by_type, blocked = {}, defaultdict(lambda: {"requests": 0, "bytes": 0, "blocked": 0}), 0
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.responseReceived":
+            types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFinished":
+            kind = types.get(params.get("requestId"), "Other")
+            by_type[kind]["requests"] += 1
+            by_type[kind]["bytes"] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            by_type[params.get("type", "Other")]["blocked"] += 1
+            blocked += 1
+
+    return NETWORK_METRICS.record_page(platform, page, dict(by_type), blocked, _page_load_ms(driver), run_id)
+
+
+def get_network_metrics(recent=20):
+    return NETWORK_METRICS.snapshot(recent=recent)
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.environ.get("BROWSER_PROFILE_DIR", os.path.join(BASE_DIR, ".browser_profiles"))
+PROFILE_SLOTS = int(os.environ.get("BROWSER_PROFILE_SLOTS", 2))
+PROFILE_MAX_AGE_S = float(os.environ.get("BROWSER_PROFILE_MAX_AGE_DAYS", 7)) * 86_400
+PROFILE_MAX_CACHE_MB = float(os.environ.get("BROWSER_PROFILE_MAX_CACHE_MB", 300))
+
+# Chrome cache directories that may be dropped without losing cookies or local storage
+CACHE_SUBDIRS = [os.path.join("Default", d) for d in ("Cache", "Code Cache", "GPUCache", "Service Worker")]
+# Left behind by a Chrome that crashed; harmless to remove once we hold the slot lock
+SINGLETON_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+CREATED_MARKER = ".created"
+SEEDED_MARKER = ".consent_seeded"
+
+# Cookies that pre-accept consent banners, set on the platform origin before the first page load
+CONSENT_COOKIES = {
+    "youtube": {"CONSENT": "YES+cb", "SOCS": "CAI"},
+    "tiktok": {"cookie-consent": json.dumps({"optional": False, "ga": False, "af": False, "fbp": False,
+                                             "lip": False, "bing": False, "ttads": False, "reddit": False,
+                                             "version": "v10"}, separators=(",", ":"))},
+}
+
+
+class ProfileLease:
+    """An exclusively locked profile slot; release() unlocks it for the next driver"""
+
+    def __init__(self, platform, slot, path, lock_file):
+        self.platform = platform
+        self.slot = slot
+        self.path = path
+        self._lock_file = lock_file
+
+    @property
+    def seeded(self):
+        return os.path.exists(os.path.join(self.path, SEEDED_MARKER))
+
+    def mark_seeded(self):
+        with open(os.path.join(self.path, SEEDED_MARKER), "w") as f:
+            f.write(str(time.time()))
+
+    def release(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def _dir_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / 1_048_576
+
+
+def _slot_path(platform, slot):
+    return os.path.join(PROFILE_DIR, platform, f"slot-{slot}")
+
+
+def _prepare_slot(path, now):
+    """Wipe an expired slot, trim an oversized cache and clear stale singletons"""
+    marker = os.path.join(path, CREATED_MARKER)
+    created = os.path.getmtime(marker) if os.path.exists(marker) else None
+    if created is not None and now - created > PROFILE_MAX_AGE_S:
+        print(f"[BROWSER] Rotating profile {path} (older than {PROFILE_MAX_AGE_S / 86_400:.0f} days)")
+        shutil.rmtree(path, ignore_errors=True)
+        created = None
+    os.makedirs(path, exist_ok=True)
+    if created is None:
+        with open(marker, "w") as f:
+            f.write(str(now))
+        return
+
+    cache_dirs = [os.path.join(path, d) for d in CACHE_SUBDIRS]
+    if sum(_dir_size_mb(d) for d in cache_dirs) > PROFILE_MAX_CACHE_MB:
+        print(f"[BROWSER] Trimming cache of profile {path}")
+        for d in cache_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+    for name in SINGLETON_FILES:
+        try:
+            os.remove(os.path.join(path, name))
+        except OSError:
+            pass
+
+
+def lease_profile(platform):
+    """Lock the first free profile slot for a platform, or None when all are busy"""
+    if fcntl is None or PROFILE_SLOTS <= 0:
+        return None
+    os.makedirs(os.path.join(PROFILE_DIR, platform), exist_ok=True)
+    for slot in range(PROFILE_SLOTS):
+        path = _slot_path(platform, slot)
+        lock_file = open(path + ".lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            continue
+        try:
+            _prepare_slot(path, time.time())
+        except OSError as e:
+            print(f"[BROWSER] ⚠️ Profile slot {path} unusable: {e}")
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+            continue
+        return ProfileLease(platform, slot, path, lock_file)
+    print(f"[BROWSER] All {PROFILE_SLOTS} {platform} profile slots busy; using a throwaway profile")
+    return None
+
+
+def apply_profile(options, lease):
+    """Point Chrome at the leased profile directory (undetected_chromedriver then keeps it on quit)"""
+    if lease is not None:
+        options.add_argument(f"--user-data-dir={lease.path}")
+    return options
+
+
+def seed_consent_cookies(driver, platform, base_url):
+    """Set the platform's consent cookies so the first page load skips the banner"""
+    cookies = CONSENT_COOKIES.get(platform, {})
+    origin = "{0.scheme}://{0.netloc}/".format(urlsplit(base_url))
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        for name, value in cookies.items():
+            driver.execute_cdp_cmd("Network.setCookie", {"name": name, "value": value, "url": origin,
+                                                         "expires": time.time() + PROFILE_MAX_AGE_S})
+    except Exception as e:
+        print(f"[BROWSER] ⚠️ Consent cookies not set: {e}")
+
+
+def attach_profile(driver, lease, platform, base_url):
+    """Tie a lease to its driver; new or rotated slots get their consent cookies seeded"""
+    driver.profile_lease = lease
+    if lease is None or not lease.seeded:
+        seed_consent_cookies(driver, platform, base_url)
+        if lease is not None:
+            lease.mark_seeded()
+    return driver
+
+
+def quit_driver(driver):
+    """Quit Chrome and hand its profile slot back"""
+    try:
+        driver.quit()
+    finally:
+        lease = getattr(driver, "profile_lease", None)
+        if lease is not None:
+            lease.release()
+
+
+def profile_status():
+    """Age, size and lock state of every profile slot"""
+    now, slots = time.time(), []
+    for platform in sorted(os.listdir(PROFILE_DIR)) if os.path.isdir(PROFILE_DIR) else []:
+        for slot in range(PROFILE_SLOTS):
+            path = _slot_path(platform, slot)
+            if not os.path.isdir(path):
+                continue
+            marker = os.path.join(path, CREATED_MARKER)
+            in_use = False
+            if fcntl is not None:
+                with open(path + ".lock", "w") as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    except OSError:
+                        in_use = True
+            slots.append({
+                "platform": platform,
+                "slot": slot,
+                "path": path,
+                "age_days": round((now - os.path.getmtime(marker)) / 86_400, 2) if os.path.exists(marker) else None,
+                "size_mb": round(_dir_size_mb(path), 1),
+                "in_use": in_use,
+            })
+    return slots
+
+
+def cleanup_profiles():
+    """Rotate expired slots and trim oversized caches on every slot not in use"""
+    for platform in CONSENT_COOKIES:
+        # Leasing a slot runs the rotation/trim; take each free slot once, then hand them all back
+        leases = []
+        while len(leases) < PROFILE_SLOTS:
+            lease = lease_profile(platform)
+            if lease is None:
+                break
+            leases.append(lease)
+        for lease in leases:
+            lease.release()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "clean":
+        cleanup_profiles()
+    if len(sys.argv) >= 2 and sys.argv[1] in ("profiles", "clean"):
+        for slot in profile_status():
+            print(f"{slot['platform']:8s} slot-{slot['slot']}  {slot['age_days'] or 0:6.2f} d  "
+                  f"{slot['size_mb']:8.1f} MB  {'in use' if slot['in_use'] else 'free'}")
+    else:
+        print("Usage: python browser.py profiles|clean")
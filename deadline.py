@@ -0,0 +1,66 @@
+"""
+Per-request time budget shared by every stage of a scrape + analysis.
+
+The endpoint creates one Deadline and passes it down. Each stage asks
+whether enough budget is left for its normal path and otherwise takes its
+defined cheaper path, recording that on the deadline so the response can
+list what was degraded:
+
+    deadline = Deadline(TIKTOK_REQUEST_BUDGET_S)
+    if not deadline.has(IDEAS_MIN_S):
+        deadline.degrade("ideas", "fallback ideas")
+"""
+import os
+import time
+import threading
+
+TIKTOK_REQUEST_BUDGET_S = float(os.environ.get("TIKTOK_REQUEST_BUDGET_S", 150))
+YOUTUBE_REQUEST_BUDGET_S = float(os.environ.get("YOUTUBE_REQUEST_BUDGET_S", 120))
+# Network calls never get less than this, so a nearly spent budget still yields a real attempt or a fast failure
+MIN_CALL_TIMEOUT_S = 1.0
+
+
+class Deadline:
+    """Wall-clock budget with a log of the stages that had to cut corners"""
+
+    def __init__(self, budget_s=None):
+        self.budget_s = budget_s
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._degraded = []
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def remaining(self):
+        """Seconds left (inf for an unlimited deadline), never negative"""
+        if self.budget_s is None:
+            return float("inf")
+        return max(0.0, self.budget_s - self.elapsed())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def has(self, seconds):
+        """True if at least ``seconds`` of budget are left"""
+        return self.remaining() >= seconds
+
+    def timeout(self, cap):
+        """Timeout for one network call: ``cap``, shortened to the remaining budget"""
+        return max(MIN_CALL_TIMEOUT_S, min(cap, self.remaining()))
+
+    def degrade(self, stage, detail):
+        with self._lock:
+            self._degraded.append({"stage": stage, "detail": detail, "at_s": round(self.elapsed(), 2)})
+        print(f"[DEADLINE] {stage} degraded after {self.elapsed():.1f}s "
+              f"({self.remaining():.1f}s left): {detail}")
+
+    @property
+    def degraded(self):
+        with self._lock:
+            return list(self._degraded)
+
+
+def unlimited():
+    """Deadline that never runs out, for callers that did not pass one"""
+    return Deadline(None)
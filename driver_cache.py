@@ -0,0 +1,205 @@
+"""
+Shared cache of patched chromedriver binaries, one per Chrome major version.
+
+undetected_chromedriver normally downloads and patches chromedriver on every
+uc.Chrome() call, and parallel workers fight over the same file while doing it.
+Here the first process to need a version builds it under a file lock and every
+later launch reuses it through driver_executable_path:
+
+    CHROMEDRIVER_CACHE_DIR=/var/cache/trendlytics   where patched binaries live
+    CHROME_VERSION_MAIN=120                          skip Chrome version detection
+    CHROMEDRIVER_SOURCE=/usr/bin/chromedriver        patch a local binary instead of downloading
+
+    python driver_cache.py warm      build the binary for the installed Chrome
+"""
+import os
+import re
+import time
+import shutil
+import threading
+import subprocess
+from collections import defaultdict, deque
+import undetected_chromedriver as uc
+from undetected_chromedriver.patcher import Patcher
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, the atomic rename still prevents torn binaries
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("CHROMEDRIVER_CACHE_DIR", os.path.join(BASE_DIR, ".chromedriver_cache"))
+RECENT_STARTS_KEPT = 200
+
+_version_lock = threading.Lock()
+_chrome_version = {}
+_verified_paths = set()
+
+
+def chrome_major_version():
+    """Major version of the installed Chrome (CHROME_VERSION_MAIN wins), or None if unknown"""
+    if os.environ.get("CHROME_VERSION_MAIN"):
+        return int(os.environ["CHROME_VERSION_MAIN"])
+    with _version_lock:
+        if "main" not in _chrome_version:
+            _chrome_version["main"] = None
+            binary = uc.find_chrome_executable()
+            if binary:
+                try:
+                    out = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+                    match = re.search(r"(\d+)\.\d+\.\d+", out)
+                    _chrome_version["main"] = int(match.group(1)) if match else None
+                except (OSError, subprocess.SubprocessError) as e:
+                    print(f"[DRIVER] ⚠️ Could not read Chrome version: {e}")
+        return _chrome_version["main"]
+
+
+def _is_patched(path):
+    try:
+        with open(path, "rb") as f:
+            return b"undetected chromedriver" in f.read()
+    except FileNotFoundError:
+        return False
+
+
+def _build(version_main, target):
+    """Download (or copy CHROMEDRIVER_SOURCE) and patch chromedriver into ``target`` atomically"""
+    tmp = f"{target}.{os.getpid()}.tmp"
+    patcher = Patcher(executable_path=tmp, version_main=version_main)
+    source = os.environ.get("CHROMEDRIVER_SOURCE")
+    try:
+        if source:
+            shutil.copyfile(source, tmp)
+        else:
+            patcher.zip_path = tmp + ".unzip"
+            patcher.version_full = patcher.fetch_release_number()
+            patcher.unzip_package(patcher.fetch_package())
+        os.chmod(tmp, 0o755)
+        patcher.patch_exe()
+        if not _is_patched(tmp):
+            raise RuntimeError(f"chromedriver for Chrome {version_main} could not be patched")
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def patched_driver_path(version_main):
+    """Path of the patched chromedriver for a Chrome major version, building it once if missing.
+
+    Returns (path, built) where ``built`` says whether this call had to build it.
+    """
+    target = os.path.join(CACHE_DIR, f"chromedriver-{version_main}")
+    if target in _verified_paths:
+        return target, False
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    with open(target + ".lock", "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # another worker may be building it right now
+        built = not _is_patched(target)
+        if built:
+            print(f"[DRIVER] Building patched chromedriver for Chrome {version_main}")
+            _build(version_main, target)
+    _verified_paths.add(target)
+    return target, built
+
+
+def _empty_bucket():
+    return {"starts": 0, "failures": 0, "cache_hits": 0, "builds": 0, "fallbacks": 0,
+            "total_resolve_ms": 0.0, "total_launch_ms": 0.0}
+
+
+class DriverStartupMetrics:
+    """Per-platform driver cold-start timings, split into binary resolution and Chrome launch"""
+
+    def __init__(self, keep_recent=RECENT_STARTS_KEPT):
+        self._lock = threading.Lock()
+        self._by_platform = defaultdict(_empty_bucket)
+        self._recent = deque(maxlen=keep_recent)
+
+    def record(self, platform, resolve_ms, launch_ms, source, ok=True):
+        record = {"ts": time.time(), "platform": platform, "source": source, "ok": ok,
+                  "resolve_ms": round(resolve_ms, 1), "launch_ms": round(launch_ms, 1)}
+        with self._lock:
+            bucket = self._by_platform[platform]
+            bucket["starts"] += 1
+            bucket["failures"] += 0 if ok else 1
+            bucket[{"cache": "cache_hits", "built": "builds", "uc": "fallbacks"}[source]] += 1
+            bucket["total_resolve_ms"] += resolve_ms
+            bucket["total_launch_ms"] += launch_ms
+            self._recent.append(record)
+        return record
+
+    def _summarize(self, platform, bucket):
+        starts = bucket["starts"]
+        totals = sorted(r["resolve_ms"] + r["launch_ms"] for r in self._recent if r["platform"] == platform and r["ok"])
+        return {
+            "starts": starts,
+            "failures": bucket["failures"],
+            "cache_hits": bucket["cache_hits"],
+            "builds": bucket["builds"],
+            "fallbacks": bucket["fallbacks"],
+            "avg_resolve_ms": round(bucket["total_resolve_ms"] / starts, 1) if starts else 0.0,
+            "avg_launch_ms": round(bucket["total_launch_ms"] / starts, 1) if starts else 0.0,
+            "p50_cold_start_ms": totals[len(totals) // 2] if totals else None,
+            "p95_cold_start_ms": totals[min(len(totals) - 1, int(len(totals) * 0.95))] if totals else None,
+        }
+
+    def snapshot(self, recent=20):
+        with self._lock:
+            return {
+                "platforms": {k: self._summarize(k, v) for k, v in self._by_platform.items()},
+                "recent_starts": list(self._recent)[-recent:] if recent else [],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._by_platform.clear()
+            self._recent.clear()
+
+
+DRIVER_METRICS = DriverStartupMetrics()
+
+
+def launch(options, platform):
+    """uc.Chrome on the cached patched binary; falls back to uc's own download/patch if the cache fails"""
+    start = time.perf_counter()
+    kwargs, source = {}, "uc"
+    version_main = chrome_major_version()
+    if version_main:
+        try:
+            path, built = patched_driver_path(version_main)
+            kwargs = {"driver_executable_path": path, "version_main": version_main}
+            source = "built" if built else "cache"
+        except Exception as e:
+            print(f"[DRIVER] ⚠️ Driver cache unavailable, letting undetected_chromedriver patch: {e}")
+    resolved = time.perf_counter()
+    try:
+        driver = uc.Chrome(options=options, **kwargs)
+    except Exception:
+        DRIVER_METRICS.record(platform, (resolved - start) * 1000, (time.perf_counter() - resolved) * 1000,
+                              source, ok=False)
+        raise
+    record = DRIVER_METRICS.record(platform, (resolved - start) * 1000, (time.perf_counter() - resolved) * 1000,
+                                   source)
+    print(f"[DRIVER] {platform} driver up in {record['resolve_ms'] + record['launch_ms']:.0f} ms ({source})")
+    return driver
+
+
+def get_driver_metrics(recent=20):
+    return {"cache_dir": CACHE_DIR, "chrome_version_main": chrome_major_version(),
+            **DRIVER_METRICS.snapshot(recent=recent)}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "warm":
+        version = chrome_major_version()
+        if not version:
+            sys.exit("Chrome not found; set CHROME_VERSION_MAIN")
+        path, built = patched_driver_path(version)
+        print(f"{path} ({'built' if built else 'already cached'})")
+    else:
+        print("Usage: python driver_cache.py warm")
@@ -0,0 +1,165 @@
+"""
+Local stand-in for tiktok.com and youtube.com that replays a fixture corpus.
+
+Record pages first (see fixtures.py), then serve them and point the scrapers
+at this server:
+
+    python fake_site_server.py --corpus fixtures --port 8002 --latency-ms 150
+    TIKTOK_BASE_URL=http://127.0.0.1:8002/tiktok \\
+    YOUTUBE_BASE_URL=http://127.0.0.1:8002/youtube python app.py
+
+Or time the scrapers against every recorded creator:
+
+    python fake_site_server.py bench --corpus fixtures --runs 3
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from flask import Flask, Response, request
+import fixtures
+
+app = Flask(__name__)
+
+CONFIG = {
+    "corpus": os.environ.get("FAKE_SITE_CORPUS", "fixtures"),
+    "latency_ms": float(os.environ.get("FAKE_SITE_LATENCY_MS", 0)),
+    "jitter_ms": float(os.environ.get("FAKE_SITE_JITTER_MS", 0)),
+}
+
+# Absolute links inside recorded pages are rewritten to point back at this server
+LIVE_ORIGINS = {
+    "tiktok": ["https://www.tiktok.com", "https://tiktok.com"],
+    "youtube": ["https://www.youtube.com", "https://youtube.com", "https://m.youtube.com"],
+}
+
+_manifest_cache = {"corpus": None, "mtime": None, "entries": {}}
+_manifest_lock = threading.Lock()
+
+
+def _manifest():
+    """Manifest for the configured corpus, reloaded when the file changes"""
+    path = os.path.join(CONFIG["corpus"], fixtures.MANIFEST)
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    with _manifest_lock:
+        if _manifest_cache["corpus"] != CONFIG["corpus"] or _manifest_cache["mtime"] != mtime:
+            _manifest_cache.update(corpus=CONFIG["corpus"], mtime=mtime,
+                                   entries=fixtures.load_manifest(CONFIG["corpus"]))
+        return _manifest_cache["entries"]
+
+
+def _rewrite(content):
+    own_origin = request.host_url.rstrip("/")
+    for name, origins in LIVE_ORIGINS.items():
+        for origin in origins:
+            content = content.replace(origin, f"{own_origin}/{name}")
+    return content
+
+
+@app.route("/<platform>/", defaults={"path": ""})
+@app.route("/<platform>/<path:path>")
+def replay(platform, path):
+    delay = CONFIG["latency_ms"] + random.uniform(0, CONFIG["jitter_ms"])
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+    request_path = "/" + path + (f"?{request.query_string.decode()}" if request.query_string else "")
+    entry = _manifest().get(f"{platform} {request_path}")
+    if entry is None:
+        return Response("Not recorded", status=404, mimetype="text/plain")
+    with open(os.path.join(CONFIG["corpus"], entry["file"]), encoding="utf-8") as f:
+        content = f.read()
+    return Response(_rewrite(content), mimetype="text/html")
+
+
+@app.route("/_corpus", methods=["GET"])
+def corpus():
+    return Response(json.dumps(_manifest(), indent=2), mimetype="application/json")
+
+
+def start_in_thread(host="127.0.0.1", port=8002):
+    """Run the fake site in a daemon thread and return its origin"""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{port}"
+
+
+def recorded_creators(corpus_dir):
+    """TikTok usernames and YouTube channel ids with a recorded profile/channel page"""
+    creators = {"tiktok": set(), "youtube": set()}
+    for key, entry in fixtures.load_manifest(corpus_dir).items():
+        platform, path = key.split(" ", 1)
+        if platform == "tiktok" and entry["kind"] == "profile" and path.startswith("/@"):
+            creators["tiktok"].add(path[2:].split("/")[0].split("?")[0])
+        elif platform == "youtube" and entry["kind"] in ("channel", "videos") and path.startswith("/@"):
+            creators["youtube"].add(path[2:].split("/")[0].split("?")[0])
+    return {k: sorted(v) for k, v in creators.items()}
+
+
+def run_benchmark(corpus_dir, runs=3, origin=None):
+    """Time scrape_tiktok / get_youtube_channel_stats against the replayed corpus"""
+    import tempfile
+
+    CONFIG["corpus"] = corpus_dir
+    origin = origin or start_in_thread()
+    os.environ["TIKTOK_BASE_URL"] = f"{origin}/tiktok"
+    os.environ["YOUTUBE_BASE_URL"] = f"{origin}/youtube"
+    os.environ["TRENDLYTICS_DB"] = os.path.join(tempfile.mkdtemp(prefix="trendlytics_replay_"), "replay.db")
+    os.environ.pop("FIXTURE_RECORD_DIR", None)
+
+    # Imported late so the scrapers and store pick up the env overrides
+    from scraper import scrape_tiktok
+    from scraper_yt import get_youtube_channel_stats
+    from fetch_backend import get_fetch_metrics
+    from browser import get_network_metrics
+
+    creators = recorded_creators(corpus_dir)
+    jobs = {
+        "scrape_tiktok": (creators["tiktok"], lambda h: scrape_tiktok(h, incremental=False)),
+        "get_youtube_channel_stats": (creators["youtube"], get_youtube_channel_stats),
+    }
+    results = {}
+    for name, (handles, job) in jobs.items():
+        latencies, ok = [], 0
+        for _ in range(runs):
+            for handle in handles:
+                start = time.perf_counter()
+                out = job(handle)
+                latencies.append(time.perf_counter() - start)
+                ok += "error" not in out
+        latencies.sort()
+        results[name] = {
+            "creators": len(handles),
+            "runs": len(latencies),
+            "ok": ok,
+            "p50_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3) if latencies else None,
+        }
+    results["fetch"] = get_fetch_metrics()["platforms"]
+    results["network"] = get_network_metrics(recent=0)["platforms"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded TikTok/YouTube pages")
+    parser.add_argument("mode", nargs="?", choices=["serve", "bench"], default="serve")
+    parser.add_argument("--corpus", default=CONFIG["corpus"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    CONFIG.update(corpus=args.corpus, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+
+    if args.mode == "bench":
+        origin = start_in_thread(args.host, args.port)
+        print(json.dumps(run_benchmark(args.corpus, args.runs, origin), indent=2))
+    else:
+        print(f"Fake TikTok/YouTube on http://{args.host}:{args.port} (tiktok/, youtube/) config={CONFIG}")
+        app.run(host=args.host, port=args.port, threaded=True)
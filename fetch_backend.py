@@ -0,0 +1,419 @@
+"""
+HTTP-first fetch backend for the scrapers.
+
+Profile, channel and video pages are server-rendered with their data in an
+embedded JSON blob (TikTok: __UNIVERSAL_DATA_FOR_REHYDRATION__, YouTube:
+ytInitialData). A pooled requests.Session plus lxml reads that in a few
+hundred milliseconds; the scrapers only start Chrome when a fetch comes back
+as a challenge page or without the fields they need.
+
+    SCRAPE_BACKEND=auto      HTTP first, escalate to the browser (default)
+    SCRAPE_BACKEND=http      HTTP only, never escalate
+    SCRAPE_BACKEND=browser   skip the HTTP fast path
+
+probe_profile() runs the same fetch as a pre-flight check, so typos, private
+accounts and rate limits fail in milliseconds instead of after a browser
+session; negative answers are cached for PROFILE_PROBE_NEGATIVE_TTL_S.
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import html as lxml_html
+import fixtures
+
+SCRAPE_BACKEND = os.environ.get("SCRAPE_BACKEND", "auto").lower()
+# Point the scrapers at fake_site_server.py (or any mirror) instead of the live sites
+BASE_URLS = {
+    "tiktok": os.environ.get("TIKTOK_BASE_URL", "https://www.tiktok.com").rstrip("/"),
+    "youtube": os.environ.get("YOUTUBE_BASE_URL", "https://www.youtube.com").rstrip("/"),
+}
+HTTP_TIMEOUT_S = float(os.environ.get("HTTP_FETCH_TIMEOUT_S", 10))
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 16))
+PROBE_NEGATIVE_TTL_S = float(os.environ.get("PROFILE_PROBE_NEGATIVE_TTL_S", 600))
+PROBE_RATE_LIMIT_TTL_S = float(os.environ.get("PROFILE_PROBE_RATE_LIMIT_TTL_S", 60))
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+# Skip the EU consent interstitial on YouTube
+COOKIES = {"CONSENT": "YES+cb", "SOCS": "CAI"}
+
+# Text that only shows up on bot-check / captcha / consent pages
+CHALLENGE_MARKERS = (
+    "captcha", "verify to continue", "tiktok-verify-page", "_____tmd_____", "cf-chl",
+    "consent.youtube.com", "before you continue to youtube", "unusual traffic",
+)
+
+_local = threading.local()
+
+
+class FetchError(Exception):
+    """Raised when the HTTP path cannot produce the data; ``reason`` says why"""
+
+    def __init__(self, reason, message="", retry_after=None):
+        super().__init__(message or reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def session():
+    """Per-thread pooled session with keep-alive and retries on transient errors"""
+    sess = getattr(_local, "session", None)
+    if sess is None:
+        sess = requests.Session()
+        # Retry-After is surfaced as a rate_limited FetchError instead of sleeping through it here
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",),
+                      respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        sess.mount("https://", adapter)
+        sess.mount("http://", adapter)
+        sess.headers.update(HEADERS)
+        sess.cookies.update(COOKIES)
+        _local.session = sess
+    return sess
+
+
+def fetch_html(url):
+    """GET a page and return its text, raising FetchError for blocks and challenges"""
+    try:
+        resp = session().get(url, timeout=HTTP_TIMEOUT_S)
+    except requests.RequestException as e:
+        raise FetchError("http_error", str(e))
+    if resp.status_code == 429:
+        retry_after = resp.headers.get("Retry-After", "")
+        raise FetchError("rate_limited", "HTTP 429",
+                         retry_after=float(retry_after) if retry_after.isdigit() else None)
+    if resp.status_code == 403:
+        raise FetchError("challenge", "HTTP 403")
+    if resp.status_code == 404:
+        raise FetchError("not_found", "HTTP 404")
+    if resp.status_code >= 400:
+        raise FetchError("http_error", f"HTTP {resp.status_code}")
+    lowered = (resp.url + resp.text[:20000]).lower()
+    if any(marker in lowered for marker in CHALLENGE_MARKERS):
+        raise FetchError("challenge", "challenge page")
+    return resp.text
+
+
+def _script_json(text, element_id):
+    tree = lxml_html.fromstring(text)
+    scripts = tree.xpath(f"//script[@id='{element_id}']/text()")
+    if not scripts:
+        raise FetchError("missing_fields", f"no {element_id} script")
+    return json.loads(scripts[0])
+
+
+_YT_INITIAL_RE = re.compile(r"ytInitialData\s*=\s*")
+
+
+def _yt_initial_data(text):
+    tree = lxml_html.fromstring(text)
+    for script in tree.xpath("//script[contains(text(), 'ytInitialData')]/text()"):
+        match = _YT_INITIAL_RE.search(script)
+        if match:
+            try:
+                data, _ = json.JSONDecoder().raw_decode(script, match.end())
+                return data
+            except ValueError:
+                continue
+    raise FetchError("missing_fields", "no ytInitialData")
+
+
+def _walk(node, key):
+    """Yield every value stored under ``key`` anywhere in a nested JSON structure"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            for k, v in current.items():
+                if k == key:
+                    yield v
+                stack.append(v)
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def _text(node):
+    if not isinstance(node, dict):
+        return None
+    if "simpleText" in node:
+        return node["simpleText"]
+    if "runs" in node:
+        return "".join(run.get("text", "") for run in node["runs"])
+    if "content" in node:
+        return node["content"]
+    return None
+
+
+# webapp.user-detail statusCode for users that do not exist or were banned
+TIKTOK_MISSING_USER_CODES = (10202, 10221)
+
+
+def parse_tiktok_profile(text, username):
+    scope = _script_json(text, "__UNIVERSAL_DATA_FOR_REHYDRATION__").get("__DEFAULT_SCOPE__", {})
+    detail = scope.get("webapp.user-detail", {})
+    info = detail.get("userInfo")
+    # Unknown and banned users still get a 200 page, with only a status code in the data
+    if not info and detail.get("statusCode") in TIKTOK_MISSING_USER_CODES:
+        raise FetchError("not_found", f"user status {detail['statusCode']}")
+    if not info or "stats" not in info:
+        raise FetchError("missing_fields", "no userInfo in rehydration data")
+    user, stats = info.get("user", {}), info["stats"]
+    if user.get("privateAccount"):
+        raise FetchError("private", "private account")
+    return {
+        "username": username,
+        "name": user.get("nickname") or username,
+        "followers": str(stats.get("followerCount", "N/A")),
+        "following": str(stats.get("followingCount", "N/A")),
+        "total_likes": str(stats.get("heartCount", stats.get("heart", "N/A"))),
+    }
+
+
+def parse_tiktok_video(text, video_url):
+    scope = _script_json(text, "__UNIVERSAL_DATA_FOR_REHYDRATION__").get("__DEFAULT_SCOPE__", {})
+    item = scope.get("webapp.video-detail", {}).get("itemInfo", {}).get("itemStruct")
+    if not item or "stats" not in item:
+        raise FetchError("missing_fields", "no itemStruct in rehydration data")
+    stats = item["stats"]
+    return {
+        "url": video_url,
+        "likes": str(stats.get("diggCount", 0)),
+        "comments": str(stats.get("commentCount", 0)),
+        "description": (item.get("desc") or "N/A")[:500],
+    }
+
+
+def parse_youtube_channel(text, channel_id, max_videos=20):
+    data = _yt_initial_data(text)
+    channel_name = next((m.get("title") for m in _walk(data, "channelMetadataRenderer")), None) or "N/A"
+
+    # Classic header has subscriberCountText; the newer page header only has a metadata text row
+    subscribers = next((t for t in map(_text, _walk(data, "subscriberCountText")) if t), None)
+    if subscribers is None:
+        subscribers = next((t for t in _walk(data, "content")
+                            if isinstance(t, str) and "subscriber" in t.lower() and any(c.isdigit() for c in t)), "N/A")
+
+    videos = []
+    for renderer in _walk(data, "videoRenderer"):
+        video_id = renderer.get("videoId")
+        title = _text(renderer.get("title"))
+        if not video_id or not title:
+            continue
+        videos.append({
+            "title": title.strip()[:200],
+            "views": (_text(renderer.get("viewCountText")) or "N/A").lower(),
+            "upload_time": (_text(renderer.get("publishedTimeText")) or "N/A").lower(),
+            "url": f"{BASE_URLS['youtube']}/watch?v={video_id}",
+        })
+        if len(videos) >= max_videos:
+            break
+    if not videos:
+        raise FetchError("missing_fields", "no videoRenderer entries in ytInitialData")
+    return {"channel_name": channel_name, "subscribers": subscribers, "videos": videos}
+
+
+# (platform, page kind) -> (url template, parser); {base} is BASE_URLS[platform]. Register more to extend the fast path
+PARSERS = {
+    ("tiktok", "profile"): ("{base}/@{key}", parse_tiktok_profile),
+    ("tiktok", "video"): ("{key}", parse_tiktok_video),
+    ("youtube", "channel"): ("{base}/@{key}/videos", parse_youtube_channel),
+}
+
+
+def register_parser(platform, kind, url_template, parser):
+    PARSERS[(platform, kind)] = (url_template, parser)
+
+
+def _empty_bucket():
+    return {"attempts": 0, "http_ok": 0, "escalations": 0, "total_http_ms": 0.0,
+            "reasons": defaultdict(int)}
+
+
+class FetchMetrics:
+    """Per-platform counts of HTTP fast-path hits and browser escalations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_platform = defaultdict(_empty_bucket)
+
+    def record(self, platform, kind, ok, elapsed_ms, reason=None):
+        with self._lock:
+            for key in (platform, f"{platform}.{kind}"):
+                bucket = self._by_platform[key]
+                bucket["attempts"] += 1
+                bucket["total_http_ms"] += elapsed_ms
+                if ok:
+                    bucket["http_ok"] += 1
+                else:
+                    bucket["escalations"] += 1
+                    bucket["reasons"][reason] += 1
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for key, bucket in self._by_platform.items():
+                attempts = bucket["attempts"]
+                out[key] = {
+                    "attempts": attempts,
+                    "http_ok": bucket["http_ok"],
+                    "escalations": bucket["escalations"],
+                    "escalation_rate": round(bucket["escalations"] / attempts, 4) if attempts else 0.0,
+                    "avg_http_ms": round(bucket["total_http_ms"] / attempts, 1) if attempts else 0.0,
+                    "reasons": dict(bucket["reasons"]),
+                }
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._by_platform.clear()
+
+
+FETCH_METRICS = FetchMetrics()
+
+
+def http_enabled():
+    return SCRAPE_BACKEND in ("auto", "http")
+
+
+def browser_enabled():
+    return SCRAPE_BACKEND in ("auto", "browser")
+
+
+# A browser would not do better than HTTP for these, so fetch() re-raises them
+FINAL_REASONS = ("not_found", "private")
+
+
+def fetch(platform, kind, key, raise_reasons=FINAL_REASONS, **parser_kwargs):
+    """Fetch and parse one page over HTTP; returns the parsed dict or None to escalate.
+
+    FetchError is re-raised when its reason is in ``raise_reasons``.
+    """
+    if not http_enabled():
+        return None
+    url_template, parser = PARSERS[(platform, kind)]
+    url = url_template.format(base=BASE_URLS[platform], key=key)
+    start = time.perf_counter()
+    try:
+        text = fetch_html(url)
+        if fixtures.recording_enabled():
+            fixtures.save_page(platform, kind, url, text)
+        result = parser(text, key, **parser_kwargs)
+    except FetchError as e:
+        FETCH_METRICS.record(platform, kind, False, (time.perf_counter() - start) * 1000, e.reason)
+        print(f"[FETCH] {platform} {kind} via HTTP failed ({e.reason}): {e}")
+        if e.reason in raise_reasons:
+            raise
+        return None
+    except Exception as e:
+        FETCH_METRICS.record(platform, kind, False, (time.perf_counter() - start) * 1000, "parse_error")
+        print(f"[FETCH] {platform} {kind} via HTTP failed (parse_error): {e}")
+        return None
+    FETCH_METRICS.record(platform, kind, True, (time.perf_counter() - start) * 1000)
+    return result
+
+
+# Page fetched by the pre-flight probe and the handle syntax each platform accepts
+PROBE_KINDS = {"tiktok": "profile", "youtube": "channel"}
+HANDLE_PATTERNS = {
+    "tiktok": re.compile(r"^[A-Za-z0-9_.]{2,24}$"),
+    "youtube": re.compile(r"^[A-Za-z0-9_.\-]{3,30}$"),
+}
+PROBE_STATUSES = {"not_found": "missing", "private": "private", "rate_limited": "rate_limited"}
+
+
+class ProbeCache:
+    """Negative pre-flight results (missing / private / rate_limited) with per-entry expiry"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._counts = defaultdict(int)
+
+    def get(self, platform, handle):
+        key = (platform, handle.lower())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires_at"] > time.time():
+                self._counts["cache_hits"] += 1
+                return entry["result"]
+            self._entries.pop(key, None)
+            return None
+
+    def put(self, platform, handle, result, ttl_s):
+        with self._lock:
+            self._entries[(platform, handle.lower())] = {"result": result, "expires_at": time.time() + ttl_s}
+
+    def count(self, status):
+        with self._lock:
+            self._counts[status] += 1
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            live = sum(1 for e in self._entries.values() if e["expires_at"] > now)
+            return {"cached_negatives": live, "counts": dict(self._counts)}
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._counts.clear()
+
+
+PROBE_CACHE = ProbeCache()
+
+
+def probe_profile(platform, handle):
+    """Classify a handle as existing, private, missing or rate_limited before any browser starts.
+
+    Returns {"status", "reason", "retry_after", "cached", "elapsed_ms", "data"}; ``data`` is the
+    parsed page when it already came back over HTTP. "unknown" means the browser has to decide.
+    """
+    start = time.perf_counter()
+    cached = PROBE_CACHE.get(platform, handle)
+    if cached is not None:
+        return dict(cached, cached=True, elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+
+    result = {"status": "unknown", "reason": None, "retry_after": None, "data": None}
+    ttl = None
+    if not HANDLE_PATTERNS[platform].match(handle):
+        result.update(status="missing", reason="invalid_handle")
+        ttl = PROBE_NEGATIVE_TTL_S
+    else:
+        try:
+            result["data"] = fetch(platform, PROBE_KINDS[platform], handle,
+                                   raise_reasons=FINAL_REASONS + ("rate_limited",))
+            if result["data"] is not None:
+                result["status"] = "existing"
+        except FetchError as e:
+            result.update(status=PROBE_STATUSES[e.reason], reason=e.reason, retry_after=e.retry_after)
+            ttl = (e.retry_after or PROBE_RATE_LIMIT_TTL_S) if e.reason == "rate_limited" else PROBE_NEGATIVE_TTL_S
+
+    if ttl:
+        PROBE_CACHE.put(platform, handle, result, ttl)
+    PROBE_CACHE.count(result["status"])
+    print(f"[FETCH] Probe {platform} {handle}: {result['status']}")
+    return dict(result, cached=False, elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+
+
+def probe_error(probe, noun="Profile"):
+    """User-facing message for a probe that rules out scraping, else None"""
+    if probe["status"] == "missing":
+        return f"{noun} doesn't exist." if probe["reason"] != "invalid_handle" else f"{noun} is not a valid handle."
+    if probe["status"] == "private":
+        return f"{noun} is private."
+    if probe["status"] == "rate_limited":
+        return f"Rate limited by the site, retry in {int(probe['retry_after'] or PROBE_RATE_LIMIT_TTL_S)}s."
+    return None
+
+
+def get_fetch_metrics():
+    return {"backend": SCRAPE_BACKEND, "platforms": FETCH_METRICS.snapshot(), "probe": PROBE_CACHE.snapshot()}
@@ -0,0 +1,93 @@
+"""
+Recorded-page fixture corpus for replaying scrapes offline.
+
+Turn recording on and every page the scrapers load (over HTTP or in Chrome)
+is saved with its URL path, so fake_site_server.py can serve it back:
+
+    FIXTURE_RECORD_DIR=fixtures python scraper.py <username> --full
+    FIXTURE_RECORD_DIR=fixtures python scraper_yt.py <channel_id>
+    python fixtures.py list fixtures
+
+Pages are stored as fixtures/<platform>/<kind>/<slug>.html plus one
+manifest.json per corpus that maps request paths to files.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit
+
+RECORD_DIR = os.environ.get("FIXTURE_RECORD_DIR")
+MANIFEST = "manifest.json"
+
+_lock = threading.Lock()
+
+
+def recording_enabled():
+    return bool(RECORD_DIR)
+
+
+def _slug(path):
+    cleaned = re.sub(r"[^A-Za-z0-9._-]+", "_", path.strip("/")) or "index"
+    return f"{cleaned[:80]}-{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}"
+
+
+def load_manifest(corpus_dir):
+    """{"<platform> <path>": {"file", "kind", "source_url", "recorded_at", "bytes"}}"""
+    path = os.path.join(corpus_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_page(platform, kind, url, content, corpus_dir=None):
+    """Add one page to the corpus, replacing an earlier recording of the same path"""
+    corpus_dir = corpus_dir or RECORD_DIR
+    if not corpus_dir or not content:
+        return None
+    parts = urlsplit(url)
+    request_path = parts.path + (f"?{parts.query}" if parts.query else "")
+    rel = os.path.join(platform, kind, _slug(request_path) + ".html")
+    os.makedirs(os.path.join(corpus_dir, platform, kind), exist_ok=True)
+    with open(os.path.join(corpus_dir, rel), "w", encoding="utf-8") as f:
+        f.write(content)
+
+    with _lock:
+        manifest = load_manifest(corpus_dir)
+        manifest[f"{platform} {request_path}"] = {
+            "file": rel,
+            "kind": kind,
+            "source_url": url,
+            "recorded_at": time.time(),
+            "bytes": len(content.encode("utf-8")),
+        }
+        tmp = os.path.join(corpus_dir, MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, os.path.join(corpus_dir, MANIFEST))
+    print(f"[FIXTURES] Recorded {platform} {kind} {request_path}")
+    return rel
+
+
+def record_driver_page(driver, platform, kind):
+    """Save the rendered DOM of the driver's current page (no-op unless recording)"""
+    if not recording_enabled():
+        return None
+    try:
+        return save_page(platform, kind, driver.current_url, driver.page_source)
+    except Exception as e:
+        print(f"[FIXTURES] ⚠️ Could not record {platform} {kind}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 3 and sys.argv[1] == "list":
+        for key, entry in sorted(load_manifest(sys.argv[2]).items()):
+            print(f"{key:60s} {entry['kind']:8s} {entry['bytes']:>9,d} B  {entry['file']}")
+    else:
+        print("Usage: python fixtures.py list <corpus_dir>")
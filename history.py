@@ -0,0 +1,191 @@
+"""
+Time-series history of profile stats and per-video counts.
+
+Every scrape appends one profile snapshot and one snapshot per video to
+narrow integer-only tables next to the creator store. Older rows are
+downsampled in place so history stays bounded:
+
+    newer than RAW_RETENTION_DAYS    every snapshot
+    up to DAILY_RETENTION_DAYS       last snapshot per day
+    older                            last snapshot per week
+
+    python history.py compact
+    python history.py show tiktok <username>
+"""
+import os
+import re
+import time
+import threading
+import pandas as pd
+import storage
+
+RAW_RETENTION_DAYS = float(os.environ.get("HISTORY_RAW_RETENTION_DAYS", 7))
+DAILY_RETENTION_DAYS = float(os.environ.get("HISTORY_DAILY_RETENTION_DAYS", 90))
+COMPACT_INTERVAL_S = float(os.environ.get("HISTORY_COMPACT_INTERVAL_S", 3600))
+# Reads wait at most this long for the creator's own queued snapshot (the one just scraped)
+READ_WRITE_WAIT_S = 2.0
+
+DAY_S = 86_400
+WEEK_S = 7 * DAY_S
+
+PROFILE_COLUMNS = ["captured_at", "followers", "following", "total_likes", "video_count"]
+VIDEO_COLUMNS = ["video_key", "captured_at", "likes", "comments", "views"]
+
+# Counts are stored as integers (NULL when the scraper saw "N/A"); timestamps as epoch seconds
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile_snapshots (
+    creator_id   INTEGER NOT NULL REFERENCES creators(id),
+    captured_at  INTEGER NOT NULL,
+    followers    INTEGER,
+    following    INTEGER,
+    total_likes  INTEGER,
+    video_count  INTEGER,
+    PRIMARY KEY (creator_id, captured_at)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS video_snapshots (
+    creator_id   INTEGER NOT NULL REFERENCES creators(id),
+    video_key    TEXT NOT NULL,
+    captured_at  INTEGER NOT NULL,
+    likes        INTEGER,
+    comments     INTEGER,
+    views        INTEGER,
+    PRIMARY KEY (creator_id, video_key, captured_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_video_snapshots_time ON video_snapshots (creator_id, captured_at);
+"""
+
+_COUNT_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kmb])?", re.IGNORECASE)
+_SUFFIX = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+_last_compaction = {}
+
+
+def parse_count(value):
+    """'1.2M followers' / '3,401 views' / '12K' -> int, None when there is no number"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _COUNT_RE.search(str(value))
+    if not match:
+        return None
+    number = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    return int(number * _SUFFIX.get(suffix, 1))
+
+
+def _connect():
+    conn = storage.connect()
+    with _schema_lock:
+        if storage.DB_PATH not in _initialized_paths:
+            conn.executescript(SCHEMA)
+            _initialized_paths.add(storage.DB_PATH)
+    return conn
+
+
+def record_snapshot(platform, handle, profile, videos, captured_at=None):
+    """Append a profile snapshot and per-video count snapshots for one scrape.
+
+    ``profile`` is the scraper's stats dict (followers/subscribers, following,
+    total_likes); ``videos`` is a list of row dicts or a DataFrame.
+    """
+    captured_at = int(captured_at or time.time())
+    if isinstance(videos, pd.DataFrame):
+        videos = videos.to_dict("records")
+    videos = videos or []
+    _connect()
+    with storage.transaction() as conn:
+        creator_id = storage._creator_id(conn, platform, handle)
+        conn.execute(
+            """INSERT OR REPLACE INTO profile_snapshots
+               (creator_id, captured_at, followers, following, total_likes, video_count)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (creator_id, captured_at,
+             parse_count(profile.get("followers", profile.get("subscribers"))),
+             parse_count(profile.get("following")),
+             parse_count(profile.get("total_likes")),
+             len(videos)),
+        )
+        conn.executemany(
+            """INSERT OR REPLACE INTO video_snapshots
+               (creator_id, video_key, captured_at, likes, comments, views)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [(creator_id, storage.video_key(row), captured_at, parse_count(row.get("likes")),
+              parse_count(row.get("comments")), parse_count(row.get("views")))
+             for row in videos if storage.video_key(row)],
+        )
+
+    if time.time() - _last_compaction.get(storage.DB_PATH, 0) > COMPACT_INTERVAL_S:
+        compact()
+    return captured_at
+
+
+def _compact_table(conn, table, key_columns, start, end, bucket_s):
+    """Keep only the last snapshot per key and bucket for captured_at in [start, end)"""
+    keys = ", ".join(key_columns)
+    cursor = conn.execute(
+        f"""DELETE FROM {table}
+            WHERE captured_at >= ? AND captured_at < ?
+              AND ({keys}, captured_at) NOT IN (
+                  SELECT {keys}, MAX(captured_at) FROM {table}
+                  WHERE captured_at >= ? AND captured_at < ?
+                  GROUP BY {keys}, captured_at / ?
+              )""",
+        (start, end, start, end, bucket_s),
+    )
+    return cursor.rowcount
+
+
+def compact(now=None):
+    """Downsample old snapshots (daily, then weekly); returns rows removed per table"""
+    now = int(now or time.time())
+    raw_cutoff = now - int(RAW_RETENTION_DAYS * DAY_S)
+    daily_cutoff = now - int(DAILY_RETENTION_DAYS * DAY_S)
+    removed = {}
+    _connect()
+    with storage.transaction() as conn:
+        for table, keys in (("profile_snapshots", ["creator_id"]),
+                            ("video_snapshots", ["creator_id", "video_key"])):
+            removed[table] = (
+                _compact_table(conn, table, keys, daily_cutoff, raw_cutoff, DAY_S)
+                + _compact_table(conn, table, keys, 0, daily_cutoff, WEEK_S)
+            )
+    _last_compaction[storage.DB_PATH] = time.time()
+    if any(removed.values()):
+        print(f"[HISTORY] Compacted snapshots: {removed}")
+    return removed
+
+
+def _range_query(table, columns, platform, handle, since=None, until=None, wait_s=READ_WRITE_WAIT_S):
+    storage.wait_for_writes(platform, handle, timeout=wait_s)
+    creator_id = storage.find_creator_id(platform, handle)
+    if creator_id is None:
+        return pd.DataFrame(columns=columns)
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE creator_id = ? AND captured_at >= ? AND captured_at <= ?"
+    params = [creator_id, int(since or 0), int(until or time.time())]
+    rows = _connect().execute(sql + " ORDER BY captured_at", params).fetchall()
+    return pd.DataFrame([tuple(r) for r in rows], columns=columns)
+
+
+def profile_history(platform, handle, since=None, until=None, wait_s=READ_WRITE_WAIT_S):
+    """Profile snapshots for a creator between since and until (epoch seconds), oldest first"""
+    return _range_query("profile_snapshots", PROFILE_COLUMNS, platform, handle, since, until, wait_s)
+
+
+def video_history(platform, handle, since=None, until=None, wait_s=READ_WRITE_WAIT_S):
+    """Per-video snapshots for a creator between since and until (epoch seconds), oldest first"""
+    return _range_query("video_snapshots", VIDEO_COLUMNS, platform, handle, since, until, wait_s)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "compact":
+        print(f"Removed: {compact()}")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "show":
+        print(profile_history(sys.argv[2], sys.argv[3]).to_string(index=False))
+    else:
+        print("Usage: python history.py compact | show <tiktok|youtube> <handle>")
@@ -0,0 +1,250 @@
+"""
+Scrape/analysis jobs behind the HTTP endpoints.
+
+Each job takes plain arguments (no Flask request) and returns the JSON payload
+the endpoint sends, with "status" set to "success" or "error". That lets the
+scheduler run them on its worker threads and the batch endpoint reuse them.
+"""
+import os
+import time
+import logging
+import traceback
+from concurrent.futures import as_completed
+from deadline import Deadline, TIKTOK_REQUEST_BUDGET_S, YOUTUBE_REQUEST_BUDGET_S
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 100))
+BATCH_PLATFORMS = ("tiktok", "youtube")
+
+
+def creator_velocity(platform, handle, deadline=None):
+    """Velocity summary from scrape history; None when it cannot be computed"""
+    try:
+        from velocity import creator_velocity as compute_velocity
+        from history import READ_WRITE_WAIT_S
+        wait_s = READ_WRITE_WAIT_S if deadline is None else min(READ_WRITE_WAIT_S, deadline.remaining())
+        return compute_velocity(platform, handle, wait_s=wait_s)
+    except Exception as e:
+        logger.warning(f"Velocity unavailable for {platform}:{handle}: {e}")
+        return None
+
+
+def analyze_tiktok(username, full_scrape=False, deadline=None):
+    """Scrape a TikTok profile and analyze it (the /api/tiktok/analyze payload)"""
+    deadline = deadline or Deadline(TIKTOK_REQUEST_BUDGET_S)
+    try:
+        logger.info(f"Starting TikTok scrape for username: {username}")
+
+        # Import here to avoid import errors on startup
+        try:
+            from scraper import scrape_tiktok
+            from analyzer import run_analysis
+        except ImportError as e:
+            logger.error(f"Import error: {e}")
+            return {
+                "status": "error",
+                "message": f"Missing dependencies: {str(e)}. Please install: pip install -r requirements.txt"
+            }
+
+        # Run scraper
+        logger.info("Running TikTok scraper...")
+        profile_stats = scrape_tiktok(username, incremental=not full_scrape, deadline=deadline)
+
+        if "error" in profile_stats:
+            return {
+                "status": "error",
+                "message": profile_stats["error"],
+                "degraded": deadline.degraded
+            }
+
+        # Run analysis
+        logger.info("Running TikTok analysis...")
+        analysis = run_analysis(username, videos=profile_stats.pop("videos", None), deadline=deadline)
+
+        if "error" in analysis:
+            return {
+                "status": "error",
+                "message": analysis["error"]
+            }
+
+        # Prepare successful response with proper structure
+        response_data = {
+            "status": "success",
+            "message": f"TikTok data for @{username} analyzed successfully!",
+            "stats": {
+                "username": username,
+                "name": profile_stats.get("name", "N/A"),
+                "followers": profile_stats.get("followers", "N/A"),
+                "following": profile_stats.get("following", "N/A"),
+                "total_likes": profile_stats.get("total_likes", "N/A"),
+                "engagement": profile_stats.get("engagement_rate", "N/A"),
+                "scrape_mode": profile_stats.get("scrape_mode", "full"),
+                "new_videos": profile_stats.get("new_videos", 0),
+                "refreshed_videos": profile_stats.get("refreshed_videos", 0),
+            },
+            "metrics": {
+                "avg_engagement": analysis.get("average_engagement_rate", 0),
+                "mean_views": analysis.get("mean_views", 0),
+                "num_videos": analysis.get("num_videos", 0),
+            },
+            "recommendations": analysis.get("recommendations", []),
+            "content_plan": analysis.get("plan", []),
+            "top_clips": analysis.get("top_clips", []),
+            "bottom_clips": analysis.get("bottom_clips", []),
+            "core_keywords": analysis.get("core_keywords", []),
+            "trending_keywords": analysis.get("trending_keywords", []),
+            "velocity": creator_velocity("tiktok", username, deadline),
+            "degraded": deadline.degraded,
+            "elapsed_s": round(deadline.elapsed(), 2)
+        }
+
+        logger.info("TikTok analysis completed successfully")
+        return response_data
+
+    except Exception as e:
+        logger.error(f"TikTok scrape endpoint error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return {
+            "status": "error",
+            "message": f"Server error: {str(e)}"
+        }
+
+
+def scrape_youtube(channel_id, deadline=None):
+    """Scrape a YouTube channel into the creator store (the /scrape_youtube payload)"""
+    deadline = deadline or Deadline(YOUTUBE_REQUEST_BUDGET_S)
+    logger.info(f"Starting YouTube scrape for channel: {channel_id}")
+
+    # Import here to avoid import errors on startup
+    try:
+        from scraper_yt import get_youtube_channel_stats
+    except ImportError as e:
+        logger.error(f"Import error: {e}")
+        return {
+            "status": "error",
+            "message": f"Missing YouTube scraper dependencies: {str(e)}"
+        }
+
+    # Run YouTube scraper
+    logger.info("Running YouTube scraper...")
+    try:
+        result = get_youtube_channel_stats(channel_id, deadline=deadline)
+
+        if result and "error" in result:
+            return {
+                "status": "error",
+                "message": result["error"]
+            }
+
+        # The creator store write runs in the background; report what was scraped
+        video_count = result.get("video_count", 0)
+        if not video_count:
+            return {
+                "status": "error",
+                "message": "Scraping completed but no videos were found."
+            }
+
+        logger.info("YouTube scraping completed successfully")
+        return {
+            "status": "success",
+            "message": f"YouTube channel @{channel_id} scraped successfully!",
+            "channel_id": channel_id,
+            "video_count": video_count,
+            "run_id": result.get("run_id"),
+            "degraded": deadline.degraded
+        }
+
+    except Exception as scrape_error:
+        logger.error(f"YouTube scraping failed: {str(scrape_error)}")
+        return {
+            "status": "error",
+            "message": f"YouTube scraping failed: {str(scrape_error)}"
+        }
+
+
+def analyze_youtube_full(channel_id, mode="multi", deadline=None):
+    """Scrape + analyze a YouTube channel (the /api/youtube/full payload)"""
+    deadline = deadline or Deadline(YOUTUBE_REQUEST_BUDGET_S)
+    logger.info(f"Starting full YouTube analysis for channel: {channel_id}")
+
+    # Import and run the complete workflow
+    try:
+        from scraper_yt import scrape_and_analyze
+
+        result = scrape_and_analyze(channel_id, mode=mode or "multi", deadline=deadline)
+
+        if "error" in result:
+            return {"status": "error", "message": result["error"]}
+
+        if "channel_info" in result:
+            result["velocity"] = creator_velocity("youtube", result["channel_info"]["channel_id"], deadline)
+        result["elapsed_s"] = round(deadline.elapsed(), 2)
+        logger.info("Full YouTube analysis completed successfully")
+        return result
+
+    except Exception as e:
+        logger.error(f"Analysis error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return {"status": "error", "message": f"Analysis failed: {str(e)}"}
+
+
+def batch_items(tiktok=(), youtube=()):
+    """Normalized, de-duplicated (platform, handle) pairs in request order"""
+    items = [("tiktok", str(u).strip().lstrip("@")) for u in tiktok or ()]
+    items += [("youtube", str(c).strip().replace("@", "")) for c in youtube or ()]
+    return list(dict.fromkeys(item for item in items if item[1]))
+
+
+def run_batch(tenant, items, full_scrape=False, mode="multi"):
+    """Analyze many creators as batch-priority scheduler jobs, yielding one record per creator as it finishes.
+
+    Each record is {"type": "result", "index", "platform", "handle", "status", "elapsed_s"} plus the
+    endpoint payload under "result", or "message" when the item failed; a failed item does not stop the others. The last record is
+    {"type": "summary"}. Closing the generator early cancels items that have not started yet.
+    """
+    import scheduler
+
+    start = time.monotonic()
+    futures = {}
+    counts = {"success": 0, "error": 0}
+
+    def record(index, status, **fields):
+        counts["success" if status == "success" else "error"] += 1
+        platform, handle = items[index]
+        return {"type": "result", "index": index, "platform": platform, "handle": handle,
+                "status": status, "elapsed_s": round(time.monotonic() - start, 2), **fields}
+
+    rejected = []
+    for index, (platform, handle) in enumerate(items):
+        try:
+            if platform == "tiktok":
+                future = scheduler.submit(tenant, "batch", "tiktok", analyze_tiktok, handle, full_scrape=full_scrape)
+            else:
+                future = scheduler.submit(tenant, "batch", "youtube_full", analyze_youtube_full, handle, mode=mode)
+        except scheduler.JobRejected as e:
+            rejected.append(record(index, "error", message=f"Job rejected ({e.reason})",
+                                   retry_after=e.retry_after))
+            continue
+        futures[future] = index
+    logger.info(f"Batch for {tenant}: {len(futures)} queued, {len(rejected)} rejected")
+
+    try:
+        yield from rejected
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                payload = future.result()
+            except Exception as e:
+                logger.error(f"Batch item {items[index]} failed: {e}")
+                yield record(index, "error", message=f"Server error: {str(e)}")
+                continue
+            if payload.get("status") == "error":
+                yield record(index, "error", message=payload.get("message"))
+            else:
+                yield record(index, "success", result=payload)
+        yield {"type": "summary", "total": len(items), **counts, "elapsed_s": round(time.monotonic() - start, 2)}
+    finally:
+        cancelled = sum(future.cancel() for future in futures)
+        if cancelled:
+            logger.info(f"Batch for {tenant} closed early; cancelled {cancelled} queued items")
@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import defaultdict, deque
+
+# USD per 1M tokens as (prompt, completion); override with LLM_PRICE_<MODEL>="in,out"
+MODEL_PRICING = {
+    "deepseek-chat": (0.27, 1.10),
+    "deepseek-reasoner": (0.55, 2.19),
+}
+
+RECENT_CALLS_KEPT = 200
+# Completions in flight at once across all scrapes in this process (batch runs would otherwise burst the API)
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+
+_llm_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+_current_creator = contextvars.ContextVar("llm_creator", default=None)
+
+
+def _model_price(model):
+    """Return (prompt, completion) USD price per 1M tokens for a model"""
+    override = os.environ.get(f"LLM_PRICE_{model.upper().replace('-', '_')}")
+    if override:
+        try:
+            prompt_price, completion_price = (float(p) for p in override.split(","))
+            return prompt_price, completion_price
+        except ValueError:
+            pass
+    return MODEL_PRICING.get(model, (0.0, 0.0))
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimate the USD cost of a single completion"""
+    prompt_price, completion_price = _model_price(model)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _empty_bucket():
+    return {
+        "calls": 0,
+        "errors": 0,
+        "retries": 0,
+        "fallbacks": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_latency_s": 0.0,
+        "max_latency_s": 0.0,
+        "cost_usd": 0.0,
+    }
+
+
+class LLMMetrics:
+    """Thread-safe in-memory aggregator for LLM call records"""
+
+    def __init__(self, keep_recent=RECENT_CALLS_KEPT):
+        self._lock = threading.Lock()
+        self._by_endpoint = defaultdict(_empty_bucket)
+        self._by_creator = defaultdict(_empty_bucket)
+        self._recent = deque(maxlen=keep_recent)
+
+    def record_call(self, endpoint, model, prompt_version, latency_s,
+                    prompt_tokens=0, completion_tokens=0, retry=0, error=None, creator=None):
+        """Record one completed (or failed) LLM request"""
+        creator = creator or _current_creator.get() or "unknown"
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        record = {
+            "ts": time.time(),
+            "endpoint": endpoint,
+            "creator": creator,
+            "model": model,
+            "prompt_version": prompt_version,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_s": round(latency_s, 4),
+            "retry": retry,
+            "fallback_used": False,
+            "cost_usd": cost,
+            "error": error,
+        }
+        with self._lock:
+            for bucket in (self._by_endpoint[endpoint], self._by_creator[creator]):
+                bucket["calls"] += 1
+                bucket["errors"] += 1 if error else 0
+                bucket["retries"] += 1 if retry else 0
+                bucket["prompt_tokens"] += prompt_tokens
+                bucket["completion_tokens"] += completion_tokens
+                bucket["total_latency_s"] += latency_s
+                bucket["max_latency_s"] = max(bucket["max_latency_s"], latency_s)
+                bucket["cost_usd"] += cost
+            self._recent.append(record)
+        return record
+
+    def record_fallback(self, endpoint, creator=None):
+        """Flag that an endpoint had to fall back to canned output"""
+        creator = creator or _current_creator.get() or "unknown"
+        with self._lock:
+            self._by_endpoint[endpoint]["fallbacks"] += 1
+            self._by_creator[creator]["fallbacks"] += 1
+            for record in reversed(self._recent):
+                if record["endpoint"] == endpoint and record["creator"] == creator:
+                    record["fallback_used"] = True
+                    break
+
+    @staticmethod
+    def _summarize(bucket):
+        summary = dict(bucket)
+        calls = bucket["calls"]
+        summary["avg_latency_s"] = round(bucket["total_latency_s"] / calls, 4) if calls else 0.0
+        summary["total_latency_s"] = round(bucket["total_latency_s"], 4)
+        summary["max_latency_s"] = round(bucket["max_latency_s"], 4)
+        summary["cost_usd"] = round(bucket["cost_usd"], 6)
+        return summary
+
+    def snapshot(self, recent=20):
+        """Return aggregates per endpoint and per creator plus the latest calls"""
+        with self._lock:
+            return {
+                "endpoints": {k: self._summarize(v) for k, v in self._by_endpoint.items()},
+                "creators": {k: self._summarize(v) for k, v in self._by_creator.items()},
+                "recent_calls": list(self._recent)[-recent:] if recent else [],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._by_endpoint.clear()
+            self._by_creator.clear()
+            self._recent.clear()
+
+
+METRICS = LLMMetrics()
+
+
+@contextmanager
+def creator_scope(creator):
+    """Attribute every LLM call made inside the block to a creator"""
+    token = _current_creator.set(creator)
+    try:
+        yield
+    finally:
+        _current_creator.reset(token)
+
+
+def tracked_completion(client, endpoint, prompt_version, retry=0, **kwargs):
+    """Call client.chat.completions.create and record tokens, latency and errors.
+
+    At most LLM_MAX_CONCURRENCY calls run at once; latency excludes the wait for a slot.
+    """
+    model = kwargs.get("model", "unknown")
+    with _llm_slots:
+        start = time.perf_counter()
+        try:
+            resp = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            METRICS.record_call(endpoint, model, prompt_version, time.perf_counter() - start,
+                                retry=retry, error=str(e)[:200])
+            raise
+    usage = getattr(resp, "usage", None)
+    METRICS.record_call(
+        endpoint, model, prompt_version, time.perf_counter() - start,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        retry=retry,
+    )
+    return resp
+
+
+def record_fallback(endpoint):
+    METRICS.record_fallback(endpoint)
+
+
+def get_llm_metrics(recent=20):
+    return {"max_concurrency": LLM_MAX_CONCURRENCY, **METRICS.snapshot(recent=recent)}
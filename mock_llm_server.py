@@ -0,0 +1,284 @@
+"""
+Local stand-in for the DeepSeek/OpenAI chat-completions API.
+
+Start it and point the analyzers at it:
+
+    python mock_llm_server.py --port 8001 --latency-ms 300 --error-rate 0.05
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8001 python app.py
+
+Or benchmark run_analysis / run_youtube_analysis under concurrency:
+
+    python mock_llm_server.py bench --concurrency 8 --runs 32
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+# Fault injection knobs, adjustable per process via CLI flags or env vars
+CONFIG = {
+    "latency_ms": float(os.environ.get("MOCK_LLM_LATENCY_MS", 0)),
+    "jitter_ms": float(os.environ.get("MOCK_LLM_JITTER_MS", 0)),
+    "error_rate": float(os.environ.get("MOCK_LLM_ERROR_RATE", 0)),
+    "truncate_rate": float(os.environ.get("MOCK_LLM_TRUNCATE_RATE", 0)),
+}
+
+_TOPIC_POOL = ["lifestyle", "comedy", "education", "fitness", "food", "travel", "tech", "music", "beauty", "gaming"]
+_KEYWORD_POOL = ["morning routine", "budget tips", "quick recipe", "workout", "storytime", "tutorial",
+                 "review", "challenge", "behind the scenes", "day in my life", "hacks", "unboxing"]
+_VIBE_POOL = ["educational", "entertaining", "energetic", "calm", "witty", "authentic", "curious", "polished"]
+
+
+def _rng(messages):
+    """Seed a RNG from the prompt so identical requests get identical answers"""
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _pick(rng, pool, k):
+    return rng.sample(pool, min(k, len(pool)))
+
+
+def _topics_response(rng, user_msg):
+    descriptions = user_msg.split("Descriptions:\n", 1)[-1].split("\n---\n")
+    lines = []
+    for _ in descriptions:
+        lines.append(json.dumps({
+            "topics": _pick(rng, _TOPIC_POOL, 2),
+            "keywords": _pick(rng, _KEYWORD_POOL, 3),
+        }))
+    return "\n".join(lines)
+
+
+def _tiktok_ideas_response(rng, user_msg):
+    n = _requested_count(user_msg, default=8)
+    lines = []
+    for i in range(n):
+        topic = rng.choice(_TOPIC_POOL)
+        lines.append(json.dumps({
+            "hook": f"Why nobody talks about this {topic} secret #{i + 1}",
+            "content": f"Film a quick {topic} breakdown with one surprising twist",
+            "cta": "Comment your take below",
+            "hashtags": ["fyp", topic, "viral"],
+        }))
+    return "\n".join(lines)
+
+
+def _signature_response(rng, user_msg):
+    return json.dumps({
+        "vibes": _pick(rng, _VIBE_POOL, 4),
+        "topics": _pick(rng, _TOPIC_POOL, 6),
+        "keywords": _pick(rng, _KEYWORD_POOL, 10),
+    }, indent=2)
+
+
+def _one_shot_response(rng, user_msg):
+    head = user_msg.split('"video_ideas": ', 1)[-1].split(" ", 1)[0]
+    n_ideas = int(head) if head.isdigit() else 10
+    return json.dumps({
+        "signature": json.loads(_signature_response(rng, user_msg)),
+        "video_ideas": [f"{rng.choice(_TOPIC_POOL)} challenge: what I learned in 7 days (part {i + 1})"
+                        for i in range(n_ideas)],
+        "growth_tips": [f"Post a weekly {rng.choice(_TOPIC_POOL)} short that links to the full video"
+                        for _ in range(6)],
+    }, indent=2)
+
+
+def _bullets_response(rng, user_msg, template):
+    n = _requested_count(user_msg, default=5)
+    return "\n".join(f"- {template.format(topic=rng.choice(_TOPIC_POOL), i=i + 1)}" for i in range(n))
+
+
+def _requested_count(user_msg, default):
+    for marker in ("Generate ", "Provide "):
+        if marker in user_msg:
+            head = user_msg.split(marker, 1)[1].split(" ", 1)[0]
+            if head.isdigit():
+                return int(head)
+    return default
+
+
+# (marker found in system+user text, responder) - first match wins
+PROMPT_HANDLERS = [
+    ("complete channel report", _one_shot_response),
+    ("social-media expert", _topics_response),
+    ("viral content strategist", _tiktok_ideas_response),
+    ("Update the channel signature", _signature_response),
+    ("YouTube analytics expert", _signature_response),
+    ("creative strategist for a YouTube channel",
+     lambda rng, msg: _bullets_response(rng, msg, "{topic} challenge: what I learned in 7 days (part {i})")),
+    ("YouTube growth consultant",
+     lambda rng, msg: _bullets_response(rng, msg, "Post a weekly {topic} short that links to the full video")),
+]
+
+
+def _respond(messages):
+    rng = _rng(messages)
+    text = "\n".join(m.get("content", "") for m in messages)
+    user_msg = messages[-1].get("content", "") if messages else ""
+    for marker, handler in PROMPT_HANDLERS:
+        if marker in text:
+            return handler(rng, user_msg)
+    return "OK"
+
+
+def _count_tokens(text):
+    # Close enough to BPE counts for English prompts
+    return max(1, len(text) // 4)
+
+
+@app.route("/chat/completions", methods=["POST"])
+@app.route("/v1/chat/completions", methods=["POST"])
+def chat_completions():
+    body = request.get_json(force=True, silent=True) or {}
+    messages = body.get("messages", [])
+
+    delay = CONFIG["latency_ms"] + random.uniform(0, CONFIG["jitter_ms"])
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+    if random.random() < CONFIG["error_rate"]:
+        status = random.choice([429, 500, 503])
+        return jsonify({"error": {"message": f"Injected mock error ({status})", "type": "mock_error"}}), status
+
+    content = _respond(messages)
+    finish_reason = "stop"
+    if random.random() < CONFIG["truncate_rate"]:
+        content = content[:max(1, len(content) // 2)]
+        finish_reason = "length"
+
+    prompt_tokens = sum(_count_tokens(m.get("content", "")) for m in messages)
+    completion_tokens = _count_tokens(content)
+    return jsonify({
+        "id": f"mock-{hashlib.md5(content.encode('utf-8')).hexdigest()[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "deepseek-chat"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason,
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    })
+
+
+@app.route("/models", methods=["GET"])
+@app.route("/v1/models", methods=["GET"])
+def models():
+    return jsonify({"object": "list", "data": [{"id": "deepseek-chat", "object": "model"}]})
+
+
+def start_in_thread(host="127.0.0.1", port=8001):
+    """Run the mock server in a daemon thread and return its base URL"""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{port}"
+
+
+def _seed_bench_creators(runs):
+    """Store synthetic TikTok and YouTube creators for the benchmark runs"""
+    import storage
+
+    for i in range(runs):
+        storage.upsert_videos("tiktok", f"bench{i}", [{
+            "url": f"https://www.tiktok.com/@bench{i}/video/{j}",
+            "likes": f"{random.randint(1, 900)}K",
+            "comments": str(random.randint(10, 5000)),
+            "description": f"Day {j} of my {random.choice(_TOPIC_POOL)} journey #fyp #{random.choice(_TOPIC_POOL)}",
+        } for j in range(15)])
+        storage.upsert_videos("youtube", f"bench{i}", [{
+            "title": f"I tried {random.choice(_KEYWORD_POOL)} for {j + 1} days",
+            "views": f"{random.randint(1, 900)}K views",
+            "upload_time": f"{j + 1} days ago",
+            "url": f"https://www.youtube.com/watch?v=bench{i}x{j}",
+        } for j in range(20)])
+
+
+def run_benchmark(concurrency=4, runs=16, base_url=None):
+    """Measure run_analysis / run_youtube_analysis throughput against the mock server"""
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    base_url = base_url or start_in_thread()
+    os.environ["DEEPSEEK_BASE_URL"] = base_url
+    workdir = tempfile.mkdtemp(prefix="trendlytics_bench_")
+    os.environ["TRENDLYTICS_DB"] = os.path.join(workdir, "bench.db")
+
+    # Imported late so the analyzers and store pick up the env overrides
+    from analyzer import run_analysis
+    from youtubeanalyzer import run_youtube_analysis
+    from llm_metrics import get_llm_metrics
+
+    _seed_bench_creators(runs)
+
+    results = {}
+    jobs = {
+        "run_analysis": lambda i: run_analysis(f"bench{i}"),
+        "run_youtube_analysis": lambda i: run_youtube_analysis(channel_id=f"bench{i}"),
+    }
+    for name, job in jobs.items():
+        latencies = []
+
+        def timed(i):
+            start = time.perf_counter()
+            out = job(i)
+            latencies.append(time.perf_counter() - start)
+            return "error" not in out
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            ok = sum(pool.map(timed, range(runs)))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        results[name] = {
+            "runs": runs,
+            "ok": ok,
+            "concurrency": concurrency,
+            "wall_s": round(elapsed, 3),
+            "throughput_per_s": round(runs / elapsed, 3) if elapsed else 0,
+            "p50_s": round(latencies[len(latencies) // 2], 3),
+            "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        }
+    results["llm"] = get_llm_metrics(recent=0)["endpoints"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("mode", nargs="?", choices=["serve", "bench"], default="serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    parser.add_argument("--truncate-rate", type=float, default=CONFIG["truncate_rate"])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=16)
+    args = parser.parse_args()
+
+    CONFIG.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        truncate_rate=args.truncate_rate,
+    )
+
+    if args.mode == "bench":
+        base_url = start_in_thread(args.host, args.port)
+        print(json.dumps(run_benchmark(args.concurrency, args.runs, base_url), indent=2))
+    else:
+        print(f"Mock LLM server on http://{args.host}:{args.port} config={CONFIG}")
+        app.run(host=args.host, port=args.port, threaded=True)
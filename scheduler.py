@@ -0,0 +1,326 @@
+"""
+Fair scheduling of scrape/analysis jobs across API clients (tenants).
+
+Jobs carry a tenant (X-Tenant-Id) and a priority class. Interactive jobs are
+always dispatched before batch jobs, and batch jobs may occupy at most
+SCHED_BATCH_MAX_WORKERS workers, so a request from a person never waits
+behind a backfill. Within a class, tenants share the workers by weighted fair
+queuing: each job gets a virtual finish tag of
+max(class clock, tenant's last tag) + 1 / weight and the smallest tag runs
+next, so a tenant with 200 queued usernames cannot starve one with a single
+request. Every dispatched job still goes through admission control before it
+starts a browser.
+
+    SCHED_WORKERS=4 SCHED_BATCH_MAX_WORKERS=3
+    SCHED_TENANT_WEIGHTS="agency-a:3,agency-b:1"   default weight 1
+    SCHED_TENANT_MAX_INFLIGHT=2                    running jobs per tenant, per priority class
+    SCHED_TENANT_MAX_QUEUED=200                    queued jobs per tenant
+    SCHED_TENANT_DAILY_QUOTA=0                     jobs per tenant per day, 0 = unlimited
+    SCHED_MAX_QUEUED=400                           queued jobs across all tenants
+    SCHED_MAX_QUEUE_WAIT_S=30                      interactive callers give up on a job not started by then
+    SCHED_TRUST_CLIENT_HEADERS=false               take tenant/priority from X-Tenant-Id/X-Priority
+
+The X-Tenant-Id and X-Priority headers are not authenticated, so by default
+the tenant is the client address and every request is interactive. Set
+SCHED_TRUST_CLIENT_HEADERS=true only behind a gateway that sets (and strips
+client-supplied) values for those headers.
+"""
+import os
+import time
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import admission
+
+PRIORITIES = ("interactive", "batch")
+WORKERS = int(os.environ.get("SCHED_WORKERS", admission.MAX_BROWSERS))
+BATCH_MAX_WORKERS = int(os.environ.get("SCHED_BATCH_MAX_WORKERS", max(1, WORKERS - 1)))
+TENANT_MAX_INFLIGHT = int(os.environ.get("SCHED_TENANT_MAX_INFLIGHT", 2))
+TENANT_MAX_QUEUED = int(os.environ.get("SCHED_TENANT_MAX_QUEUED", 200))
+TENANT_DAILY_QUOTA = int(os.environ.get("SCHED_TENANT_DAILY_QUOTA", 0))
+MAX_QUEUED = int(os.environ.get("SCHED_MAX_QUEUED", 400))
+MAX_QUEUE_WAIT_S = float(os.environ.get("SCHED_MAX_QUEUE_WAIT_S", 30))
+TRUST_CLIENT_HEADERS = os.environ.get("SCHED_TRUST_CLIENT_HEADERS", "false").lower() == "true"
+# A batch job refused by admission control goes back to the queue after this pause (at most)
+BATCH_ADMISSION_BACKOFF_S = 5.0
+RECENT_WAITS_KEPT = 500
+
+
+def _parse_weights(spec):
+    """'agency-a:3,agency-b:1' -> {"agency-a": 3.0, "agency-b": 1.0}"""
+    weights = {}
+    for part in spec.split(","):
+        if ":" in part:
+            tenant, weight = part.rsplit(":", 1)
+            weights[tenant.strip()] = float(weight)
+    return weights
+
+
+TENANT_WEIGHTS = _parse_weights(os.environ.get("SCHED_TENANT_WEIGHTS", ""))
+
+
+class JobRejected(Exception):
+    """Job not run; ``status`` is 429 (tenant quota) or 503 (scheduler queue full or queue wait too long)"""
+
+    def __init__(self, tenant, status, reason, retry_after):
+        super().__init__(f"{tenant}: {reason}")
+        self.tenant = tenant
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, tenant, priority, kind, fn, args, kwargs, tag):
+        self.tenant = tenant
+        self.priority = priority
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.tag = tag
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+        self.started = False
+
+
+def _empty_class_stats():
+    return {"submitted": 0, "dispatched": 0, "completed": 0, "failed": 0, "requeued": 0, "expired": 0,
+            "total_wait_s": 0.0, "max_wait_s": 0.0, "recent_waits": deque(maxlen=RECENT_WAITS_KEPT)}
+
+
+def _empty_tenant_stats():
+    return {"submitted": 0, "completed": 0, "failed": 0, "rejected": defaultdict(int), "day": None, "day_jobs": 0}
+
+
+class FairScheduler:
+    """Worker pool with strict interactive-over-batch priority and per-tenant WFQ inside each class"""
+
+    def __init__(self, workers=WORKERS, batch_max_workers=BATCH_MAX_WORKERS, tenant_weights=None,
+                 tenant_max_inflight=TENANT_MAX_INFLIGHT, tenant_max_queued=TENANT_MAX_QUEUED,
+                 tenant_daily_quota=TENANT_DAILY_QUOTA, max_queued=MAX_QUEUED, admission_controller=None):
+        self.workers = workers
+        self.batch_max_workers = batch_max_workers
+        self.tenant_weights = dict(TENANT_WEIGHTS if tenant_weights is None else tenant_weights)
+        self.tenant_max_inflight = tenant_max_inflight
+        self.tenant_max_queued = tenant_max_queued
+        self.tenant_daily_quota = tenant_daily_quota
+        self.max_queued = max_queued
+        self._admission = admission_controller
+        self._cond = threading.Condition()
+        self._queues = {p: defaultdict(deque) for p in PRIORITIES}
+        self._clock = {p: 0.0 for p in PRIORITIES}
+        self._last_tag = {p: defaultdict(float) for p in PRIORITIES}
+        self._running = {p: 0 for p in PRIORITIES}
+        self._tenant_running = {p: defaultdict(int) for p in PRIORITIES}
+        self._class_stats = {p: _empty_class_stats() for p in PRIORITIES}
+        self._tenant_stats = defaultdict(_empty_tenant_stats)
+        self._threads = []
+
+    @property
+    def admission(self):
+        return self._admission or admission.ADMISSION
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"sched-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _queued(self, tenant):
+        return sum(len(self._queues[p].get(tenant, ())) for p in PRIORITIES)
+
+    def _total_queued(self):
+        return sum(len(q) for p in PRIORITIES for q in self._queues[p].values())
+
+    def submit(self, tenant, priority, kind, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for a tenant; returns a Future. ``kind`` is the admission endpoint"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}")
+        with self._cond:
+            tenant_stats = self._tenant_stats[tenant]
+            today = time.strftime("%Y-%m-%d")
+            if tenant_stats["day"] != today:
+                tenant_stats["day"], tenant_stats["day_jobs"] = today, 0
+            if self._total_queued() >= self.max_queued:
+                tenant_stats["rejected"]["server_queue_full"] += 1
+                raise JobRejected(tenant, 503, "server_queue_full", retry_after=30)
+            if self._queued(tenant) >= self.tenant_max_queued:
+                tenant_stats["rejected"]["queue_full"] += 1
+                raise JobRejected(tenant, 429, "queue_full", retry_after=30)
+            if self.tenant_daily_quota and tenant_stats["day_jobs"] >= self.tenant_daily_quota:
+                tenant_stats["rejected"]["daily_quota"] += 1
+                raise JobRejected(tenant, 429, "daily_quota", retry_after=int(86_400 - time.time() % 86_400))
+
+            weight = self.tenant_weights.get(tenant, 1.0)
+            tag = max(self._clock[priority], self._last_tag[priority][tenant]) + 1.0 / weight
+            self._last_tag[priority][tenant] = tag
+            job = Job(tenant, priority, kind, fn, args, kwargs, tag)
+            self._queues[priority][tenant].append(job)
+            tenant_stats["submitted"] += 1
+            tenant_stats["day_jobs"] += 1
+            self._class_stats[priority]["submitted"] += 1
+            self._ensure_workers()
+            self._cond.notify()
+        return job.future
+
+    def _drop_cancelled(self, priority):
+        """Remove jobs whose caller gave up (see wait()) from the queue heads"""
+        for tenant in list(self._queues[priority]):
+            queue = self._queues[priority][tenant]
+            while queue and queue[0].future.cancelled():
+                queue.popleft()
+                self._class_stats[priority]["expired"] += 1
+            if not queue:
+                del self._queues[priority][tenant]
+
+    def _pick(self):
+        """Next job to run: interactive first, smallest finish tag among tenants under their class cap"""
+        for priority in PRIORITIES:
+            self._drop_cancelled(priority)
+            if priority == "batch" and self._running["batch"] >= self.batch_max_workers:
+                continue
+            best = None
+            for tenant, queue in self._queues[priority].items():
+                if queue and self._tenant_running[priority][tenant] < self.tenant_max_inflight:
+                    if best is None or queue[0].tag < best.tag:
+                        best = queue[0]
+            if best is not None:
+                queue = self._queues[priority][best.tenant]
+                queue.popleft()
+                if not queue:
+                    del self._queues[priority][best.tenant]
+                self._clock[priority] = best.tag
+                return best
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._pick()
+                while job is None:
+                    self._cond.wait()
+                    job = self._pick()
+                waited = time.monotonic() - job.enqueued_at
+                stats = self._class_stats[job.priority]
+                stats["dispatched"] += 1
+                stats["total_wait_s"] += waited
+                stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+                stats["recent_waits"].append(waited)
+                self._running[job.priority] += 1
+                self._tenant_running[job.priority][job.tenant] += 1
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._running[job.priority] -= 1
+                    self._tenant_running[job.priority][job.tenant] -= 1
+                    self._cond.notify_all()
+
+    def _run(self, job):
+        # A requeued batch job's Future is already RUNNING; only the first attempt may start it
+        if not job.started:
+            if not job.future.set_running_or_notify_cancel():
+                return
+            job.started = True
+        ticket = None
+        try:
+            if job.kind:
+                # Batch jobs leave admission slots free for interactive ones, and back off
+                # instead of sitting in the admission queue holding a worker
+                batch = job.priority == "batch"
+                ticket = self.admission.try_acquire(job.kind, max_wait_s=0 if batch else None, batch=batch)
+            result = job.fn(*job.args, **job.kwargs)
+        except admission.AdmissionRejected as e:
+            if job.priority == "batch":
+                # Backfill can wait: hold this worker briefly, then put the job back at its tenant's head
+                time.sleep(min(e.retry_after, BATCH_ADMISSION_BACKOFF_S))
+                self._requeue(job)
+                return
+            self._finish(job, error=e)
+        except Exception as e:
+            self._finish(job, error=e)
+        else:
+            self._finish(job, result=result)
+        finally:
+            if ticket is not None:
+                self.admission.release(ticket)
+
+    def _requeue(self, job):
+        with self._cond:
+            self._queues[job.priority][job.tenant].appendleft(job)
+            self._class_stats[job.priority]["requeued"] += 1
+            self._cond.notify()
+
+    def _finish(self, job, result=None, error=None):
+        with self._cond:
+            self._class_stats[job.priority]["failed" if error else "completed"] += 1
+            self._tenant_stats[job.tenant]["failed" if error else "completed"] += 1
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def snapshot(self):
+        with self._cond:
+            classes = {}
+            for priority in PRIORITIES:
+                stats = self._class_stats[priority]
+                waits = sorted(stats["recent_waits"])
+                classes[priority] = {
+                    "queued": sum(len(q) for q in self._queues[priority].values()),
+                    "running": self._running[priority],
+                    "submitted": stats["submitted"],
+                    "dispatched": stats["dispatched"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "requeued": stats["requeued"],
+                    "expired": stats["expired"],
+                    "avg_wait_s": round(stats["total_wait_s"] / stats["dispatched"], 3) if stats["dispatched"] else 0.0,
+                    "p95_wait_s": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                    "max_wait_s": round(stats["max_wait_s"], 3),
+                }
+            tenants = {
+                tenant: {
+                    "weight": self.tenant_weights.get(tenant, 1.0),
+                    "queued": self._queued(tenant),
+                    "running": {p: self._tenant_running[p][tenant] for p in PRIORITIES},
+                    "submitted": stats["submitted"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "jobs_today": stats["day_jobs"],
+                    "rejected": dict(stats["rejected"]),
+                }
+                for tenant, stats in self._tenant_stats.items()
+            }
+            return {
+                "workers": self.workers,
+                "batch_max_workers": self.batch_max_workers,
+                "tenant_max_inflight": self.tenant_max_inflight,
+                "tenant_max_queued": self.tenant_max_queued,
+                "tenant_daily_quota": self.tenant_daily_quota,
+                "max_queued": self.max_queued,
+                "classes": classes,
+                "tenants": tenants,
+            }
+
+
+SCHEDULER = FairScheduler()
+
+
+def submit(tenant, priority, kind, fn, *args, **kwargs):
+    return SCHEDULER.submit(tenant, priority, kind, fn, *args, **kwargs)
+
+
+def wait(future, kind, max_queue_wait_s=MAX_QUEUE_WAIT_S):
+    """Result of a submitted job; raises JobRejected (503) if it has not started within ``max_queue_wait_s``"""
+    try:
+        return future.result(timeout=max_queue_wait_s)
+    except FutureTimeout:
+        if future.cancel():
+            raise JobRejected(None, 503, "queue_timeout", retry_after=SCHEDULER.admission.retry_after(kind) if kind else 30)
+        return future.result()  # already running; the deadline bounds it from here
+
+
+def get_scheduler_stats():
+    return SCHEDULER.snapshot()
@@ -1,4 +1,3 @@
-import csv
 import time
 import random
 import undetected_chromedriver as uc
@@ -9,6 +8,14 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 import os
+import pandas as pd
+import storage
+import history
+import browser
+import driver_cache
+import fetch_backend
+import selector_stats
+from deadline import unlimited
 
 def _num(x):
     """Convert string numbers with K/M suffixes to integers"""
@@ -25,6 +32,95 @@ def _num(x):
     except (ValueError, TypeError):
         return 0
 
+# Fallback selector chains; selector_stats tries them best-first by observed hit rate
+LIKE_CHAIN = selector_stats.chain("tiktok.video.likes", [
+    "strong[data-e2e='like-count']",
+    "[data-e2e='like-count']",
+    ".like-count",
+], fallbacks=["*[title*='like']"])
+COMMENT_CHAIN = selector_stats.chain("tiktok.video.comments", [
+    "strong[data-e2e='comment-count']",
+    "[data-e2e='comment-count']",
+    ".comment-count",
+], fallbacks=["*[title*='comment']"])
+DESC_CHAIN = selector_stats.chain("tiktok.video.description", [
+    "[data-e2e='browse-video-desc']",
+    "[data-e2e='video-desc']",
+    ".video-meta-caption",
+    "h1[data-e2e='browse-video-desc']",
+], fallbacks=["meta[name='description']"])
+NAME_CHAIN = selector_stats.chain("tiktok.profile.name", [
+    "h1[data-e2e='user-title']",
+    "h2[data-e2e='user-title']",
+    ".share-title",
+], fallbacks=["h1"])
+FOLLOWERS_CHAIN = selector_stats.chain("tiktok.profile.followers", [
+    "[data-e2e='followers-count']",
+    ".number[title*='Follow']",
+], fallbacks=["*[title*='Follow']"])
+FOLLOWING_CHAIN = selector_stats.chain("tiktok.profile.following", [
+    "[data-e2e='following-count']",
+    ".number[title*='Following']"
+])
+TOTAL_LIKES_CHAIN = selector_stats.chain("tiktok.profile.total_likes", [
+    "[data-e2e='likes-count']",
+    ".number[title*='Like']"
+])
+
+
+def _element_text(driver, selector):
+    return driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+
+
+def _count_text(driver, selector):
+    elem = driver.find_element(By.CSS_SELECTOR, selector)
+    return elem.text.strip() or elem.get_attribute("title")
+
+
+def _description_text(driver, selector):
+    if "meta" in selector:
+        return driver.find_element(By.CSS_SELECTOR, selector).get_attribute("content")
+    return _element_text(driver, selector)
+
+# Request deadline: budget kept back for the analysis stages, and the least a scroll / video extraction needs
+ANALYSIS_RESERVE_S = float(os.environ.get("TIKTOK_ANALYSIS_RESERVE_S", 45))
+SCROLL_MIN_S = 5
+VIDEO_EXTRACT_MIN_S = 8
+
+# Incremental mode: stop scrolling after this many known videos in a row (pinned videos sit on top)
+KNOWN_STOP_STREAK = int(os.environ.get("TIKTOK_KNOWN_STOP_STREAK", 4))
+MAX_REFRESH_PER_RUN = int(os.environ.get("TIKTOK_MAX_REFRESH_PER_RUN", 5))
+
+
+def _parse_refresh_schedule(spec):
+    """'24:1,168:6,720:24,inf:168' -> [(max_age_hours, refresh_every_hours), ...]"""
+    schedule = []
+    for part in spec.split(","):
+        age, every = part.split(":")
+        schedule.append((float(age), float(every)))
+    return sorted(schedule)
+
+
+# Re-extract a known video once it is older than refresh_every since its last scrape;
+# young videos still move a lot, old ones barely change
+REFRESH_SCHEDULE = _parse_refresh_schedule(
+    os.environ.get("TIKTOK_REFRESH_SCHEDULE", "24:1,168:6,720:24,inf:168")
+)
+
+
+def refresh_due(known, now=None, limit=MAX_REFRESH_PER_RUN):
+    """Known video URLs whose counts are due for a refresh, newest videos first"""
+    now = now or time.time()
+    due = []
+    for url, (first_seen, last_seen) in known.items():
+        age_h = (now - first_seen) / 3600
+        every_h = next((every for max_age, every in REFRESH_SCHEDULE if age_h <= max_age), REFRESH_SCHEDULE[-1][1])
+        if (now - last_seen) / 3600 >= every_h:
+            due.append((first_seen, url))
+    due.sort(reverse=True)
+    return [url for _, url in due[:limit]]
+
+
 def setup_driver():
     """Setup Chrome driver with proper options"""
     options = uc.ChromeOptions()
@@ -36,7 +132,7 @@ def setup_driver():
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--disable-extensions")
     options.add_argument("--disable-plugins")
-    options.add_argument("--disable-images")  # Speed up loading
+    browser.enable_network_logging(options)
     options.add_argument("--window-size=1920,1080")
     
     # User agent to avoid detection
@@ -46,40 +142,129 @@ def setup_driver():
     if os.getenv('PRODUCTION', False):
         options.add_argument("--headless=new")
     
+    # Persistent profile slot: cookies, consent state and cached assets survive between runs
+    lease = browser.lease_profile("tiktok")
+    browser.apply_profile(options, lease)
+    
     try:
-        return uc.Chrome(options=options)
+        driver = driver_cache.launch(options, "tiktok")
     except Exception as e:
+        if lease:
+            lease.release()
         print(f"[SCRAPER] Failed to setup Chrome driver: {e}")
         return None
+    # Images, video, fonts and trackers are never read; block them at the network layer
+    browser.install_request_filter(driver, "tiktok")
+    browser.attach_profile(driver, lease, "tiktok", fetch_backend.BASE_URLS["tiktok"])
+    return driver
 
-def scroll_for_videos(driver, target=20, max_scrolls=50):
-    """Scroll and collect video links"""
-    video_links = set()
+class DriverUnavailable(Exception):
+    """The HTTP fast path was not enough and no browser could be started"""
+
+
+def start_driver():
+    """Start Chrome for a step the HTTP fetch backend could not handle"""
+    if not fetch_backend.browser_enabled():
+        raise DriverUnavailable("Page needs a browser but SCRAPE_BACKEND=http disables escalation.")
+    driver = setup_driver()
+    if not driver:
+        raise DriverUnavailable("Failed to setup Chrome driver. Please check Chrome installation.")
+    return driver
+
+
+def open_profile(driver, username):
+    """Navigate to a profile page and wait for it to render"""
+    driver.get(f"{fetch_backend.BASE_URLS['tiktok']}/@{username}")
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    time.sleep(3)
+
+
+# Scroll loop tuning: max in-page wait for new content, poll step, and no-growth scrolls before giving up
+SCROLL_MAX_WAIT_MS = int(os.environ.get("TIKTOK_SCROLL_MAX_WAIT_MS", 4000))
+SCROLL_POLL_MS = 100
+SCROLL_STALL_LIMIT = int(os.environ.get("TIKTOK_SCROLL_STALL_LIMIT", 2))
+
+# One round-trip per scroll: scroll, wait in the page until anchors or height grow
+# (or the max wait passes), then return only hrefs this page has not reported yet
+_SCROLL_HARVEST_JS = """
+const [maxWait, poll, done] = [arguments[0], arguments[1], arguments[arguments.length - 1]];
+const seen = window.__harvestedHrefs || (window.__harvestedHrefs = new Set());
+const anchors = () => document.querySelectorAll("a[href*='/video/']");
+const height0 = document.body.scrollHeight, count0 = anchors().length, t0 = performance.now();
+window.scrollTo(0, document.body.scrollHeight);
+(function check() {
+    const waited = performance.now() - t0;
+    const grew = document.body.scrollHeight > height0 || anchors().length > count0;
+    if (!grew && waited < maxWait) { setTimeout(check, poll); return; }
+    const fresh = [];
+    for (const a of anchors()) {
+        if (a.href && !seen.has(a.href)) { seen.add(a.href); fresh.push(a.href); }
+    }
+    done({hrefs: fresh, height: document.body.scrollHeight, count: anchors().length,
+          grew: grew, waited_ms: Math.round(waited)});
+})();
+"""
+
+
+def scroll_for_videos(driver, target=20, max_scrolls=50, known_urls=None, deadline=None):
+    """Scroll and collect video links in page order.
+
+    Each scroll is a single async script call that waits only as long as the
+    grid takes to grow. Stops when neither page height nor link count grows
+    for SCROLL_STALL_LIMIT scrolls, or, with known_urls, as soon as the grid
+    shows KNOWN_STOP_STREAK already stored videos in a row, or when the
+    deadline has no budget left beyond the analysis reserve.
+    """
+    deadline = deadline or unlimited()
+    video_links = []
+    known_urls = known_urls or set()
     scroll_count = 0
+    stalled = 0
+    driver.set_script_timeout(SCROLL_MAX_WAIT_MS / 1000 + 10)
     
     while len(video_links) < target and scroll_count < max_scrolls:
-        # Scroll down
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(1.5, 2.5))
-        
-        # Find video links
+        if not deadline.has(ANALYSIS_RESERVE_S + SCROLL_MIN_S):
+            deadline.degrade("scroll", f"stopped after {scroll_count} scrolls with {len(video_links)} links")
+            break
         try:
-            links = driver.find_elements(By.CSS_SELECTOR, "a[href*='/video/']")
-            for link in links:
-                href = link.get_attribute("href")
-                if href and "/video/" in href:
-                    video_links.add(href)
-        except Exception:
-            pass
-        
+            result = driver.execute_async_script(_SCROLL_HARVEST_JS, SCROLL_MAX_WAIT_MS, SCROLL_POLL_MS)
+        except WebDriverException as e:
+            if is_dead_session(e):
+                raise
+            print(f"[SCRAPER] Scroll script failed: {e}")
+            break
+        video_links.extend(h for h in result["hrefs"] if "/video/" in h)
         scroll_count += 1
-        print(f"[SCRAPER] Found {len(video_links)} videos after {scroll_count} scrolls")
+        stalled = 0 if result["grew"] else stalled + 1
+        print(f"[SCRAPER] Found {len(video_links)} videos after {scroll_count} scrolls "
+              f"(waited {result['waited_ms']}ms)")
+        
+        if known_urls:
+            streak = 0
+            for href in reversed(video_links):
+                if href not in known_urls:
+                    break
+                streak += 1
+            if streak >= KNOWN_STOP_STREAK:
+                print(f"[SCRAPER] Reached {streak} known videos in a row, stopping scroll")
+                break
         
-        # Break if we haven't found new videos in the last few scrolls
-        if scroll_count > 10 and len(video_links) < 5:
+        if stalled >= SCROLL_STALL_LIMIT:
+            print("[SCRAPER] Page stopped growing, end of the video grid")
             break
+        
+        # Short jittered pause so the scroll cadence doesn't look scripted
+        time.sleep(random.uniform(0.2, 0.6))
     
-    return list(video_links)[:target]
+    return video_links[:target]
+
+# Chrome is gone: retrying the same driver is pointless, fail the run so it can resume
+_DEAD_SESSION_MARKERS = ("invalid session id", "chrome not reachable", "disconnected", "no such window")
+
+
+def is_dead_session(error):
+    return isinstance(error, WebDriverException) and any(m in str(error).lower() for m in _DEAD_SESSION_MARKERS)
+
 
 def extract_video_data(driver, video_url, retries=3):
     """Extract data from a single video"""
@@ -93,57 +278,9 @@ def extract_video_data(driver, video_url, retries=3):
             )
             time.sleep(2)
             
-            # Extract likes
-            likes = "0"
-            like_selectors = [
-                "strong[data-e2e='like-count']",
-                "[data-e2e='like-count']",
-                ".like-count",
-                "*[title*='like']"
-            ]
-            for selector in like_selectors:
-                try:
-                    likes = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if likes:
-                        break
-                except:
-                    continue
-            
-            # Extract comments
-            comments = "0"
-            comment_selectors = [
-                "strong[data-e2e='comment-count']",
-                "[data-e2e='comment-count']",
-                ".comment-count",
-                "*[title*='comment']"
-            ]
-            for selector in comment_selectors:
-                try:
-                    comments = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if comments:
-                        break
-                except:
-                    continue
-            
-            # Extract description
-            description = ""
-            desc_selectors = [
-                "[data-e2e='browse-video-desc']",
-                "[data-e2e='video-desc']",
-                ".video-meta-caption",
-                "h1[data-e2e='browse-video-desc']",
-                "meta[name='description']"
-            ]
-            for selector in desc_selectors:
-                try:
-                    if "meta" in selector:
-                        description = driver.find_element(By.CSS_SELECTOR, selector).get_attribute("content")
-                    else:
-                        description = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
-                    if description:
-                        break
-                except:
-                    continue
+            likes = selector_stats.first_match(LIKE_CHAIN, lambda sel: _element_text(driver, sel))
+            comments = selector_stats.first_match(COMMENT_CHAIN, lambda sel: _element_text(driver, sel))
+            description = selector_stats.first_match(DESC_CHAIN, lambda sel: _description_text(driver, sel))
             
             if not description:
                 description = "N/A"
@@ -156,6 +293,8 @@ def extract_video_data(driver, video_url, retries=3):
             }
             
         except Exception as e:
+            if is_dead_session(e):
+                raise
             print(f"[SCRAPER] Attempt {attempt + 1} failed for {video_url}: {str(e)}")
             time.sleep(2)
     
@@ -169,7 +308,7 @@ def extract_video_data(driver, video_url, retries=3):
 
 def scrape_profile_stats(driver, username):
     """Scrape basic profile statistics"""
-    url = f"https://www.tiktok.com/@{username}"
+    url = f"{fetch_backend.BASE_URLS['tiktok']}/@{username}"
     
     try:
         driver.get(url)
@@ -181,79 +320,10 @@ def scrape_profile_stats(driver, username):
         time.sleep(3)
         
         # Extract profile data with multiple selector fallbacks
-        name = username
-        try:
-            name_selectors = [
-                "h1[data-e2e='user-title']",
-                "h2[data-e2e='user-title']",
-                ".share-title",
-                "h1"
-            ]
-            for selector in name_selectors:
-                try:
-                    name_elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    if name_elem.text.strip():
-                        name = name_elem.text.strip()
-                        break
-                except:
-                    continue
-        except:
-            pass
-        
-        # Extract followers
-        followers = "N/A"
-        try:
-            follower_selectors = [
-                "[data-e2e='followers-count']",
-                ".number[title*='Follow']",
-                "*[title*='Follow']"
-            ]
-            for selector in follower_selectors:
-                try:
-                    elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    followers = elem.text.strip() or elem.get_attribute("title")
-                    if followers:
-                        break
-                except:
-                    continue
-        except:
-            pass
-        
-        # Extract following
-        following = "N/A"
-        try:
-            following_selectors = [
-                "[data-e2e='following-count']",
-                ".number[title*='Following']"
-            ]
-            for selector in following_selectors:
-                try:
-                    elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    following = elem.text.strip() or elem.get_attribute("title")
-                    if following:
-                        break
-                except:
-                    continue
-        except:
-            pass
-        
-        # Extract total likes
-        total_likes = "N/A"
-        try:
-            likes_selectors = [
-                "[data-e2e='likes-count']",
-                ".number[title*='Like']"
-            ]
-            for selector in likes_selectors:
-                try:
-                    elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    total_likes = elem.text.strip() or elem.get_attribute("title")
-                    if total_likes:
-                        break
-                except:
-                    continue
-        except:
-            pass
+        name = selector_stats.first_match(NAME_CHAIN, lambda sel: _element_text(driver, sel)) or username
+        followers = selector_stats.first_match(FOLLOWERS_CHAIN, lambda sel: _count_text(driver, sel)) or "N/A"
+        following = selector_stats.first_match(FOLLOWING_CHAIN, lambda sel: _count_text(driver, sel)) or "N/A"
+        total_likes = selector_stats.first_match(TOTAL_LIKES_CHAIN, lambda sel: _count_text(driver, sel)) or "N/A"
         
         return {
             "username": username,
@@ -273,50 +343,141 @@ def scrape_profile_stats(driver, username):
             "total_likes": "N/A"
         }
 
-def scrape_tiktok(username):
-    """Main scraping function - called by Flask app"""
+def _out_of_time(run_id, deadline, stage):
+    """Fail the run (it stays resumable) with an error naming the stage the budget ran out before"""
+    if not any(d["stage"] == stage for d in deadline.degraded):
+        deadline.degrade(stage, "skipped: request budget spent")
+    storage.finish_scrape_run(run_id, "failed", error=f"out of time before {stage}")
+    return {"error": f"Ran out of time before the {stage} stage ({deadline.elapsed():.0f}s of the "
+                     f"{deadline.budget_s:.0f}s request budget used). Please retry.",
+            "degraded": deadline.degraded}
+
+def scrape_tiktok(username, incremental=True, deadline=None):
+    """Main scraping function - called by Flask app.
+
+    In incremental mode only videos not yet in the creator store are
+    extracted, plus known videos that are due for a count refresh. With a
+    deadline, extraction stops early (fewer videos) once only the analysis
+    reserve is left.
+    """
     print(f"[SCRAPER] Starting scrape for @{username}")
+    deadline = deadline or unlimited()
+    
+    # Typos, private accounts and rate limits fail here, before any browser starts
+    probe = fetch_backend.probe_profile("tiktok", username)
+    probe_error = fetch_backend.probe_error(probe)
+    if probe_error:
+        return {"error": probe_error, "probe": probe["status"]}
     
     driver = None
+    known = storage.known_videos("tiktok", username) if incremental else {}
+    # Pick up where a crashed or killed run left off; every finished item is checkpointed
+    run_id = storage.resume_scrape_run("tiktok", username)
+    checkpoints = storage.load_checkpoints(run_id) if run_id else {}
+    if run_id:
+        print(f"[SCRAPER] Resuming run {run_id} ({len(checkpoints)} checkpoints)")
+    else:
+        run_id = storage.start_scrape_run("tiktok", username)
     try:
-        driver = setup_driver()
-        if not driver:
-            return {"error": "Failed to setup Chrome driver. Please check Chrome installation."}
-        
-        # Get profile stats
-        profile_stats = scrape_profile_stats(driver, username)
-        
-        # Get video links
-        print("[SCRAPER] Scrolling for video links...")
-        video_links = scroll_for_videos(driver, target=15)
+        # Get profile stats: server-rendered JSON over HTTP first, the browser only if that fails
+        on_profile_page = False
+        profile_stats = checkpoints.get("__profile__")
+        if profile_stats is None:
+            profile_stats = probe["data"]
+            if profile_stats is None:
+                # Starting Chrome is only worth it if the scroll can still run afterwards
+                if not deadline.has(ANALYSIS_RESERVE_S + SCROLL_MIN_S):
+                    return _out_of_time(run_id, deadline, "profile")
+                driver = driver or start_driver()
+                profile_stats = scrape_profile_stats(driver, username)
+                on_profile_page = True
+            storage.save_checkpoint(run_id, "__profile__", profile_stats, position=-2)
         
-        if not video_links:
-            return {"error": "No videos found. Profile might be private or doesn't exist."}
-        
-        print(f"[SCRAPER] Found {len(video_links)} videos, extracting data...")
+        # Get video links (the profile grid is rendered client-side, so this needs the browser)
+        links = checkpoints.get("__links__")
+        if links is None:
+            if not driver and not deadline.has(ANALYSIS_RESERVE_S + SCROLL_MIN_S):
+                return _out_of_time(run_id, deadline, "scroll")
+            driver = driver or start_driver()
+            if not on_profile_page:
+                open_profile(driver, username)
+            print("[SCRAPER] Scrolling for video links...")
+            video_links = scroll_for_videos(driver, target=15, known_urls=set(known), deadline=deadline)
+            browser.record_page(driver, "tiktok", "profile", run_id)
+            
+            if not video_links and any(d["stage"] == "scroll" for d in deadline.degraded):
+                return _out_of_time(run_id, deadline, "scroll")
+            if not video_links:
+                storage.finish_scrape_run(run_id, "failed", error="no videos found")
+                return {"error": "No videos found. Profile might be private or doesn't exist."}
+            
+            new_links = [url for url in video_links if url not in known]
+            refresh_links = [url for url in refresh_due(known) if url not in new_links]
+            links = {"video_links": video_links, "new_links": new_links, "to_extract": new_links + refresh_links}
+            storage.save_checkpoint(run_id, "__links__", links, position=-1)
+        video_links, new_links, to_extract = links["video_links"], links["new_links"], links["to_extract"]
+        print(f"[SCRAPER] Found {len(video_links)} videos ({len(new_links)} new, "
+              f"{len(to_extract) - len(new_links)} due for refresh), extracting data...")
         
         # Extract video data
         video_data = []
-        for i, video_url in enumerate(video_links, 1):
-            print(f"[SCRAPER] Processing video {i}/{len(video_links)}")
-            data = extract_video_data(driver, video_url)
+        for i, video_url in enumerate(to_extract, 1):
+            if video_url in checkpoints:
+                video_data.append(checkpoints[video_url])
+                continue
+            if not deadline.has(ANALYSIS_RESERVE_S + VIDEO_EXTRACT_MIN_S):
+                deadline.degrade("videos", f"extracted {len(video_data)} of {len(to_extract)} videos")
+                break
+            print(f"[SCRAPER] Processing video {i}/{len(to_extract)}")
+            try:
+                data = fetch_backend.fetch("tiktok", "video", video_url)
+            except fetch_backend.FetchError:
+                data = None
+            if data is None:
+                driver = driver or start_driver()
+                data = extract_video_data(driver, video_url)
+                browser.record_page(driver, "tiktok", "video", run_id)
             video_data.append(data)
+            if data["description"] != "Failed to extract":
+                storage.save_checkpoint(run_id, video_url, data, position=i)
             
             # Add delay between requests
             time.sleep(random.uniform(1, 2))
         
-        # Save to CSV
-        csv_filename = f"{username}_tiktok_videos.csv"
-        with open(csv_filename, 'w', newline='', encoding='utf-8') as file:
-            if video_data:
-                writer = csv.DictWriter(file, fieldnames=["url", "likes", "comments", "description"])
-                writer.writeheader()
-                writer.writerows(video_data)
+        profile_stats["scrape_mode"] = "incremental" if known else "full"
+        profile_stats["new_videos"] = len(new_links)
+        profile_stats["refreshed_videos"] = len(to_extract) - len(new_links)
+        
+        # Analyze the page's videos: fresh rows where extracted, stored rows for the rest
+        if known:
+            stored = storage.load_videos("tiktok", username).drop_duplicates("url").set_index("url", drop=False)
+            # A failed refresh falls back to the stored row instead of zeros and the placeholder text
+            fresh = {row["url"]: row for row in video_data if row["description"] != "Failed to extract"}
+            page_rows = [fresh.get(url) or stored.loc[url].to_dict() for url in video_links
+                         if url in fresh or url in stored.index]
+            video_data_for_analysis = page_rows + [row for row in video_data if row["url"] not in video_links]
+        else:
+            video_data_for_analysis = video_data
+        
+        # Hand the rows to the analyzer in memory; the creator store write happens
+        # in the background (export with: python storage.py export tiktok <username>)
+        # Failed extractions are not stored: a known video keeps its counts, and a new one stays
+        # unknown so the next run's scroll treats it as new and retries it
+        to_store = [v for v in video_data if v["description"] != "Failed to extract"]
+        storage.persist_async(storage.persist_scrape, "tiktok", username, to_store, run_id,
+                              name=profile_stats.get("name"), creator=("tiktok", username))
+        storage.persist_async(history.record_snapshot, "tiktok", username, dict(profile_stats),
+                              [v for v in video_data if v["description"] != "Failed to extract"],
+                              creator=("tiktok", username))
+        profile_stats["run_id"] = run_id
+        profile_stats["backend"] = "browser" if driver else "http"
+        profile_stats["network"] = browser.NETWORK_METRICS.run_totals(run_id)
+        profile_stats["videos"] = pd.DataFrame(video_data_for_analysis, columns=storage.PLATFORM_COLUMNS["tiktok"])
         
         # Calculate engagement rate
         try:
-            total_likes = sum(_num(v["likes"]) for v in video_data)
-            total_comments = sum(_num(v["comments"]) for v in video_data)
+            total_likes = sum(_num(v["likes"]) for v in video_data_for_analysis)
+            total_comments = sum(_num(v["comments"]) for v in video_data_for_analysis)
             estimated_views = total_likes * 12  # Rough estimate
             
             if estimated_views > 0:
@@ -327,17 +488,27 @@ def scrape_tiktok(username):
         except:
             profile_stats["engagement_rate"] = "N/A"
         
-        print(f"[SCRAPER] ✅ Successfully scraped {len(video_data)} videos")
+        print(f"[SCRAPER] ✅ Successfully scraped {len(video_data)} videos ({profile_stats['scrape_mode']})")
         return profile_stats
         
+    except DriverUnavailable as e:
+        storage.finish_scrape_run(run_id, "failed", error=str(e)[:500])
+        return {"error": str(e)}
+    
+    except fetch_backend.FetchError as e:
+        # Profile is private or missing; a browser would not get further
+        storage.finish_scrape_run(run_id, "failed", error=e.reason)
+        return {"error": "No videos found. Profile might be private or doesn't exist."}
+    
     except Exception as e:
         print(f"[SCRAPER] ❌ Error: {str(e)}")
+        storage.finish_scrape_run(run_id, "failed", error=str(e)[:500])
         return {"error": f"Scraping failed: {str(e)}"}
         
     finally:
         if driver:
             try:
-                driver.quit()
+                browser.quit_driver(driver)
             except:
                 pass
 
@@ -346,7 +517,9 @@ if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1:
         username = sys.argv[1]
-        result = scrape_tiktok(username)
+        result = scrape_tiktok(username, incremental="--full" not in sys.argv)
+        result.pop("videos", None)
+        storage.flush()
         print(f"Result: {result}")
     else:
-        print("Usage: python scraper.py <username>")
\ No newline at end of file
+        print("Usage: python scraper.py <username> [--full]")
\ No newline at end of file
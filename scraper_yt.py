@@ -1,4 +1,3 @@
-import csv
 import time
 import random
 import traceback
@@ -9,6 +8,76 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
 import os
+import pandas as pd
+import storage
+import history
+import browser
+import driver_cache
+import fetch_backend
+import selector_stats
+from scraper import is_dead_session
+from deadline import unlimited
+
+# Least budget needed to read one more video card before the scrape wraps up with what it has
+CARD_MIN_S = 3
+
+# Fallback selector chains; selector_stats tries them best-first by observed hit rate
+NAME_CHAIN = selector_stats.chain("youtube.channel.name", [
+    "#channel-name .ytd-channel-name",
+    ".ytd-channel-name #text",
+    "#text.ytd-channel-name",
+    "yt-formatted-string.ytd-channel-name",
+    "#channel-header-container #text",
+    ".page-header-view-model-wiz__page-header-title",
+    "h1[class*='channel-name']"
+])
+SUBSCRIBER_CHAIN = selector_stats.chain("youtube.channel.subscribers", [
+    ".ytd-c4-tabbed-header-renderer #subscriber-count",
+    "[aria-label*='subscriber']",
+    "#owner-sub-count"
+])
+VIDEO_CARD_CHAIN = selector_stats.chain("youtube.videos.cards", [
+    "ytd-rich-grid-media",
+    "ytd-grid-video-renderer",
+    "ytd-video-renderer",
+    ".ytd-rich-grid-media",
+    ".ytd-grid-video-renderer"
+])
+TITLE_CHAIN = selector_stats.chain("youtube.card.title", [
+    "#video-title",
+    "a#video-title",
+    ".ytd-rich-grid-media #video-title",
+    "h3 a",
+    ".video-title",
+], fallbacks=["a[aria-label]"])
+URL_CHAIN = selector_stats.chain("youtube.card.url", [
+    "a#thumbnail",
+    "a#video-title",
+    "a[href*='/watch']",
+    ".thumbnail a",
+    "ytd-thumbnail a"
+])
+
+
+def _channel_name(driver, selector):
+    name = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+    return name if len(name) > 1 else None
+
+
+def _subscriber_text(driver, selector):
+    text = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+    return text if text and ("subscriber" in text.lower() or any(c.isdigit() for c in text)) else None
+
+
+def _card_title(card, selector):
+    elem = card.find_element(By.CSS_SELECTOR, selector)
+    title = elem.get_attribute("title") or elem.get_attribute("aria-label") or elem.text.strip()
+    return title if title != "N/A" else None
+
+
+def _card_url(card, selector):
+    url = card.find_element(By.CSS_SELECTOR, selector).get_attribute("href")
+    return url if url and "watch" in url else None
 
 
 def take_videos_page_screenshot(driver, channel_id):
@@ -26,6 +95,7 @@ def setup_youtube_driver():
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--start-maximized")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    browser.enable_network_logging(options)
     
     # For production, use headless mode
     if os.getenv('PRODUCTION', False):
@@ -34,17 +104,141 @@ def setup_youtube_driver():
         options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--disable-gpu")
     
+    # Persistent profile slot: cookies, consent state and cached assets survive between runs
+    lease = browser.lease_profile("youtube")
+    browser.apply_profile(options, lease)
+    
     try:
-        return uc.Chrome(options=options)
+        driver = driver_cache.launch(options, "youtube")
     except Exception as e:
+        if lease:
+            lease.release()
         print(f"❌ Failed to setup Chrome driver: {e}")
         return None
+    # Thumbnails, previews, fonts and trackers are never read; block them at the network layer
+    browser.install_request_filter(driver, "youtube")
+    browser.attach_profile(driver, lease, "youtube", fetch_backend.BASE_URLS["youtube"])
+    return driver
+
+
+def scrape_channel_header(driver, base_url):
+    """Load the channel page and read its name and subscriber count"""
+    print(f"\n🌐 Loading channel: {base_url}")
+    driver.get(base_url)
+    time.sleep(5)
+
+    # Get channel name - try multiple approaches
+    channel_name = "N/A"
+    try:
+        # Try different selectors for channel name
+        potential_name = selector_stats.first_match(NAME_CHAIN, lambda sel: _channel_name(driver, sel))
+        if potential_name:
+            channel_name = potential_name
+            print(f"📺 Channel Name: {channel_name}")
+        
+        # If still N/A, try getting from page title
+        if channel_name == "N/A":
+            try:
+                page_title = driver.title
+                if " - YouTube" in page_title:
+                    channel_name = page_title.replace(" - YouTube", "").strip()
+                    print(f"📺 Channel Name (from title): {channel_name}")
+            except:
+                pass
+                
+    except Exception as e:
+        print(f"⚠️ Failed to get channel name: {e}")
+
+    # Get subscriber count - stable approach
+    subscribers = "N/A"
+    try:
+        # Wait a bit longer for page to fully load
+        time.sleep(3)
+        
+        # Try the main subscriber selector first
+        try:
+            sub_elem = WebDriverWait(driver, 8).until(
+                EC.presence_of_element_located((By.ID, "subscriber-count"))
+            )
+            subscribers = sub_elem.text.strip()
+            if subscribers:
+                print(f"🎯 Subscribers: {subscribers}")
+            else:
+                raise Exception("Empty subscriber text")
+        except:
+            # If main method fails, try alternative selectors (one at a time, safely)
+            text = selector_stats.first_match(SUBSCRIBER_CHAIN, lambda sel: _subscriber_text(driver, sel))
+            if text:
+                subscribers = text
+                print(f"🎯 Subscribers (backup): {subscribers}")
+            
+            # Final fallback - search page source for subscriber data (safely)
+            if subscribers == "N/A":
+                try:
+                    page_source = driver.page_source
+                    import re
+                    # Look for the most common pattern
+                    match = re.search(r'"subscriberCountText":\s*{"simpleText":\s*"([^"]+)"', page_source)
+                    if match:
+                        subscribers = match.group(1)
+                        print(f"🎯 Subscribers (page source): {subscribers}")
+                    else:
+                        # Try simpler pattern
+                        match = re.search(r'(\d+\.?\d*[KM]?)\s*subscriber', page_source, re.IGNORECASE)
+                        if match:
+                            subscribers = match.group(1) + " subscribers"
+                            print(f"🎯 Subscribers (regex): {subscribers}")
+                except Exception as e:
+                    print(f"⚠️ Page source search failed: {e}")
+                    
+    except Exception as e:
+        print(f"⚠️ Subscriber detection failed: {e}")
+    
+    print(f"🎯 Final Subscribers: {subscribers}")
+    return channel_name, subscribers
+
+
+def finish_channel_scrape(channel_id, run_id, channel_name, subscribers, all_data, backend="browser"):
+    """Queue the store/history writes for a scraped channel and build the scrape result"""
+    # Save to the creator store (export with: python storage.py export youtube <channel_id>)
+    for row in all_data:
+        # Ensure title is never empty
+        if not row.get("title") or row["title"] == "N/A":
+            row["title"] = "Untitled Video"
+    
+    storage.persist_async(storage.persist_scrape, "youtube", channel_id, all_data, run_id, name=channel_name,
+                          creator=("youtube", channel_id))
+    storage.persist_async(history.record_snapshot, "youtube", channel_id, {"subscribers": subscribers},
+                          [row for row in all_data if row["url"] != "N/A"], creator=("youtube", channel_id))
+
+    print(f"\n✅ Success! Scraped {len(all_data)} videos for {channel_id}")
+    
+    return {
+        "success": True,
+        "channel_id": channel_id,
+        "channel_name": channel_name,
+        "subscribers": subscribers,
+        "video_count": len(all_data),
+        "run_id": run_id,
+        "backend": backend,
+        "network": browser.NETWORK_METRICS.run_totals(run_id),
+        "data_preview": all_data[:3],  # Include first 3 videos for verification
+        # Handed straight to the analyzer; not JSON-serializable, pop before responding
+        "videos": pd.DataFrame(all_data, columns=storage.PLATFORM_COLUMNS["youtube"])
+    }
 
 
-def get_youtube_channel_stats(channel_id):
-    """Main function to scrape YouTube channel data"""
-    base_url = f"https://www.youtube.com/@{channel_id}"
+def get_youtube_channel_stats(channel_id, deadline=None):
+    """Main function to scrape YouTube channel data (fewer cards when the deadline runs low)"""
+    deadline = deadline or unlimited()
+    base_url = f"{fetch_backend.BASE_URLS['youtube']}/@{channel_id}"
     
+    # Typos and rate limits fail here, before any browser starts
+    probe = fetch_backend.probe_profile("youtube", channel_id)
+    probe_error = fetch_backend.probe_error(probe, noun=f"Channel @{channel_id}")
+    if probe_error:
+        return {"error": probe_error, "probe": probe["status"]}
+
     # Initialize all variables at function level
     channel_name = "N/A"
     subscribers = "N/A"
@@ -52,111 +246,39 @@ def get_youtube_channel_stats(channel_id):
     total_likes = "N/A"
     launch_date = "N/A"
 
+    # Pick up where a crashed or killed run left off; every finished card is checkpointed
+    run_id = storage.resume_scrape_run("youtube", channel_id)
+    checkpoints = storage.load_checkpoints(run_id) if run_id else {}
+    if run_id:
+        print(f"♻️ Resuming run {run_id} ({len(checkpoints)} checkpoints)")
+    else:
+        run_id = storage.start_scrape_run("youtube", channel_id)
+
+    # Fast path: the probe already fetched the server-rendered videos tab (ytInitialData)
+    fetched = probe["data"]
+    if fetched is not None:
+        print(f"⚡ Fetched {len(fetched['videos'])} videos over HTTP")
+        return finish_channel_scrape(channel_id, run_id, fetched["channel_name"], fetched["subscribers"],
+                                     fetched["videos"], backend="http")
+    if not fetch_backend.browser_enabled():
+        storage.finish_scrape_run(run_id, "failed", error="http fetch failed, browser disabled")
+        return {"error": "HTTP fetch failed and SCRAPE_BACKEND=http disables the browser fallback"}
+
     driver = setup_youtube_driver()
     if not driver:
+        storage.finish_scrape_run(run_id, "failed", error="driver setup failed")
         return {"error": "Failed to setup Chrome driver"}
 
     try:
-        print(f"\n🌐 Loading channel: {base_url}")
-        driver.get(base_url)
-        time.sleep(5)
-
-        # Get channel name - try multiple approaches
-        channel_name = "N/A"
-        try:
-            # Try different selectors for channel name
-            name_selectors = [
-                "#channel-name .ytd-channel-name",
-                ".ytd-channel-name #text",
-                "#text.ytd-channel-name", 
-                "yt-formatted-string.ytd-channel-name",
-                "#channel-header-container #text",
-                ".page-header-view-model-wiz__page-header-title",
-                "h1[class*='channel-name']"
-            ]
-            
-            for selector in name_selectors:
-                try:
-                    name_elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    potential_name = name_elem.text.strip()
-                    if potential_name and len(potential_name) > 1:
-                        channel_name = potential_name
-                        print(f"📺 Channel Name: {channel_name}")
-                        break
-                except:
-                    continue
-            
-            # If still N/A, try getting from page title
-            if channel_name == "N/A":
-                try:
-                    page_title = driver.title
-                    if " - YouTube" in page_title:
-                        channel_name = page_title.replace(" - YouTube", "").strip()
-                        print(f"📺 Channel Name (from title): {channel_name}")
-                except:
-                    pass
-                    
-        except Exception as e:
-            print(f"⚠️ Failed to get channel name: {e}")
+        header = checkpoints.get("__channel__")
+        if header is None:
+            channel_name, subscribers = scrape_channel_header(driver, base_url)
+            browser.record_page(driver, "youtube", "channel", run_id)
+            storage.save_checkpoint(run_id, "__channel__",
+                                    {"channel_name": channel_name, "subscribers": subscribers}, position=-1)
+        else:
+            channel_name, subscribers = header["channel_name"], header["subscribers"]
 
-        # Get subscriber count - stable approach
-        subscribers = "N/A"
-        try:
-            # Wait a bit longer for page to fully load
-            time.sleep(3)
-            
-            # Try the main subscriber selector first
-            try:
-                sub_elem = WebDriverWait(driver, 8).until(
-                    EC.presence_of_element_located((By.ID, "subscriber-count"))
-                )
-                subscribers = sub_elem.text.strip()
-                if subscribers:
-                    print(f"🎯 Subscribers: {subscribers}")
-                else:
-                    raise Exception("Empty subscriber text")
-            except:
-                # If main method fails, try alternative selectors (one at a time, safely)
-                backup_selectors = [
-                    ".ytd-c4-tabbed-header-renderer #subscriber-count",
-                    "[aria-label*='subscriber']", 
-                    "#owner-sub-count"
-                ]
-                
-                for selector in backup_selectors:
-                    try:
-                        sub_elem = driver.find_element(By.CSS_SELECTOR, selector)
-                        text = sub_elem.text.strip()
-                        if text and ("subscriber" in text.lower() or any(c.isdigit() for c in text)):
-                            subscribers = text
-                            print(f"🎯 Subscribers (backup): {subscribers}")
-                            break
-                    except:
-                        continue
-                
-                # Final fallback - search page source for subscriber data (safely)
-                if subscribers == "N/A":
-                    try:
-                        page_source = driver.page_source
-                        import re
-                        # Look for the most common pattern
-                        match = re.search(r'"subscriberCountText":\s*{"simpleText":\s*"([^"]+)"', page_source)
-                        if match:
-                            subscribers = match.group(1)
-                            print(f"🎯 Subscribers (page source): {subscribers}")
-                        else:
-                            # Try simpler pattern
-                            match = re.search(r'(\d+\.?\d*[KM]?)\s*subscriber', page_source, re.IGNORECASE)
-                            if match:
-                                subscribers = match.group(1) + " subscribers"
-                                print(f"🎯 Subscribers (regex): {subscribers}")
-                    except Exception as e:
-                        print(f"⚠️ Page source search failed: {e}")
-                        
-        except Exception as e:
-            print(f"⚠️ Subscriber detection failed: {e}")
-        
-        print(f"🎯 Final Subscribers: {subscribers}")
 
         # Go to Videos tab
         videos_url = f"{base_url}/videos"
@@ -177,75 +299,32 @@ def get_youtube_channel_stats(channel_id):
         take_videos_page_screenshot(driver, channel_id)
 
         # Find video cards with multiple selectors
-        video_selectors = [
-            "ytd-rich-grid-media",
-            "ytd-grid-video-renderer", 
-            "ytd-video-renderer",
-            ".ytd-rich-grid-media",
-            ".ytd-grid-video-renderer"
-        ]
-        
-        video_cards = []
-        for selector in video_selectors:
-            try:
-                cards = driver.find_elements(By.CSS_SELECTOR, selector)
-                if cards:
-                    video_cards = cards
-                    print(f"✅ Found {len(cards)} videos using selector: {selector}")
-                    break
-            except Exception as e:
-                print(f"⚠️ Selector {selector} failed: {e}")
-                continue
-        
-        if not video_cards:
+        video_cards = selector_stats.first_match(
+            VIDEO_CARD_CHAIN, lambda sel: driver.find_elements(By.CSS_SELECTOR, sel)) or []
+        if video_cards:
+            print(f"✅ Found {len(video_cards)} videos")
+        else:
             print("❌ No video cards found with any selector")
+            storage.finish_scrape_run(run_id, "failed", error="no video cards found")
             return {"error": "No videos found on the channel"}
 
         all_data = []
         max_videos = min(20, len(video_cards))  # Limit to 20 videos
 
         for idx, card in enumerate(video_cards[:max_videos]):
+            # Checkpoints are keyed by video URL: an upload since the crash shifts every card's position
+            url = selector_stats.first_match(URL_CHAIN, lambda sel: _card_url(card, sel)) or "N/A"
+            if url != "N/A" and url in checkpoints:
+                all_data.append(checkpoints[url])
+                continue
+            if not deadline.has(CARD_MIN_S):
+                deadline.degrade("videos", f"read {len(all_data)} of {max_videos} video cards")
+                break
             print(f"📹 Processing Video {idx + 1}/{max_videos}")
 
             try:
                 # Try multiple selectors for title
-                title = "N/A"
-                title_selectors = [
-                    "#video-title",
-                    "a#video-title",
-                    ".ytd-rich-grid-media #video-title",
-                    "h3 a",
-                    ".video-title",
-                    "a[aria-label]"
-                ]
-                
-                for title_selector in title_selectors:
-                    try:
-                        title_elem = card.find_element(By.CSS_SELECTOR, title_selector)
-                        title = title_elem.get_attribute("title") or title_elem.get_attribute("aria-label") or title_elem.text.strip()
-                        if title and title != "N/A":
-                            break
-                    except:
-                        continue
-
-                # Try to get URL
-                url = "N/A"
-                url_selectors = [
-                    "a#thumbnail",
-                    "a#video-title", 
-                    "a[href*='/watch']",
-                    ".thumbnail a",
-                    "ytd-thumbnail a"
-                ]
-                
-                for url_selector in url_selectors:
-                    try:
-                        url_elem = card.find_element(By.CSS_SELECTOR, url_selector)
-                        url = url_elem.get_attribute("href")
-                        if url and "watch" in url:
-                            break
-                    except:
-                        continue
+                title = selector_stats.first_match(TITLE_CHAIN, lambda sel: _card_title(card, sel)) or "N/A"
 
                 # Extract metadata from card text
                 try:
@@ -282,81 +361,44 @@ def get_youtube_channel_stats(channel_id):
                 }
                 
                 all_data.append(video_data)
+                if url != "N/A":
+                    storage.save_checkpoint(run_id, url, video_data, position=idx)
                 print(f"✅ Video {idx + 1}: {clean_title[:50]}{'...' if len(clean_title) > 50 else ''}")
 
             except Exception as e:
+                if is_dead_session(e):
+                    raise
+                # Skip the card rather than storing a placeholder row; a retry re-extracts it
                 print(f"❌ Error scraping video {idx + 1}: {e}")
                 print(traceback.format_exc())
-                
-                # Add placeholder data to maintain count
-                all_data.append({
-                    "title": f"Video {idx + 1} (extraction failed)",
-                    "views": "N/A",
-                    "upload_time": "N/A",
-                    "url": "N/A"
-                })
                 continue
 
             # Random delay between videos
             time.sleep(random.uniform(0.5, 1.5))
 
-        # Export CSV with guaranteed data
-        csv_filename = f"{channel_id}_youtube_videos.csv"
-        csv_path = os.path.abspath(csv_filename)
-        
-        try:
-            with open(csv_filename, "w", newline="", encoding="utf-8") as file:
-                writer = csv.DictWriter(file, fieldnames=["title", "views", "upload_time", "url"])
-                writer.writeheader()
-                
-                if all_data:
-                    for row in all_data:
-                        # Ensure title is never empty
-                        if not row.get("title") or row["title"] == "N/A":
-                            row["title"] = "Untitled Video"
-                        writer.writerow(row)
-                else:
-                    # Write at least one row with sample data if nothing was scraped
-                    writer.writerow({
-                        "title": f"Sample video from {channel_id}",
-                        "views": "N/A",
-                        "upload_time": "N/A", 
-                        "url": "N/A"
-                    })
-                    all_data = [{"title": f"Sample video from {channel_id}"}]
-
-            print(f"\n✅ Success! Exported {len(all_data)} videos to {csv_filename}")
-            print(f"📁 File location: {csv_path}")
-            
-            return {
-                "success": True,
-                "channel_id": channel_id,
-                "channel_name": channel_name,
-                "video_count": len(all_data),
-                "csv_file": csv_filename,
-                "csv_path": csv_path,
-                "data_preview": all_data[:3]  # Include first 3 videos for verification
-            }
+        browser.record_page(driver, "youtube", "videos", run_id)
+        if not all_data:
+            storage.finish_scrape_run(run_id, "failed", error="no video could be extracted")
+            return {"error": "Failed to extract any video from the channel"}
 
-        except Exception as e:
-            print(f"❌ Error writing CSV file: {e}")
-            return {"error": f"Failed to write CSV file: {str(e)}"}
+        return finish_channel_scrape(channel_id, run_id, channel_name, subscribers, all_data)
 
     except Exception as e:
         print(f"\n❌ Fatal error during scraping: {e}")
         print(traceback.format_exc())
+        storage.finish_scrape_run(run_id, "failed", error=str(e)[:500])
         return {"error": f"Scraping failed: {str(e)}"}
         
     finally:
         try:
             if driver:
-                driver.quit()
+                browser.quit_driver(driver)
                 print("🔒 Browser closed")
         except Exception as e:
             print(f"⚠️ Error closing browser: {e}")
 
 
-def scrape_youtube_channel(channel_id):
+def scrape_youtube_channel(channel_id, deadline=None):
     """Wrapper function that can be called by Flask app or other scripts"""
     print(f"[YOUTUBE SCRAPER] Starting scrape for channel: {channel_id}")
     
@@ -364,16 +406,15 @@ def scrape_youtube_channel(channel_id):
     channel_id = channel_id.strip().replace('@', '')
     
     try:
-        result = get_youtube_channel_stats(channel_id)
+        result = get_youtube_channel_stats(channel_id, deadline=deadline)
         
         if "error" in result:
             print(f"[YOUTUBE SCRAPER] ❌ Error: {result['error']}")
             return {"error": result["error"]}
         
         print(f"[YOUTUBE SCRAPER] ✅ Successfully scraped {result['video_count']} videos")
-        print(f"[YOUTUBE SCRAPER] 📁 CSV saved: {result['csv_file']}")
+        print(f"[YOUTUBE SCRAPER] 💾 Saving to creator store in background (run {result['run_id']})")
         
-        # Return the CSV path for the analyzer to use
         return result
         
     except Exception as e:
@@ -381,26 +422,28 @@ def scrape_youtube_channel(channel_id):
         return {"error": f"Unexpected error: {str(e)}"}
 
 
-def scrape_and_analyze(channel_id):
-    """Complete workflow: scrape channel then analyze the data with full integration"""
+def scrape_and_analyze(channel_id, mode="multi", deadline=None):
+    """Complete workflow: scrape channel then analyze the data, both under one deadline"""
+    deadline = deadline or unlimited()
     print(f"🚀 Starting complete YouTube workflow for: {channel_id}")
     print("=" * 60)
     
     # Step 1: Scrape the channel
     print("📥 STEP 1: Scraping channel data...")
-    scrape_result = scrape_youtube_channel(channel_id)
+    scrape_result = scrape_youtube_channel(channel_id, deadline=deadline)
     
     if "error" in scrape_result:
         return {"error": f"Scraping failed: {scrape_result['error']}"}
     
-    csv_path = scrape_result.get("csv_path")
-    print(f"✅ Scraping complete! CSV saved to: {csv_path}")
+    stored_id = scrape_result["channel_id"]
+    videos = scrape_result.pop("videos", None)
+    print(f"✅ Scraping complete! Scraped {scrape_result['video_count']} videos for {stored_id}")
     
     # Step 2: Analyze the data
     print(f"\n🤖 STEP 2: Analyzing content...")
     try:
         from youtubeanalyzer import run_youtube_analysis
-        analysis_result = run_youtube_analysis(csv_path)
+        analysis_result = run_youtube_analysis(mode=mode, channel_id=stored_id, videos=videos, deadline=deadline)
         
         if "error" in analysis_result:
             return {"error": f"Analysis failed: {analysis_result['error']}"}
@@ -420,10 +463,10 @@ def scrape_and_analyze(channel_id):
             "signature": analysis_result.get("signature", {}),
             "video_ideas": analysis_result.get("video_ideas", []),
             "growth_tips": analysis_result.get("growth_tips", []),
-            "csv_file": scrape_result.get("csv_file"),
-            "csv_path": csv_path,
+            "run_id": scrape_result.get("run_id"),
             "scrape_data": scrape_result,
-            "analysis_data": analysis_result
+            "analysis_data": analysis_result,
+            "degraded": deadline.degraded
         }
         
         return combined_result
@@ -434,7 +477,7 @@ def scrape_and_analyze(channel_id):
             "status": "partial_success",
             "message": "Scraping completed but analysis unavailable",
             "scrape_data": scrape_result, 
-            "csv_path": csv_path,
+            "run_id": scrape_result.get("run_id"),
             "error": "Analysis module not found"
         }
     except Exception as e:
@@ -443,7 +486,7 @@ def scrape_and_analyze(channel_id):
             "status": "partial_success", 
             "message": "Scraping completed but analysis failed",
             "scrape_data": scrape_result,
-            "csv_path": csv_path,
+            "run_id": scrape_result.get("run_id"),
             "error": f"Analysis failed: {str(e)}"
         }
 
@@ -487,10 +530,11 @@ if __name__ == "__main__":
                     for tip in result["growth_tips"][:3]:
                         print(f"   {tip}")
                 
-                print(f"\n📁 CSV File: {result.get('csv_file', 'N/A')}")
+                print(f"\n💾 Scrape run: {result.get('run_id', 'N/A')}")
         else:
             print(f"🎯 Scraping only for: {channel_id}")
             result = scrape_youtube_channel(channel_id)
+            storage.flush()
             
             if "error" in result:
                 print(f"❌ Error: {result['error']}")
@@ -499,17 +543,18 @@ if __name__ == "__main__":
                 print(f"📺 Channel: {result.get('channel_name', 'N/A')} (@{result['channel_id']})")
                 print(f"👥 Subscribers: {result.get('subscribers', 'N/A')}")
                 print(f"📹 Videos: {result['video_count']}")
-                print(f"📁 CSV file: {result['csv_path']}")
+                print(f"💾 Export CSV: python storage.py export youtube {result['channel_id']}")
                 print("\n💡 To get full analysis, run with --analyze flag")
     else:
         # Default example
         print("🚀 Running YouTube scraper with default channel...")
         result = scrape_youtube_channel("veritasium")
+        storage.flush()
         
         if "error" in result:
             print(f"❌ Error: {result['error']}")
         else:
-            print(f"✅ Complete! Check the generated CSV file.")
+            print(f"✅ Complete! Videos are in the creator store.")
             print("💡 Usage:")
             print("  python scraper-yt.py <channel_id>           # Scrape only")
             print("  python scraper-yt.py <channel_id> --analyze # Scrape + full analysis")
\ No newline at end of file
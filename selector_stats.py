@@ -0,0 +1,262 @@
+"""
+Self-ordering CSS selector chains for the scrapers.
+
+Each chain (e.g. "tiktok.likes") is a list of fallback selectors. Every lookup
+records hit/miss and latency per selector; chains are tried best-first by an
+exponentially weighted hit rate, so when the sites change their markup the
+selector that works now moves to the front without code edits. Stats are
+persisted in the creator store and reloaded on start.
+
+A "hit" only means the selector returned text, so catch-all fallbacks such as
+"h1" or "*[title*='Follow']" would win whenever a specific selector misses
+once (e.g. the counter had not rendered yet) and then return the wrong text
+forever. They are registered separately, always tried last and never
+reordered. Every REPROBE_EVERY lookups a chain is also tried in its
+hand-written order, so a demoted selector gets the chance to recover.
+"""
+import time
+import atexit
+import importlib
+import threading
+from collections import deque
+import storage
+
+# Weight of the newest observation in the hit-rate average
+HIT_RATE_ALPHA = 0.2
+# A selector needs this many attempts before it can be reported as a chain's winner
+MIN_ATTEMPTS_FOR_WINNER = 5
+# Every Nth lookup of a chain uses the hand-written order instead of the learned one
+REPROBE_EVERY = 20
+FLUSH_INTERVAL_S = 30
+# Modules that register their chains when imported
+CHAIN_MODULES = ("scraper", "scraper_yt")
+RECENT_CHANGES_KEPT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS selector_stats (
+    chain        TEXT NOT NULL,
+    selector     TEXT NOT NULL,
+    attempts     INTEGER NOT NULL,
+    hits         INTEGER NOT NULL,
+    hit_rate     REAL NOT NULL,
+    total_ms     REAL NOT NULL,
+    last_hit_at  REAL,
+    updated_at   REAL NOT NULL,
+    PRIMARY KEY (chain, selector)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS selector_winners (
+    chain       TEXT PRIMARY KEY,
+    selector    TEXT NOT NULL,
+    previous    TEXT,
+    changed_at  REAL NOT NULL
+);
+"""
+
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def _connect():
+    conn = storage.connect()
+    with _schema_lock:
+        if storage.DB_PATH not in _initialized_paths:
+            conn.executescript(SCHEMA)
+            _initialized_paths.add(storage.DB_PATH)
+    return conn
+
+
+def _write(stats_rows, winner_rows):
+    _connect()
+    with storage.transaction() as conn:
+        conn.executemany(
+            """INSERT OR REPLACE INTO selector_stats
+               (chain, selector, attempts, hits, hit_rate, total_ms, last_hit_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            stats_rows,
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO selector_winners (chain, selector, previous, changed_at) VALUES (?, ?, ?, ?)",
+            winner_rows,
+        )
+
+
+class SelectorRegistry:
+    """Thread-safe per-selector hit statistics and best-first chain ordering"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chains = {}
+        self._fallbacks = {}
+        self._lookups = {}
+        self._stats = {}
+        self._winners = {}
+        self._previous_winners = {}
+        self._changes = deque(maxlen=RECENT_CHANGES_KEPT)
+        self._wasted = {}
+        self._dirty = set()
+        self._dirty_winners = set()
+        self._loaded_path = None
+        self._last_flush = time.time()
+
+    def register(self, chain, selectors, fallbacks=()):
+        """Declare a chain's selectors in their default order; ``fallbacks`` are catch-alls pinned last"""
+        with self._lock:
+            self._chains[chain] = list(selectors)
+            self._fallbacks[chain] = list(fallbacks)
+            for index, selector in enumerate(list(selectors) + list(fallbacks)):
+                # Prior keeps the hand-written order until real observations arrive
+                self._stats.setdefault((chain, selector), {
+                    "attempts": 0, "hits": 0, "hit_rate": 0.5 - 0.01 * index,
+                    "total_ms": 0.0, "last_hit_at": None,
+                })
+        return chain
+
+    def _load(self):
+        if self._loaded_path == storage.DB_PATH:
+            return
+        self._loaded_path = storage.DB_PATH
+        try:
+            conn = _connect()
+            for row in conn.execute("SELECT * FROM selector_stats"):
+                key = (row["chain"], row["selector"])
+                if key in self._stats:
+                    self._stats[key].update(attempts=row["attempts"], hits=row["hits"], hit_rate=row["hit_rate"],
+                                            total_ms=row["total_ms"], last_hit_at=row["last_hit_at"])
+            for row in conn.execute("SELECT chain, selector, previous FROM selector_winners"):
+                self._winners[row["chain"]] = row["selector"]
+                self._previous_winners[row["chain"]] = row["previous"]
+        except Exception as e:
+            print(f"[SELECTORS] ⚠️ Could not load selector stats: {e}")
+
+    def ordered(self, chain):
+        """Chain selectors, best observed hit rate first (ties keep the default order), fallbacks last"""
+        with self._lock:
+            self._load()
+            defaults = self._chains[chain]
+            self._lookups[chain] = self._lookups.get(chain, 0) + 1
+            if self._lookups[chain] % REPROBE_EVERY == 0:
+                return defaults + self._fallbacks[chain]
+            ranked = sorted(defaults, key=lambda s: (-self._stats[(chain, s)]["hit_rate"], defaults.index(s)))
+            return ranked + self._fallbacks[chain]
+
+    def record(self, chain, selector, hit, latency_ms):
+        now = time.time()
+        with self._lock:
+            stats = self._stats[(chain, selector)]
+            stats["attempts"] += 1
+            stats["hits"] += 1 if hit else 0
+            stats["hit_rate"] += HIT_RATE_ALPHA * ((1.0 if hit else 0.0) - stats["hit_rate"])
+            stats["total_ms"] += latency_ms
+            if hit:
+                stats["last_hit_at"] = now
+            self._dirty.add((chain, selector))
+            self._update_winner(chain, now)
+            flush_due = now - self._last_flush > FLUSH_INTERVAL_S
+        if flush_due:
+            self.flush()
+
+    def _update_winner(self, chain, now):
+        defaults = self._chains[chain]
+        best = max(defaults, key=lambda s: (self._stats[(chain, s)]["hit_rate"], -defaults.index(s)))
+        if self._stats[(chain, best)]["attempts"] < MIN_ATTEMPTS_FOR_WINNER:
+            return
+        previous = self._winners.get(chain)
+        if best != previous:
+            self._winners[chain] = best
+            self._previous_winners[chain] = previous
+            self._dirty_winners.add(chain)
+            if previous is not None:
+                self._changes.append({"chain": chain, "from": previous, "to": best, "at": now})
+                print(f"[SELECTORS] Winner for {chain} changed: {previous!r} -> {best!r}")
+
+    def first_match(self, chain, lookup):
+        """Try the chain best-first; lookup(selector) returns a value or raises/returns falsy"""
+        misses = 0
+        for selector in self.ordered(chain):
+            start = time.perf_counter()
+            try:
+                value = lookup(selector)
+            except Exception:
+                value = None
+            self.record(chain, selector, bool(value), (time.perf_counter() - start) * 1000)
+            if value:
+                self._count_wasted(chain, misses)
+                return value
+            misses += 1
+        self._count_wasted(chain, misses)
+        return None
+
+    def _count_wasted(self, chain, misses):
+        with self._lock:
+            lookups, wasted = self._wasted.get(chain, (0, 0))
+            self._wasted[chain] = (lookups + 1, wasted + misses)
+
+    def flush(self):
+        """Queue dirty stats and winner changes for a background store write"""
+        with self._lock:
+            now = time.time()
+            stats_rows = [
+                (chain, selector, s["attempts"], s["hits"], s["hit_rate"], s["total_ms"], s["last_hit_at"], now)
+                for (chain, selector), s in ((k, self._stats[k]) for k in self._dirty)
+            ]
+            winner_rows = [(chain, self._winners[chain], self._previous_winners.get(chain), now)
+                           for chain in self._dirty_winners]
+            self._dirty.clear()
+            self._dirty_winners.clear()
+            self._last_flush = now
+        if stats_rows or winner_rows:
+            storage.persist_async(_write, stats_rows, winner_rows)
+
+    def snapshot(self, recent=20):
+        with self._lock:
+            self._load()
+            chains = {}
+            for chain, defaults in self._chains.items():
+                lookups, wasted = self._wasted.get(chain, (0, 0))
+                rows = []
+                ranked = sorted(defaults, key=lambda s: -self._stats[(chain, s)]["hit_rate"])
+                for selector in ranked + self._fallbacks[chain]:
+                    s = self._stats[(chain, selector)]
+                    rows.append({
+                        "selector": selector,
+                        "attempts": s["attempts"],
+                        "hits": s["hits"],
+                        "hit_rate": round(s["hit_rate"], 4),
+                        "avg_ms": round(s["total_ms"] / s["attempts"], 2) if s["attempts"] else 0.0,
+                        "last_hit_at": s["last_hit_at"],
+                        "fallback": selector in self._fallbacks[chain],
+                    })
+                chains[chain] = {
+                    "winner": self._winners.get(chain),
+                    "previous_winner": self._previous_winners.get(chain),
+                    "default_first": defaults[0],
+                    "winner_changed": self._winners.get(chain) not in (None, defaults[0]),
+                    "wasted_lookups_per_item": round(wasted / lookups, 3) if lookups else 0.0,
+                    "selectors": rows,
+                }
+            return {"chains": chains, "recent_changes": list(self._changes)[-recent:] if recent else []}
+
+
+SELECTORS = SelectorRegistry()
+# Registered after storage's own atexit flush, so it runs first and the writer drains it
+atexit.register(SELECTORS.flush)
+
+
+def chain(name, selectors, fallbacks=()):
+    """Register a selector chain with the global registry and return its name"""
+    return SELECTORS.register(name, selectors, fallbacks)
+
+
+def first_match(name, lookup):
+    return SELECTORS.first_match(name, lookup)
+
+
+def load_chains():
+    """Import the scrapers so every chain is registered, even before the first scrape"""
+    for module in CHAIN_MODULES:
+        importlib.import_module(module)
+
+
+def get_selector_stats(recent=20):
+    return SELECTORS.snapshot(recent=recent)
@@ -0,0 +1,480 @@
+"""
+Embedded creator data store (SQLite in WAL mode).
+
+Scrapers write creators, videos and scrape runs here (off the request
+path via persist_async) and the analyzers read them back by creator when
+no fresh scrape is handed to them. CSV is only an export format:
+
+    python storage.py export tiktok <username> [path.csv]
+"""
+import os
+import re
+import csv
+import json
+import time
+import uuid
+import queue
+import atexit
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, wait
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("TRENDLYTICS_DB", os.path.join(BASE_DIR, "trendlytics.db"))
+
+# A failed run (or one left 'running' by a killed process) newer than this is resumed
+RESUME_MAX_AGE_S = float(os.environ.get("SCRAPE_RESUME_MAX_AGE_S", 6 * 3600))
+# A 'running' run counts as abandoned once it has made no progress for this long
+RUN_STALE_S = float(os.environ.get("SCRAPE_RUN_STALE_S", 300))
+# How long a read waits for its creator's queued writes before reading what is there
+WRITE_WAIT_S = float(os.environ.get("STORAGE_WRITE_WAIT_S", 10))
+
+# Titles the scrapers substitute for a missing one; they say nothing about which video it is
+PLACEHOLDER_TITLE_RE = re.compile(r"^(Untitled Video|Video \d+)$")
+
+# Columns each platform's scraper produces, in export order
+PLATFORM_COLUMNS = {
+    "tiktok": ["url", "likes", "comments", "description"],
+    "youtube": ["title", "views", "upload_time", "url"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS creators (
+    id          INTEGER PRIMARY KEY,
+    platform    TEXT NOT NULL,
+    handle      TEXT NOT NULL,
+    name        TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    UNIQUE (platform, handle)
+);
+
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    id           TEXT PRIMARY KEY,
+    creator_id   INTEGER NOT NULL REFERENCES creators(id),
+    started_at   REAL NOT NULL,
+    finished_at  REAL,
+    status       TEXT NOT NULL,
+    video_count  INTEGER NOT NULL DEFAULT 0,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scrape_runs_creator ON scrape_runs (creator_id, started_at);
+
+CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+    run_id      TEXT NOT NULL REFERENCES scrape_runs(id),
+    item_key    TEXT NOT NULL,
+    position    INTEGER,
+    payload     TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (run_id, item_key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS videos (
+    creator_id   INTEGER NOT NULL REFERENCES creators(id),
+    video_key    TEXT NOT NULL,
+    url          TEXT,
+    title        TEXT,
+    description  TEXT,
+    likes        TEXT,
+    comments     TEXT,
+    views        TEXT,
+    upload_time  TEXT,
+    position     INTEGER,
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL,
+    last_run_id  TEXT,
+    PRIMARY KEY (creator_id, video_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_videos_creator_seen ON videos (creator_id, last_seen);
+
+CREATE TABLE IF NOT EXISTS signatures (
+    creator_id    INTEGER PRIMARY KEY REFERENCES creators(id),
+    signature     TEXT NOT NULL,
+    title_hashes  TEXT NOT NULL,
+    updated_at    REAL NOT NULL,
+    baseline_hashes TEXT
+);
+"""
+
+# Columns added after a table first shipped: (table, column, declaration)
+MIGRATIONS = [
+    ("signatures", "baseline_hashes", "TEXT"),
+]
+
+
+def _migrate(conn):
+    for table, column, declaration in MIGRATIONS:
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def connect():
+    """Per-thread connection to DB_PATH with WAL enabled and the schema in place"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == DB_PATH:
+        return conn
+
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.execute("PRAGMA foreign_keys=ON")
+    with _schema_lock:
+        if DB_PATH not in _initialized_paths:
+            conn.executescript(SCHEMA)
+            _migrate(conn)
+            _initialized_paths.add(DB_PATH)
+    _local.conn, _local.path = conn, DB_PATH
+    return conn
+
+
+@contextmanager
+def transaction():
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error"""
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _creator_id(conn, platform, handle, name=None):
+    now = time.time()
+    conn.execute(
+        """INSERT INTO creators (platform, handle, name, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (platform, handle) DO UPDATE SET
+               name = COALESCE(excluded.name, creators.name),
+               updated_at = excluded.updated_at""",
+        (platform, handle, name, now, now),
+    )
+    return conn.execute(
+        "SELECT id FROM creators WHERE platform = ? AND handle = ?", (platform, handle)
+    ).fetchone()["id"]
+
+
+def find_creator_id(platform, handle):
+    row = connect().execute(
+        "SELECT id FROM creators WHERE platform = ? AND handle = ?", (platform, handle)
+    ).fetchone()
+    return row["id"] if row else None
+
+
+def upsert_creator(platform, handle, name=None):
+    with transaction() as conn:
+        return _creator_id(conn, platform, handle, name)
+
+
+def start_scrape_run(platform, handle):
+    """Open a scrape run for a creator and return its id"""
+    run_id = uuid.uuid4().hex
+    with transaction() as conn:
+        creator_id = _creator_id(conn, platform, handle)
+        conn.execute(
+            "INSERT INTO scrape_runs (id, creator_id, started_at, status) VALUES (?, ?, ?, 'running')",
+            (run_id, creator_id, time.time()),
+        )
+    return run_id
+
+
+def finish_scrape_run(run_id, status, video_count=0, error=None):
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE scrape_runs SET finished_at = ?, status = ?, video_count = ?, error = ? WHERE id = ?",
+            (time.time(), status, video_count, error, run_id),
+        )
+
+
+def resume_scrape_run(platform, handle):
+    """Reopen the creator's latest unfinished run if it can be resumed; returns its id or None"""
+    now = time.time()
+    with transaction() as conn:
+        row = conn.execute(
+            """SELECT r.id, r.status, r.started_at,
+                      (SELECT MAX(created_at) FROM scrape_checkpoints c WHERE c.run_id = r.id) AS last_checkpoint
+               FROM scrape_runs r JOIN creators cr ON cr.id = r.creator_id
+               WHERE cr.platform = ? AND cr.handle = ?
+               ORDER BY r.started_at DESC LIMIT 1""",
+            (platform, handle),
+        ).fetchone()
+        if row is None or row["status"] not in ("running", "failed") or now - row["started_at"] > RESUME_MAX_AGE_S:
+            return None
+        last_activity = max(row["started_at"], row["last_checkpoint"] or 0)
+        if row["status"] == "running" and now - last_activity < RUN_STALE_S:
+            return None  # still in progress elsewhere
+        conn.execute(
+            "UPDATE scrape_runs SET status = 'running', finished_at = NULL, error = NULL WHERE id = ?",
+            (row["id"],),
+        )
+    return row["id"]
+
+
+def save_checkpoint(run_id, item_key, payload, position=None):
+    """Durably record one finished item of a scrape run (synchronous on purpose)"""
+    with transaction() as conn:
+        conn.execute(
+            """INSERT OR REPLACE INTO scrape_checkpoints (run_id, item_key, position, payload, created_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            (run_id, item_key, position, json.dumps(payload), time.time()),
+        )
+
+
+def load_checkpoints(run_id):
+    """{item_key: payload} saved for a run, in position order"""
+    rows = connect().execute(
+        "SELECT item_key, payload FROM scrape_checkpoints WHERE run_id = ? ORDER BY position, created_at",
+        (run_id,),
+    ).fetchall()
+    return {r["item_key"]: json.loads(r["payload"]) for r in rows}
+
+
+def clear_checkpoints(run_id):
+    with transaction() as conn:
+        conn.execute("DELETE FROM scrape_checkpoints WHERE run_id = ?", (run_id,))
+
+
+def video_key(row):
+    """Identity of a video within a creator: its URL, or a title hash when the URL is missing.
+
+    None for a row with neither a URL nor a real title (only a placeholder), which cannot be told apart.
+    """
+    url = row.get("url")
+    if url and url != "N/A":
+        return url
+    text = (row.get("title") or row.get("description") or "").strip()
+    if not text or PLACEHOLDER_TITLE_RE.match(text):
+        return None
+    return "title:" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def upsert_videos(platform, handle, rows, run_id=None, name=None):
+    """Insert or refresh scraped videos for a creator in one transaction (rows without a key are skipped)"""
+    now = time.time()
+    keyed = [row for row in rows if video_key(row)]
+    if len(keyed) < len(rows):
+        print(f"[STORAGE] Skipped {len(rows) - len(keyed)} {platform} rows for {handle} with no URL or real title")
+    rows = keyed
+    with transaction() as conn:
+        creator_id = _creator_id(conn, platform, handle, name)
+        conn.executemany(
+            """INSERT INTO videos (creator_id, video_key, url, title, description, likes, comments,
+                                   views, upload_time, position, first_seen, last_seen, last_run_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (creator_id, video_key) DO UPDATE SET
+                   url = excluded.url,
+                   title = COALESCE(excluded.title, videos.title),
+                   description = COALESCE(excluded.description, videos.description),
+                   likes = COALESCE(excluded.likes, videos.likes),
+                   comments = COALESCE(excluded.comments, videos.comments),
+                   views = COALESCE(excluded.views, videos.views),
+                   upload_time = COALESCE(excluded.upload_time, videos.upload_time),
+                   position = excluded.position,
+                   last_seen = excluded.last_seen,
+                   last_run_id = excluded.last_run_id""",
+            [
+                (creator_id, video_key(row), row.get("url"), row.get("title"), row.get("description"),
+                 row.get("likes"), row.get("comments"), row.get("views"), row.get("upload_time"),
+                 position, now, now, run_id)
+                for position, row in enumerate(rows)
+            ],
+        )
+    return len(rows)
+
+
+def load_videos(platform, handle, limit=None):
+    """Stored videos for a creator, most recently scraped first, as a DataFrame"""
+    # Read-your-writes for this creator's scrapes still sitting in the background queue
+    wait_for_writes(platform, handle)
+    columns = PLATFORM_COLUMNS[platform]
+    creator_id = find_creator_id(platform, handle)
+    if creator_id is None:
+        return pd.DataFrame(columns=columns)
+    sql = f"""SELECT {', '.join(columns)} FROM videos
+              WHERE creator_id = ?
+              ORDER BY last_seen DESC, position ASC"""
+    params = [creator_id]
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    rows = connect().execute(sql, params).fetchall()
+    return pd.DataFrame([dict(r) for r in rows], columns=columns)
+
+
+def known_videos(platform, handle):
+    """{url: (first_seen, last_seen)} for every stored video of a creator that has a URL"""
+    wait_for_writes(platform, handle)
+    creator_id = find_creator_id(platform, handle)
+    if creator_id is None:
+        return {}
+    rows = connect().execute(
+        "SELECT url, first_seen, last_seen FROM videos WHERE creator_id = ? AND url IS NOT NULL AND url != 'N/A'",
+        (creator_id,),
+    ).fetchall()
+    return {r["url"]: (r["first_seen"], r["last_seen"]) for r in rows}
+
+
+def count_videos(platform, handle):
+    creator_id = find_creator_id(platform, handle)
+    if creator_id is None:
+        return 0
+    return connect().execute("SELECT COUNT(*) FROM videos WHERE creator_id = ?", (creator_id,)).fetchone()[0]
+
+
+def save_signature(platform, handle, signature, title_hashes, baseline_hashes):
+    """``title_hashes``: every title the signature has seen; ``baseline_hashes``: those of its last full recompute"""
+    with transaction() as conn:
+        creator_id = _creator_id(conn, platform, handle)
+        conn.execute(
+            """INSERT INTO signatures (creator_id, signature, title_hashes, baseline_hashes, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (creator_id) DO UPDATE SET
+                   signature = excluded.signature,
+                   title_hashes = excluded.title_hashes,
+                   baseline_hashes = excluded.baseline_hashes,
+                   updated_at = excluded.updated_at""",
+            (creator_id, json.dumps(signature), json.dumps(sorted(title_hashes)),
+             json.dumps(sorted(baseline_hashes)), time.time()),
+        )
+
+
+def load_signature(platform, handle):
+    """{"signature", "title_hashes", "baseline_hashes", "updated_at"} saved for a creator, or None"""
+    creator_id = find_creator_id(platform, handle)
+    if creator_id is None:
+        return None
+    row = connect().execute(
+        "SELECT signature, title_hashes, baseline_hashes, updated_at FROM signatures WHERE creator_id = ?",
+        (creator_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    title_hashes = json.loads(row["title_hashes"])
+    return {
+        "signature": json.loads(row["signature"]),
+        "title_hashes": title_hashes,
+        # Rows saved before baselines were tracked: their hashes are the best baseline there is
+        "baseline_hashes": json.loads(row["baseline_hashes"]) if row["baseline_hashes"] else title_hashes,
+        "updated_at": row["updated_at"],
+    }
+
+
+_write_queue = queue.Queue()
+_writer_lock = threading.Lock()
+_writer_thread = None
+# (platform, handle) -> Futures of that creator's writes not applied yet
+_pending = {}
+
+
+def _writer_loop():
+    while True:
+        fn, args, kwargs, future = _write_queue.get()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            print(f"[STORAGE] ❌ Background write {getattr(fn, '__name__', fn)} failed: {e}")
+            future.set_exception(e)
+        finally:
+            _write_queue.task_done()
+
+
+def persist_async(fn, *args, creator=None, **kwargs):
+    """Run a storage write on the background writer thread, off the request path.
+
+    Writes are applied in submission order by a single thread, which also
+    keeps SQLite writer contention inside this process to one connection.
+    Returns a Future that completes when the write is applied; pass
+    ``creator=(platform, handle)`` so that creator's reads wait for it.
+    """
+    global _writer_thread
+    future = Future()
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name="storage-writer", daemon=True)
+            _writer_thread.start()
+        if creator is not None:
+            _pending.setdefault(creator, set()).add(future)
+            future.add_done_callback(lambda f: _forget(creator, f))
+    _write_queue.put((fn, args, kwargs, future))
+    return future
+
+
+def _forget(creator, future):
+    with _writer_lock:
+        pending = _pending.get(creator)
+        if pending is not None:
+            pending.discard(future)
+            if not pending:
+                del _pending[creator]
+
+
+def wait_for_writes(platform, handle, timeout=WRITE_WAIT_S):
+    """Block until this creator's queued writes are applied; False (and a warning) on timeout"""
+    if threading.current_thread() is _writer_thread:
+        return True  # a queued write reading the store must not wait on itself
+    with _writer_lock:
+        pending = list(_pending.get((platform, handle), ()))
+    if not pending or timeout <= 0:
+        return not pending  # timeout=0: caller explicitly reads without waiting
+    _, not_done = wait(pending, timeout=timeout)
+    if not_done:
+        print(f"[STORAGE] ⚠️ {len(not_done)} write(s) for {platform}:{handle} still queued after {timeout:.1f}s; "
+              f"reading possibly stale data")
+        return False
+    return True
+
+
+def flush(timeout=30):
+    """Block until every queued background write is applied (shutdown/CLI); False (and a warning) on timeout"""
+    if threading.current_thread() is _writer_thread:
+        return True
+    deadline = time.time() + timeout
+    while _write_queue.unfinished_tasks:
+        if time.time() > deadline:
+            print(f"[STORAGE] ⚠️ {_write_queue.unfinished_tasks} background write(s) still queued after {timeout}s")
+            return False
+        time.sleep(0.05)
+    return True
+
+
+atexit.register(flush)
+
+
+def persist_scrape(platform, handle, rows, run_id, name=None):
+    """Store a finished scrape and close its run (meant for persist_async)"""
+    try:
+        stored = upsert_videos(platform, handle, rows, run_id=run_id, name=name)
+        finish_scrape_run(run_id, "success", video_count=stored)
+        clear_checkpoints(run_id)
+    except Exception as e:
+        finish_scrape_run(run_id, "failed", error=str(e)[:500])
+        raise
+
+
+def export_csv(platform, handle, path=None):
+    """Write a creator's stored videos to CSV and return the path"""
+    path = path or f"{handle}_{platform}_videos.csv"
+    df = load_videos(platform, handle)
+    df.to_csv(path, index=False, quoting=csv.QUOTE_MINIMAL)
+    return os.path.abspath(path)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 4 and sys.argv[1] == "export":
+        out = export_csv(sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else None)
+        print(f"Exported {sys.argv[2]} videos for {sys.argv[3]} to {out}")
+    else:
+        print("Usage: python storage.py export <tiktok|youtube> <handle> [path.csv]")
@@ -0,0 +1,39 @@
+import os
+import sys
+import socket
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Modules read TRENDLYTICS_DB at import; never touch the real creator store
+os.environ.setdefault("TRENDLYTICS_DB", os.path.join(tempfile.mkdtemp(prefix="trendlytics-tests-"), "test.db"))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Fresh, empty creator store for one test"""
+    import storage
+
+    monkeypatch.setattr(storage, "DB_PATH", str(tmp_path / "store.db"))
+    yield storage
+    storage.flush()
+
+
+@pytest.fixture(scope="session")
+def mock_llm_url():
+    """mock_llm_server.py running on a free local port"""
+    import mock_llm_server
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return mock_llm_server.start_in_thread(port=port)
+
+
+@pytest.fixture
+def mock_llm(mock_llm_url, monkeypatch):
+    monkeypatch.setenv("DEEPSEEK_BASE_URL", mock_llm_url)
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+    return mock_llm_url
@@ -0,0 +1,42 @@
+import pytest
+
+import admission
+
+
+def controller(free_mb, **kwargs):
+    return admission.AdmissionController(limits={"tiktok": 2}, max_browsers=4, max_wait_s=0.05,
+                                         memory_probe=lambda: free_mb, **kwargs)
+
+
+def test_admits_one_browser_when_idle_even_with_little_free_memory():
+    adm = controller(free_mb=200)
+
+    ticket = adm.try_acquire("tiktok")
+
+    assert ticket.endpoint == "tiktok"
+    adm.release(ticket)
+
+
+def test_low_memory_caps_extra_concurrency():
+    adm = controller(free_mb=200)
+    first = adm.try_acquire("tiktok")
+
+    with pytest.raises(admission.AdmissionRejected) as rejected:
+        adm.try_acquire("tiktok")
+
+    assert rejected.value.status == 503
+    assert rejected.value.reason == "queue_timeout"
+    assert rejected.value.retry_after >= 1
+    adm.release(first)
+
+
+def test_batch_leaves_a_slot_for_interactive():
+    adm = controller(free_mb=None)
+    batch = adm.try_acquire("tiktok", batch=True)
+
+    with pytest.raises(admission.AdmissionRejected):
+        adm.try_acquire("tiktok", max_wait_s=0, batch=True)
+    interactive = adm.try_acquire("tiktok")
+
+    adm.release(batch)
+    adm.release(interactive)
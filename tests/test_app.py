@@ -0,0 +1,52 @@
+import io
+
+import pandas as pd
+
+import app as app_module
+import scraper_yt
+import youtubeanalyzer
+
+TITLES = [f"My {topic} routine that actually works, week {i}"
+          for i, topic in enumerate(["morning", "study", "gym", "cooking", "cleaning", "budget"] * 3)]
+
+
+def _upload(filename):
+    body = "title,views\n" + "\n".join(f'"{t}",1K views' for t in TITLES) + "\n"
+    client = app_module.app.test_client()
+    return client.post("/api/youtube/analyze", content_type="multipart/form-data",
+                       data={"csv_file": (io.BytesIO(body.encode("utf-8")), filename)})
+
+
+def test_upload_of_export_uses_channel_id_from_original_name(store, mock_llm):
+    resp = _upload("somechannel_youtube_videos.csv")
+
+    assert resp.get_json()["status"] == "success", resp.get_json()
+    assert store.load_signature("youtube", "somechannel") is not None
+    assert store.load_signature("youtube", "temp_somechannel") is None
+
+
+def test_channel_id_from_csv_only_matches_exports():
+    assert youtubeanalyzer.channel_id_from_csv("/tmp/somechannel_youtube_videos.csv") == "somechannel"
+    assert youtubeanalyzer.channel_id_from_csv("my_titles.csv") is None
+    assert youtubeanalyzer.channel_id_from_csv("_youtube_videos.csv") is None
+
+
+def test_full_youtube_route_runs_scrape_and_analysis_under_one_deadline(store, mock_llm, monkeypatch):
+    seen = {}
+
+    def fake_stats(channel_id, deadline=None):
+        seen["deadline"] = deadline
+        return {"channel_id": channel_id, "channel_name": "Some Channel", "subscribers": "1K",
+                "video_count": len(TITLES), "run_id": None, "videos": pd.DataFrame({"title": TITLES})}
+
+    monkeypatch.setattr(scraper_yt, "get_youtube_channel_stats", fake_stats)
+    # An already spent budget: every LLM stage must take its fallback
+    monkeypatch.setattr(app_module, "YOUTUBE_REQUEST_BUDGET_S", 0)
+
+    resp = app_module.app.test_client().post("/api/youtube/full", json={"channel_id": "somechannel"})
+
+    payload = resp.get_json()
+    assert payload["status"] == "success", payload
+    assert seen["deadline"].budget_s == 0
+    assert {"signature", "video_ideas", "growth_tips"} <= {d["stage"] for d in payload["degraded"]}
+    assert payload["signature"] == youtubeanalyzer.FALLBACK_SIGNATURE
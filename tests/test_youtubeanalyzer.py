@@ -0,0 +1,56 @@
+import pytest
+import pandas as pd
+
+import youtubeanalyzer
+
+TITLES = [f"How I built a {topic} setup on a budget, part {i}"
+          for i, topic in enumerate(["home studio", "camera", "lighting", "editing", "audio", "desk"] * 3)]
+
+
+def test_one_shot_with_channel_id_saves_signature_as_baseline(store, mock_llm):
+    videos = pd.DataFrame({"title": TITLES, "views": "1K views", "upload_time": "1 day ago", "url": "N/A"})
+
+    result = youtubeanalyzer.run_youtube_analysis(mode="one_shot", channel_id="somechannel", videos=videos)
+
+    assert "error" not in result, result
+    assert result["signature_strategy"] == "full"
+    state = store.load_signature("youtube", "somechannel")
+    assert state is not None
+    assert set(state["baseline_hashes"]) == set(state["title_hashes"]) == {
+        youtubeanalyzer.title_hash(t) for t in TITLES}
+
+
+def _ragged_csv(tmp_path):
+    path = tmp_path / "ragged_youtube_videos.csv"
+    rows = ["title,views,upload_time,url"]
+    rows += [f'"{t}",1K views,1 day ago,N/A' for t in TITLES]
+    # Extra fields: dropped by every engine instead of failing the whole file
+    rows.insert(3, '"Broken row with too many fields",1K views,1 day ago,N/A,extra,extra')
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("has_pyarrow", [False, True])
+def test_load_video_data_skips_bad_lines(tmp_path, monkeypatch, has_pyarrow):
+    if has_pyarrow:
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(youtubeanalyzer, "_HAS_PYARROW", has_pyarrow)
+    analyzer = youtubeanalyzer.YouTubeChannelAnalyzer(api_key="test")
+
+    frame, titles = analyzer.load_video_data(_ragged_csv(tmp_path))
+
+    # With usecols the C parser keeps over-long rows, so only require the good titles
+    assert set(TITLES) <= set(titles)
+    assert list(frame.columns) == ["title"]
+
+
+@pytest.mark.parametrize("has_pyarrow", [False, True])
+def test_read_video_csv_returns_every_column(tmp_path, monkeypatch, has_pyarrow):
+    if has_pyarrow:
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(youtubeanalyzer, "_HAS_PYARROW", has_pyarrow)
+
+    df = youtubeanalyzer.read_video_csv(_ragged_csv(tmp_path))
+
+    assert list(df.columns) == ["title", "views", "upload_time", "url"]
+    assert df["title"].tolist() == TITLES
@@ -0,0 +1,128 @@
+import re
+import zlib
+import math
+import numpy as np
+
+# Rough prompt cost of one title inside a json.dumps(indent=2) list
+TITLE_TOKEN_OVERHEAD = 3
+HASH_DIM = 512
+KMEANS_ITERATIONS = 15
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def estimate_tokens(title):
+    """Approximate BPE token count of a title as it appears in the prompt"""
+    return len(title) // 4 + TITLE_TOKEN_OVERHEAD
+
+
+def _features(title):
+    words = _WORD_RE.findall(title.lower())
+    feats = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    squashed = " ".join(words)
+    feats += [f"#{squashed[i:i + 3]}" for i in range(max(0, len(squashed) - 2))]
+    return feats
+
+
+def hash_vectors(titles, dim=HASH_DIM):
+    """L2-normalized hashed word/bigram/char-trigram vectors, one row per title"""
+    X = np.zeros((len(titles), dim), dtype=np.float32)
+    for row, title in enumerate(titles):
+        for feat in _features(title):
+            h = zlib.crc32(feat.encode("utf-8"))
+            # Top bit picks the sign so collisions cancel out instead of piling up
+            X[row, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+def kmeans(X, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means with k-means++ seeding; returns (labels, centroids)"""
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    centroids = np.empty((k, X.shape[1]), dtype=X.dtype)
+    centroids[0] = X[rng.integers(n)]
+    closest = 1.0 - X @ centroids[0]
+    for c in range(1, k):
+        probs = np.clip(closest, 0, None).astype(np.float64)
+        total = probs.sum()
+        idx = rng.choice(n, p=probs / total) if total > 0 else rng.integers(n)
+        centroids[c] = X[idx]
+        closest = np.minimum(closest, 1.0 - X @ centroids[c])
+
+    labels = np.zeros(n, dtype=np.int64)
+    for iteration in range(iterations):
+        new_labels = np.argmax(X @ centroids.T, axis=1)
+        if iteration > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = X[labels == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[c] = centroid / norm if norm else centroid
+    return labels, centroids
+
+
+def select_representative_titles(titles, token_budget=600, max_titles=50, max_clusters=12,
+                                 recency_half_life=None):
+    """Pick a diverse, recency-weighted sample of titles that fits a token budget.
+
+    Titles are expected newest-first (the order the scrapers emit them).
+    Returns {"titles": [...], "coverage": {...}}.
+    """
+    n = len(titles)
+    if n == 0:
+        return {"titles": [], "coverage": {"titles_total": 0, "titles_sampled": 0, "clusters": 0,
+                                           "clusters_covered": 0, "title_coverage": 0.0,
+                                           "weighted_coverage": 0.0, "estimated_tokens": 0}}
+
+    half_life = recency_half_life or max(10.0, n / 4)
+    recency = 0.5 ** (np.arange(n) / half_life)
+
+    k = max(1, min(max_clusters, n, round(math.sqrt(n))))
+    X = hash_vectors(titles)
+    labels, centroids = kmeans(X, k)
+
+    # Within a cluster prefer titles close to the centroid and recent
+    centrality = np.einsum("ij,ij->i", X, centroids[labels])
+    score = (0.5 + 0.5 * centrality) * recency
+    cluster_weight = np.bincount(labels, weights=recency, minlength=k)
+    cluster_order = [c for c in np.argsort(-cluster_weight) if cluster_weight[c] > 0]
+    queues = {c: sorted(np.flatnonzero(labels == c), key=lambda i: -score[i]) for c in cluster_order}
+
+    # Round-robin over clusters, heaviest first, until the budget or title cap is hit
+    picked, tokens = [], 0
+    while queues and len(picked) < max_titles:
+        for c in list(queues):
+            queue = queues[c]
+            while queue:
+                idx = queue.pop(0)
+                cost = estimate_tokens(titles[idx])
+                if tokens + cost <= token_budget:
+                    picked.append(idx)
+                    tokens += cost
+                    break
+            if not queue:
+                del queues[c]
+            if len(picked) >= max_titles:
+                break
+        if tokens >= token_budget - TITLE_TOKEN_OVERHEAD:
+            break
+
+    # Keep the original (newest-first) order in the prompt
+    picked.sort()
+    covered = set(labels[picked].tolist())
+    in_covered = np.isin(labels, list(covered))
+    coverage = {
+        "titles_total": n,
+        "titles_sampled": len(picked),
+        "clusters": int(len(cluster_order)),
+        "clusters_covered": len(covered),
+        "title_coverage": round(float(in_covered.mean()), 4),
+        "weighted_coverage": round(float(recency[in_covered].sum() / recency.sum()), 4),
+        "estimated_tokens": tokens,
+    }
+    return {"titles": [titles[i] for i in picked], "coverage": coverage}
@@ -0,0 +1,110 @@
+"""
+Engagement velocity over scrape history.
+
+Joins consecutive snapshots of the same video (see history.py) and turns
+count deltas into rates: likes/comments/views per hour, follower growth per
+day, and a decay curve of velocity by how long a video has been tracked.
+Everything is a groupby/diff over the whole frame, so it scales to large
+histories without per-video Python loops.
+"""
+import numpy as np
+import pandas as pd
+import history
+
+# Upper edges (hours since a video was first seen) of the decay curve buckets
+AGE_BUCKETS_H = [24, 72, 168, 720, np.inf]
+AGE_LABELS = ["0-1d", "1-3d", "3-7d", "7-30d", "30d+"]
+RATE_COLUMNS = ["likes", "comments", "views"]
+
+
+def video_velocity(snapshots, keys=("video_key",)):
+    """Per-interval rates for every consecutive snapshot pair of the same video.
+
+    ``snapshots`` needs the ``keys`` columns, captured_at (epoch seconds) and
+    any of likes/comments/views. Returns one row per interval with
+    <count>_per_hour, age_hours (since first snapshot) and interval_hours.
+    """
+    keys = list(keys)
+    columns = [c for c in RATE_COLUMNS if c in snapshots.columns]
+    if snapshots.empty:
+        return pd.DataFrame(columns=keys + ["captured_at", "age_hours", "interval_hours"]
+                            + [f"{c}_per_hour" for c in columns])
+
+    df = snapshots.sort_values(keys + ["captured_at"], kind="stable").reset_index(drop=True)
+    counts = df[columns].apply(pd.to_numeric, errors="coerce").astype("float64")
+    by = [df[k] for k in keys]
+
+    hours = df["captured_at"].astype("float64") / 3600
+    interval = hours.groupby(by, sort=False).diff()
+    first_seen = hours.groupby(by, sort=False).transform("min")
+
+    out = df[keys + ["captured_at"]].copy()
+    out["age_hours"] = hours - first_seen
+    out["interval_hours"] = interval
+    deltas = counts.groupby(by, sort=False).diff()
+    for c in columns:
+        # Counts can dip when a scrape misreads a value; treat that as no growth
+        out[f"{c}_per_hour"] = deltas[c].clip(lower=0) / interval
+    return out[interval > 0].reset_index(drop=True)
+
+
+def decay_curve(velocity, rate="likes_per_hour"):
+    """Mean and median of a rate column by age bucket since a video was first seen"""
+    if velocity.empty or rate not in velocity:
+        return []
+    buckets = pd.cut(velocity["age_hours"], [-np.inf] + AGE_BUCKETS_H, labels=AGE_LABELS)
+    stats = velocity.groupby(buckets, observed=True)[rate].agg(["mean", "median", "count"])
+    return [
+        {"age": str(label), f"mean_{rate}": round(float(row["mean"]), 3),
+         f"median_{rate}": round(float(row["median"]), 3), "intervals": int(row["count"])}
+        for label, row in stats[stats["count"] > 0].iterrows()
+    ]
+
+
+def follower_growth(profile):
+    """Follower growth from profile snapshots: overall per-day rate, percent change, latest interval"""
+    df = profile.dropna(subset=["followers"]).sort_values("captured_at")
+    if len(df) < 2:
+        return {"snapshots": len(df), "followers_per_day": None, "growth_pct": None, "latest_per_day": None}
+    days = (df["captured_at"].astype("float64") / 86_400).to_numpy()
+    followers = df["followers"].astype("float64").to_numpy()
+    span = days[-1] - days[0]
+    per_day = np.diff(followers) / np.diff(days)
+    return {
+        "snapshots": len(df),
+        "followers_per_day": round(float((followers[-1] - followers[0]) / span), 3) if span else None,
+        "growth_pct": round(float((followers[-1] - followers[0]) / followers[0] * 100), 3) if followers[0] else None,
+        "latest_per_day": round(float(per_day[-1]), 3) if np.isfinite(per_day[-1]) else None,
+    }
+
+
+def creator_velocity(platform, handle, since=None, until=None, top_n=5, wait_s=history.READ_WRITE_WAIT_S):
+    """Velocity summary for one creator, ready to serialize into an API response.
+
+    ``wait_s`` bounds the wait for the creator's just-queued snapshot; after it the stored history is used as is.
+    """
+    velocity = video_velocity(history.video_history(platform, handle, since, until, wait_s))
+    profile = history.profile_history(platform, handle, since, until, wait_s=0)  # already waited above
+
+    # TikTok pages expose likes, YouTube cards expose views
+    rate = "views_per_hour" if platform == "youtube" else "likes_per_hour"
+    top_videos = []
+    if not velocity.empty:
+        # Latest interval per video is its current velocity
+        latest = velocity.groupby("video_key", sort=False).tail(1)
+        latest = latest.sort_values(rate, ascending=False).head(top_n)
+        for row in latest.itertuples(index=False):
+            top_videos.append({
+                "url": row.video_key,
+                "tracked_hours": round(float(row.age_hours), 1),
+                **{c: (round(float(getattr(row, c)), 3) if pd.notna(getattr(row, c)) else None)
+                   for c in velocity.columns if c.endswith("_per_hour")},
+            })
+
+    return {
+        "intervals": int(len(velocity)),
+        "videos_tracked": int(velocity["video_key"].nunique()) if not velocity.empty else 0,
+        "follower_growth": follower_growth(profile),
+        "decay_curve": decay_curve(velocity, rate),
+        "fastest_videos": top_videos,
+    }
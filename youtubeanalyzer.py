@@ -1,11 +1,73 @@
 import os, json, time, re, textwrap
+import hashlib
+import importlib.util
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
 import pandas as pd
 from openai import OpenAI
 from pathlib import Path
+from llm_metrics import tracked_completion, record_fallback, creator_scope
+from title_sampling import select_representative_titles
+from deadline import unlimited
+import storage
+
+# Bump these whenever the prompt text changes so metrics stay comparable
+SIGNATURE_PROMPT_VERSION = "yt-signature-v1"
+IDEAS_PROMPT_VERSION = "yt-ideas-v1"
+GROWTH_TIPS_PROMPT_VERSION = "yt-growth-tips-v1"
+ONE_SHOT_PROMPT_VERSION = "yt-one-shot-v1"
+SIGNATURE_UPDATE_PROMPT_VERSION = "yt-signature-update-v1"
+
+# "multi" = signature, then ideas/tips as separate calls; "one_shot" = one combined completion
+ANALYSIS_MODES = ("multi", "one_shot")
+
+# Sections of the one-shot document and the type each must have
+ONE_SHOT_SCHEMA = {
+    "signature": {"vibes": list, "topics": list, "keywords": list},
+    "video_ideas": list,
+    "growth_tips": list,
+}
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+
+FALLBACK_SIGNATURE = {
+    "vibes": ["creative", "engaging", "informative"],
+    "topics": ["entertainment", "lifestyle", "trending"],
+    "keywords": ["content", "video", "youtube", "creator"]
+}
+
+# Incremental signatures: saved per channel (in the creator store) with the hashes of
+# the titles they covered. Above this share of unseen titles the signature is recomputed.
+SIGNATURE_DRIFT_THRESHOLD = float(os.environ.get("SIGNATURE_DRIFT_THRESHOLD", 0.3))
+
+# CSV loading: columns tried in order, values treated as empty, and placeholder titles
+TITLE_CANDIDATES = ['title', 'Title', 'video_title', 'name', 'Name', 'description', 'Description']
+PLACEHOLDER_VALUES = ['nan', 'none', 'null']
+GENERIC_TITLES = ['untitled video', 'sample video', 'video']
+CSV_CHUNK_ROWS = 10_000
+TEXT_SNIFF_ROWS = 200
+
+# Titles handed to the sampling stage; loading stops once this many valid ones are found
+TITLE_LOAD_LIMIT = 10_000
+
+# Prompt budget for the representative title sample sent with signature prompts
+SIGNATURE_TITLE_TOKEN_BUDGET = 600
+
+# Request budget a signature (or one-shot) completion needs; below it the fallback is used
+SIGNATURE_MIN_S = float(os.environ.get("YT_SIGNATURE_MIN_S", 10))
+LLM_TIMEOUT_S = 60
+
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def read_video_csv(csv_path, **kwargs):
+    """Read a whole CSV in one pass, with pyarrow when installed, skipping malformed lines."""
+    engine = "pyarrow" if _HAS_PYARROW else "c"
+    return pd.read_csv(csv_path, engine=engine, on_bad_lines="skip", **kwargs)
 
 class YouTubeChannelAnalyzer:
-    def __init__(self, api_key=None):
-        """Initialize the analyzer with DeepSeek API key."""
+    def __init__(self, api_key=None, base_url=None, deadline=None):
+        """Initialize the analyzer with DeepSeek API key and the request's time budget."""
         # Use provided API key, fallback to environment variable, then hardcoded key
         if api_key:
             self.api_key = api_key
@@ -15,66 +77,134 @@ class YouTubeChannelAnalyzer:
             # Hardcoded API key - matches your original
             self.api_key = "sk-90b8397488ed4726a77af9f4b0da34f4"
         
+        # Point DEEPSEEK_BASE_URL at mock_llm_server.py to run offline
+        self.base_url = base_url or os.environ.get("DEEPSEEK_BASE_URL", DEFAULT_BASE_URL)
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url="https://api.deepseek.com"
+            base_url=self.base_url
         )
+        self.deadline = deadline or unlimited()
+        # Coverage report of the most recent title sample sent to the LLM
+        self.last_sample_coverage = None
+
+    def _llm_client(self):
+        """DeepSeek client whose timeout (and retries) fit the remaining budget"""
+        if self.deadline.budget_s is None:
+            return self.client
+        timeout = self.deadline.timeout(LLM_TIMEOUT_S)
+        retries = self.client.max_retries if self.deadline.remaining() >= 2 * timeout else 0
+        return self.client.with_options(timeout=timeout, max_retries=retries)
         
-    def load_video_data(self, csv_path):
-        """Load video data from CSV file (schema-agnostic)."""
+    def load_video_data(self, csv_path, max_titles=None):
+        """Load video titles from CSV file (schema-agnostic).
+
+        Only the header is parsed up front; the chosen title column is then
+        streamed in chunks with the C parser and reading stops as soon as
+        max_titles valid titles have been collected. Without a limit the
+        column is read in one pass with pyarrow when it is installed.
+        """
         if not Path(csv_path).exists():
             raise FileNotFoundError(f"CSV file not found: {csv_path}")
             
         try:
-            df = pd.read_csv(csv_path, on_bad_lines="skip", engine="python")
-            
-            # Clean up any whitespace in column names
-            df.columns = df.columns.str.strip()
-            text_cols = [c for c in df.columns if df[c].dtype == object]
+            # Sniff the header and map stripped names back to the raw ones for usecols
+            header = pd.read_csv(csv_path, nrows=0, engine="c", on_bad_lines="skip")
+            raw_columns = {str(c).strip(): c for c in header.columns}
             
             # Try to find title column with various possible names
-            title_candidates = ['title', 'Title', 'video_title', 'name', 'Name', 'description', 'Description']
-            titles = []
-            
-            for candidate in title_candidates:
-                if candidate in df.columns:
-                    # Get titles and clean them
-                    raw_titles = df[candidate].astype(str).dropna()
-                    titles = [t.strip() for t in raw_titles if t.strip() and t.strip().lower() not in ['nan', 'none', 'null']]
-                    print(f"✔️ Using '{candidate}' column for video titles")
-                    break
+            column = next((c for c in TITLE_CANDIDATES if c in raw_columns), None)
+            titles, valid_titles = [], []
+            if column:
+                frame, titles, valid_titles = self._stream_titles(csv_path, raw_columns[column], max_titles)
             
             # If no specific title column found, use first text column
-            if not titles and text_cols:
-                raw_titles = df[text_cols[0]].astype(str).dropna()
-                titles = [t.strip() for t in raw_titles if t.strip() and t.strip().lower() not in ['nan', 'none', 'null']]
-                print(f"✔️ Using '{text_cols[0]}' column for video titles")
+            if not titles:
+                text_cols = [c for c in self._text_columns(csv_path, raw_columns) if c != column]
+                if text_cols:
+                    column = text_cols[0]
+                    frame, titles, valid_titles = self._stream_titles(csv_path, raw_columns[column], max_titles)
             
             if not titles:
                 raise ValueError("No text columns found in CSV or all text columns are empty")
-                
-            # Filter out very short or non-meaningful titles
-            valid_titles = []
-            for title in titles:
-                # Remove common extraction artifacts
-                cleaned_title = re.sub(r'^Video \d+\s*\(extraction failed\)', '', title).strip()
-                if len(cleaned_title) > 5 and cleaned_title.lower() not in ['untitled video', 'sample video', 'video']:
-                    valid_titles.append(cleaned_title)
+            print(f"✔️ Using '{column}' column for video titles")
             
             if not valid_titles:
                 # If all titles are filtered out, use the original ones but log a warning
                 print("⚠️ All titles appear to be generic/placeholder - using original titles")
-                valid_titles = [t for t in titles if len(t.strip()) > 3]
+                valid_titles = [t for t in titles if len(t) > 3]
                 
             if not valid_titles:
                 raise ValueError("No valid video titles found in the data")
                 
             print(f"✔️ Loaded {len(valid_titles)} valid video titles from {csv_path}")
-            return df, valid_titles
+            return frame, valid_titles
             
         except Exception as e:
             raise RuntimeError(f"Error loading CSV: {str(e)}")
 
+    @staticmethod
+    def _text_columns(csv_path, raw_columns):
+        """Names of object-typed columns, judged from the first rows only."""
+        sample = pd.read_csv(csv_path, nrows=TEXT_SNIFF_ROWS, usecols=list(raw_columns.values()),
+                             engine="c", on_bad_lines="skip")
+        return [str(c).strip() for c in sample.columns
+                if pd.api.types.is_object_dtype(sample[c]) or pd.api.types.is_string_dtype(sample[c])]
+
+    def _stream_titles(self, csv_path, column, max_titles=None):
+        """Read one column in chunks, stopping early once enough valid titles are found."""
+        chunks, titles, valid = [], [], []
+        if max_titles is None and _HAS_PYARROW:
+            # No early stop possible, so a single multi-threaded pyarrow read is fastest
+            reader = [read_video_csv(csv_path, usecols=[column], dtype=str)]
+        else:
+            reader = pd.read_csv(csv_path, usecols=[column], dtype=str, engine="c",
+                                 on_bad_lines="skip", chunksize=CSV_CHUNK_ROWS)
+        for chunk in reader:
+            chunks.append(chunk)
+            chunk_titles, chunk_valid = self._clean_titles(chunk[column])
+            titles.extend(chunk_titles)
+            valid.extend(chunk_valid)
+            if max_titles is not None and len(valid) >= max_titles:
+                valid = valid[:max_titles]
+                break
+        if hasattr(reader, "close"):
+            reader.close()
+        frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=[column])
+        frame.columns = frame.columns.str.strip()
+        return frame, titles, valid
+
+    @staticmethod
+    def _clean_titles(series):
+        """Vectorized placeholder filtering: returns (non-empty titles, meaningful titles)."""
+        titles = series.dropna().astype(str).str.strip()
+        titles = titles[(titles != "") & ~titles.str.lower().isin(PLACEHOLDER_VALUES)]
+        # Remove common extraction artifacts, then drop very short or generic titles
+        cleaned = titles.str.replace(r'^Video \d+\s*\(extraction failed\)', '', regex=True).str.strip()
+        valid = cleaned[(cleaned.str.len() > 5) & ~cleaned.str.lower().isin(GENERIC_TITLES)]
+        return titles.tolist(), valid.tolist()
+
+    def load_stored_videos(self, channel_id, max_titles=None):
+        """Load a channel's video titles from the creator store."""
+        df = storage.load_videos("youtube", channel_id, limit=max_titles)
+        if df.empty:
+            raise RuntimeError(f"No stored videos for channel {channel_id}. Run scraper first.")
+        return self.load_video_frame(df, source=f"{channel_id} from the creator store")
+
+    def load_video_frame(self, df, max_titles=None, source="scraper result"):
+        """Take video titles from an in-memory DataFrame (e.g. handed over by the scraper)."""
+        if "title" not in df.columns or df.empty:
+            raise RuntimeError("No video titles found in the data")
+        if max_titles is not None:
+            df = df.head(max_titles)
+        titles, valid_titles = self._clean_titles(df["title"])
+        if not valid_titles:
+            print("⚠️ All titles appear to be generic/placeholder - using original titles")
+            valid_titles = [t for t in titles if len(t) > 3]
+        if not valid_titles:
+            raise RuntimeError("No valid video titles found in the data")
+        print(f"✔️ Loaded {len(valid_titles)} valid video titles for {source}")
+        return df, valid_titles
+
     def _parse_json(self, txt):
         """Parse JSON from API response, handling code blocks."""
         txt = re.sub(r"^```(?:json)?\s*|```$", "", txt.strip(), flags=re.DOTALL).strip()
@@ -83,16 +213,28 @@ class YouTubeChannelAnalyzer:
             raise ValueError("No valid JSON object found")
         return json.loads(txt[start:end+1])
 
+    def sample_titles(self, video_titles, max_titles=50):
+        """Cluster all titles and pick a diverse, recency-weighted sample within the token budget."""
+        sample = select_representative_titles(
+            video_titles, token_budget=SIGNATURE_TITLE_TOKEN_BUDGET, max_titles=max_titles
+        )
+        self.last_sample_coverage = sample["coverage"]
+        coverage = sample["coverage"]
+        print(f"[YOUTUBE ANALYZER] Sampled {coverage['titles_sampled']}/{coverage['titles_total']} titles "
+              f"covering {coverage['clusters_covered']}/{coverage['clusters']} clusters "
+              f"(~{coverage['estimated_tokens']} tokens)")
+        return sample["titles"]
+
     def extract_channel_signature(self, video_titles, max_titles=50):
         """Extract channel vibes, topics, and keywords from video titles."""
-        # Limit titles to avoid token limits
-        sample_titles = video_titles[:max_titles] if len(video_titles) > max_titles else video_titles
+        # Representative sample keeps the prompt size fixed regardless of channel size
+        sample_titles = self.sample_titles(video_titles, max_titles)
         
         base_prompt = textwrap.dedent(f"""
             You are an elite YouTube content analyst.
             Analyze these video titles and extract the channel's signature elements.
             
-            Video titles: {json.dumps(sample_titles[:30], indent=2)}
+            Video titles: {json.dumps(sample_titles, indent=2)}
             
             Return ONLY valid JSON with these exact keys:
             - "vibes": 3-5 descriptive words about the channel's personality/style
@@ -108,9 +250,13 @@ class YouTubeChannelAnalyzer:
         """).strip()
         
         for attempt in range(3):
+            if not self.deadline.has(SIGNATURE_MIN_S):
+                self.deadline.degrade("signature", "fallback signature instead of DeepSeek")
+                break
             try:
                 print(f"[YOUTUBE ANALYZER] Extracting channel signature (attempt {attempt + 1})...")
-                resp = self.client.chat.completions.create(
+                resp = tracked_completion(
+                    self._llm_client(), "youtube.signature", SIGNATURE_PROMPT_VERSION, retry=attempt,
                     model="deepseek-chat",
                     messages=[
                         {"role": "system", "content": "You are a YouTube analytics expert. Return exactly one JSON object and nothing else."},
@@ -131,16 +277,137 @@ class YouTubeChannelAnalyzer:
                     
             except Exception as e:
                 print(f"[YOUTUBE ANALYZER] ⚠️ Attempt {attempt + 1} failed: {str(e)}")
-                if attempt == 2:
-                    # Return fallback signature
-                    print(f"[YOUTUBE ANALYZER] Using fallback signature")
-                    return {
-                        "vibes": ["creative", "engaging", "informative"],
-                        "topics": ["entertainment", "lifestyle", "trending"],
-                        "keywords": ["content", "video", "youtube", "creator"]
-                    }
+            if attempt < 2:
                 time.sleep(1)
 
+        # Return fallback signature
+        print(f"[YOUTUBE ANALYZER] Using fallback signature")
+        record_fallback("youtube.signature")
+        return dict(FALLBACK_SIGNATURE)
+
+    def update_channel_signature(self, previous_signature, new_titles, max_titles=30):
+        """Revise an existing signature using only titles added since it was computed.
+
+        Cheaper than a full extraction: a single attempt, a short prompt and a
+        small completion. Returns None when the update cannot be trusted, so
+        the caller can fall back to a full recompute.
+        """
+        prompt = textwrap.dedent(f"""
+            Update the channel signature below using the channel's newest video titles.
+            Keep elements that still fit, replace ones the new titles contradict,
+            and add anything clearly new. Keep the same sizes: 3-5 vibes, 5-8 topics, 8-12 keywords.
+            
+            Current signature: {json.dumps(previous_signature)}
+            
+            New video titles: {json.dumps(new_titles[:max_titles], indent=2)}
+            
+            Return ONLY valid JSON with the keys "vibes", "topics" and "keywords".
+        """).strip()
+        
+        try:
+            print(f"[YOUTUBE ANALYZER] Updating channel signature with {len(new_titles)} new titles...")
+            resp = tracked_completion(
+                self._llm_client(), "youtube.signature_update", SIGNATURE_UPDATE_PROMPT_VERSION,
+                model="deepseek-chat",
+                messages=[
+                    {"role": "system", "content": "You are a YouTube analytics expert. Return exactly one JSON object and nothing else."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=500
+            )
+            result = self._parse_json(resp.choices[0].message.content)
+            if all(isinstance(result.get(key), list) and result.get(key) for key in ("vibes", "topics", "keywords")):
+                print("[YOUTUBE ANALYZER] ✔️ Updated channel signature incrementally")
+                return result
+            print("[YOUTUBE ANALYZER] ⚠️ Signature update missing keys")
+        except Exception as e:
+            print(f"[YOUTUBE ANALYZER] ⚠️ Signature update failed: {str(e)}")
+        return None
+
+    def analyze_one_shot(self, video_titles, n_ideas=10, n_tips=6, max_titles=50):
+        """Request signature, video ideas and growth tips in a single completion.
+
+        Returns only the sections that passed ONE_SHOT_SCHEMA validation; the
+        caller is expected to repair whatever is missing.
+        """
+        if not self.deadline.has(SIGNATURE_MIN_S):
+            self.deadline.degrade("one_shot", "skipped the combined request")
+            return {}
+        sample_titles = self.sample_titles(video_titles, max_titles)
+        prompt = textwrap.dedent(f"""
+            You are an elite YouTube content analyst and growth consultant.
+            Analyze these video titles and produce a complete channel report.
+
+            Video titles: {json.dumps(sample_titles, indent=2)}
+
+            Return ONLY valid JSON with these exact keys:
+            - "signature": object with "vibes" (3-5 words about personality/style),
+              "topics" (5-8 main subject areas) and "keywords" (8-12 niche-defining terms)
+            - "video_ideas": {n_ideas} specific, filmable video topic ideas, 5-15 words each
+            - "growth_tips": {n_tips} actionable growth strategies for the next 30 days, 25 words or less each
+
+            Example format:
+            {{
+                "signature": {{"vibes": ["educational"], "topics": ["science"], "keywords": ["research"]}},
+                "video_ideas": ["I tested 5 viral science myths at home"],
+                "growth_tips": ["Pin a comment asking viewers to pick the next experiment"]
+            }}
+        """).strip()
+
+        try:
+            print("[YOUTUBE ANALYZER] Requesting one-shot channel report...")
+            resp = tracked_completion(
+                self._llm_client(), "youtube.one_shot", ONE_SHOT_PROMPT_VERSION,
+                model="deepseek-chat",
+                messages=[
+                    {"role": "system", "content": "You are a YouTube analytics expert. Return exactly one JSON object and nothing else."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+                max_tokens=2000
+            )
+            doc = self._parse_json(resp.choices[0].message.content)
+        except Exception as e:
+            print(f"[YOUTUBE ANALYZER] ⚠️ One-shot request failed: {str(e)}")
+            return {}
+
+        sections = self._validate_one_shot(doc)
+        if "video_ideas" in sections:
+            sections["video_ideas"] = self._as_bullets(sections["video_ideas"])[:n_ideas]
+        if "growth_tips" in sections:
+            sections["growth_tips"] = self._as_bullets(sections["growth_tips"])[:n_tips]
+        print(f"[YOUTUBE ANALYZER] ✔️ One-shot report returned sections: {', '.join(sections) or 'none'}")
+        return sections
+
+    @staticmethod
+    def _validate_one_shot(doc):
+        """Keep the sections of a one-shot document that match ONE_SHOT_SCHEMA."""
+        if not isinstance(doc, dict):
+            return {}
+        valid = {}
+        for section, spec in ONE_SHOT_SCHEMA.items():
+            value = doc.get(section)
+            if isinstance(spec, dict):
+                if isinstance(value, dict) and all(
+                    isinstance(value.get(key), kind) and value.get(key) for key, kind in spec.items()
+                ):
+                    valid[section] = {key: [str(v) for v in value[key]] for key in spec}
+            elif isinstance(value, spec) and value and all(isinstance(v, str) for v in value):
+                valid[section] = value
+        return valid
+
+    @staticmethod
+    def _as_bullets(lines):
+        """Normalize list items to the '• ' bullet format the multi-call path produces."""
+        bullets = []
+        for line in lines:
+            # JSON list items carry no numbering, so only strip stray bullet characters
+            clean_line = "• " + re.sub(r"^[\-•*\s]+", "", line.strip())
+            if clean_line != "•" and len(clean_line) > 3:
+                bullets.append(clean_line)
+        return bullets
+
     def generate_video_ideas(self, topics, vibes, n=10):
         """Generate video topic ideas based on channel signature."""
         prompt = f"""
@@ -159,7 +426,8 @@ Format as a simple bulleted list with no extra commentary.
         
         try:
             print(f"[YOUTUBE ANALYZER] Generating {n} video ideas...")
-            resp = self.client.chat.completions.create(
+            resp = tracked_completion(
+                self._llm_client(), "youtube.ideas", IDEAS_PROMPT_VERSION,
                 model="deepseek-chat",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.8,
@@ -181,12 +449,16 @@ Format as a simple bulleted list with no extra commentary.
             
         except Exception as e:
             print(f"[YOUTUBE ANALYZER] ⚠️ Error generating video ideas: {str(e)}")
-            # Return fallback ideas based on topics
-            fallback_ideas = []
-            for i, topic in enumerate(topics[:5]):
-                fallback_ideas.append(f"• How to master {topic} in 2025")
-                fallback_ideas.append(f"• {topic} tips everyone should know")
-            return fallback_ideas[:n]
+            record_fallback("youtube.ideas")
+            return self.fallback_video_ideas(topics, n)
+
+    def fallback_video_ideas(self, topics, n=10):
+        """Canned video ideas built from the channel topics."""
+        fallback_ideas = []
+        for i, topic in enumerate(topics[:5]):
+            fallback_ideas.append(f"• How to master {topic} in 2025")
+            fallback_ideas.append(f"• {topic} tips everyone should know")
+        return fallback_ideas[:n]
 
     def generate_growth_tips(self, topics, vibes, steps=5):
         """Generate actionable growth tips for the channel."""
@@ -208,7 +480,8 @@ Format as bulleted list, no fluff or explanations.
         
         try:
             print(f"[YOUTUBE ANALYZER] Generating {steps} growth tips...")
-            resp = self.client.chat.completions.create(
+            resp = tracked_completion(
+                self._llm_client(), "youtube.growth_tips", GROWTH_TIPS_PROMPT_VERSION,
                 model="deepseek-chat",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.6,
@@ -229,54 +502,226 @@ Format as bulleted list, no fluff or explanations.
             
         except Exception as e:
             print(f"[YOUTUBE ANALYZER] ⚠️ Error generating growth tips: {str(e)}")
-            # Return fallback tips
-            return [
-                "• Optimize thumbnails with bold text and bright colors",
-                "• Upload consistently on the same days each week", 
-                "• Engage with comments within first 2 hours of posting",
-                "• Create series or playlists around your main topics",
-                "• Collaborate with creators in similar niches"
-            ]
-
-def run_youtube_analysis(csv_path):
-    """Main analysis function called by Flask app or scraper"""
+            record_fallback("youtube.growth_tips")
+            return self.fallback_growth_tips(steps)
+
+    def fallback_growth_tips(self, steps=5):
+        """Generic growth tips used when the LLM is unavailable."""
+        return [
+            "• Optimize thumbnails with bold text and bright colors",
+            "• Upload consistently on the same days each week", 
+            "• Engage with comments within first 2 hours of posting",
+            "• Create series or playlists around your main topics",
+            "• Collaborate with creators in similar niches"
+        ][:steps]
+
+# Generation steps that depend only on the channel signature. run_youtube_analysis
+# fans them out concurrently; each maps name -> (runner, fallback), both called
+# with (analyzer, channel_sig).
+POST_SIGNATURE_STEPS = {
+    "video_ideas": (
+        lambda analyzer, sig: analyzer.generate_video_ideas(sig["topics"], sig["vibes"], n=10),
+        lambda analyzer, sig: analyzer.fallback_video_ideas(sig["topics"], n=10),
+    ),
+    "growth_tips": (
+        lambda analyzer, sig: analyzer.generate_growth_tips(sig["topics"], sig["vibes"], steps=6),
+        lambda analyzer, sig: analyzer.fallback_growth_tips(steps=6),
+    ),
+}
+
+# Shared wall-clock budget for all post-signature steps together
+POST_SIGNATURE_DEADLINE_S = float(os.environ.get("YT_POST_SIGNATURE_DEADLINE_S", 45))
+
+def register_post_signature_step(name, runner, fallback):
+    """Plug another signature-dependent step into run_youtube_analysis"""
+    POST_SIGNATURE_STEPS[name] = (runner, fallback)
+
+def run_post_signature_steps(analyzer, channel_sig, steps=None, deadline_s=None):
+    """Run all signature-dependent steps concurrently under one deadline.
+
+    The deadline is POST_SIGNATURE_DEADLINE_S, cut to what is left of the
+    analyzer's request budget. A step that raises or misses it gets its
+    fallback output instead.
+    """
+    steps = POST_SIGNATURE_STEPS if steps is None else steps
+    if deadline_s is None:
+        deadline_s = min(POST_SIGNATURE_DEADLINE_S, analyzer.deadline.remaining())
+    if not steps:
+        return {}
+    if deadline_s <= 0:
+        # The request budget is spent: do not start calls that would only be abandoned
+        results = {}
+        for name, (_, fallback) in steps.items():
+            analyzer.deadline.degrade(name, "fallback, no budget left")
+            record_fallback(f"youtube.{name}")
+            results[name] = fallback(analyzer, channel_sig)
+        return results
+
+    executor = ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="yt-post-sig")
+    # Each task gets its own context copy so llm_metrics keeps the creator attribution
+    futures = {
+        executor.submit(contextvars.copy_context().run, runner, analyzer, channel_sig): name
+        for name, (runner, _) in steps.items()
+    }
+    done, _ = wait(futures, timeout=deadline_s)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for future, name in futures.items():
+        error = None
+        if future not in done:
+            error = f"missed {deadline_s:.0f}s deadline"
+            analyzer.deadline.degrade(name, f"fallback after the {deadline_s:.0f}s step deadline")
+        elif future.exception() is not None:
+            error = str(future.exception())
+        if error is None:
+            results[name] = future.result()
+            continue
+        print(f"[YOUTUBE ANALYZER] ⚠️ Step '{name}' {error} - using fallback")
+        record_fallback(f"youtube.{name}")
+        results[name] = steps[name][1](analyzer, channel_sig)
+    return results
+
+def title_hash(title):
+    """Stable short hash of a normalized title"""
+    normalized = re.sub(r"\s+", " ", title.strip().lower())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+def load_signature_state(channel_id):
+    """Previously saved signature and title hashes for a channel, or None"""
     try:
-        print(f"[YOUTUBE ANALYZER] Starting comprehensive analysis for CSV: {csv_path}")
+        return storage.load_signature("youtube", channel_id)
+    except Exception as e:
+        print(f"[YOUTUBE ANALYZER] ⚠️ Could not read saved signature for {channel_id}: {e}")
+        return None
+
+def save_signature_state(channel_id, signature, title_hashes, baseline_hashes):
+    storage.save_signature("youtube", channel_id, signature, title_hashes, baseline_hashes)
+
+def resolve_channel_signature(analyzer, titles, channel_id=None):
+    """Reuse, incrementally update or fully recompute a channel signature.
+
+    Returns (signature, strategy) where strategy is "cached", "incremental" or "full".
+    Drift is cumulative: the share of current titles that were not part of the last
+    full recompute, so many small incremental updates still end in a recompute.
+    """
+    hashes = {title_hash(t) for t in titles}
+    state = load_signature_state(channel_id) if channel_id else None
+
+    if state:
+        known = set(state.get("title_hashes", []))
+        baseline = set(state.get("baseline_hashes", known))
+        new_titles = [t for t in titles if title_hash(t) not in known]
+        drift = len(hashes - baseline) / len(hashes) if hashes else 0.0
+        if not new_titles and drift <= SIGNATURE_DRIFT_THRESHOLD:
+            print("[YOUTUBE ANALYZER] ♻️ No new titles since last run - reusing saved signature")
+            return state["signature"], "cached"
+        if drift <= SIGNATURE_DRIFT_THRESHOLD:
+            updated = analyzer.update_channel_signature(state["signature"], new_titles)
+            if updated:
+                save_signature_state(channel_id, updated, known | hashes, baseline)
+                return updated, "incremental"
+        else:
+            print(f"[YOUTUBE ANALYZER] Drift {drift:.0%} above {SIGNATURE_DRIFT_THRESHOLD:.0%} - full recompute")
+
+    signature = analyzer.extract_channel_signature(titles)
+    if channel_id and signature != FALLBACK_SIGNATURE:
+        save_signature_state(channel_id, signature, hashes, hashes)
+    return signature, "full"
+
+def run_one_shot_analysis(analyzer, titles):
+    """One combined completion, then repair only the sections that came back invalid."""
+    sections = analyzer.analyze_one_shot(titles)
+    repaired = []
+
+    channel_sig = sections.pop("signature", None)
+    if channel_sig is None:
+        repaired.append("signature")
+        channel_sig = analyzer.extract_channel_signature(titles)
+
+    missing_steps = {name: step for name, step in POST_SIGNATURE_STEPS.items() if name not in sections}
+    if missing_steps:
+        print(f"[YOUTUBE ANALYZER] 🔧 Repairing one-shot sections: {', '.join(missing_steps)}")
+        repaired.extend(missing_steps)
+        sections.update(run_post_signature_steps(analyzer, channel_sig, steps=missing_steps))
+    return channel_sig, sections, repaired
+
+def channel_id_from_csv(csv_name):
+    """Channel id of an exported {channel_id}_youtube_videos.csv, None for any other file name."""
+    stem = Path(csv_name).stem
+    if stem.endswith("_youtube_videos") and len(stem) > len("_youtube_videos"):
+        return stem[:-len("_youtube_videos")]
+    return None
+
+def run_youtube_analysis(csv_path=None, mode="multi", channel_id=None, videos=None, deadline=None):
+    """Main analysis function called by Flask app or scraper.
+
+    Uses the scraper's in-memory ``videos`` DataFrame when given, then an
+    uploaded/exported CSV at csv_path, otherwise the channel's videos from
+    the creator store. LLM stages degrade as ``deadline`` runs out; the
+    result lists which did.
+    """
+    deadline = deadline or unlimited()
+    stem = Path(csv_path).stem if csv_path else channel_id
+    if channel_id is None and csv_path:
+        channel_id = channel_id_from_csv(csv_path)
+    with creator_scope(f"youtube:{channel_id or stem}"):
+        result = _run_youtube_analysis(csv_path, mode, channel_id, videos, deadline)
+    result["degraded"] = deadline.degraded
+    return result
+
+def _run_youtube_analysis(csv_path=None, mode="multi", channel_id=None, videos=None, deadline=None):
+    try:
+        if mode not in ANALYSIS_MODES:
+            return {"error": f"Unknown analysis mode '{mode}'. Use one of: {', '.join(ANALYSIS_MODES)}"}
+        if videos is None and not csv_path and not channel_id:
+            return {"error": "Either a CSV file or a channel id is required."}
+
+        if videos is not None:
+            source = f"scraper result ({channel_id or 'unknown channel'})"
+        else:
+            source = csv_path or f"creator store ({channel_id})"
+        print(f"[YOUTUBE ANALYZER] Starting comprehensive analysis for: {source}")
         
-        if not os.path.exists(csv_path):
+        if videos is None and csv_path and not os.path.exists(csv_path):
             return {"error": f"CSV file {csv_path} not found."}
         
         # Initialize analyzer
-        analyzer = YouTubeChannelAnalyzer()
+        analyzer = YouTubeChannelAnalyzer(deadline=deadline)
         
         # Load and validate data
         print("[YOUTUBE ANALYZER] 📁 Loading video data...")
-        df, titles = analyzer.load_video_data(csv_path)
+        if videos is not None:
+            df, titles = analyzer.load_video_frame(videos, max_titles=TITLE_LOAD_LIMIT, source=source)
+        elif csv_path:
+            df, titles = analyzer.load_video_data(csv_path, max_titles=TITLE_LOAD_LIMIT)
+        else:
+            df, titles = analyzer.load_stored_videos(channel_id, max_titles=TITLE_LOAD_LIMIT)
         
         if not titles:
-            return {"error": "No valid video titles found in CSV file."}
+            return {"error": f"No valid video titles found in {source}."}
         
         print(f"[YOUTUBE ANALYZER] Loaded {len(titles)} video titles for analysis")
         
-        # Extract channel signature
-        print("[YOUTUBE ANALYZER] 🎭 Extracting channel signature...")
-        channel_sig = analyzer.extract_channel_signature(titles)
-        
-        # Generate video ideas
-        print("[YOUTUBE ANALYZER] 🎬 Generating video ideas...")
-        video_ideas = analyzer.generate_video_ideas(
-            channel_sig["topics"], 
-            channel_sig["vibes"],
-            n=10
-        )
-        
-        # Generate growth tips
-        print("[YOUTUBE ANALYZER] 🚀 Generating growth tips...")
-        growth_tips = analyzer.generate_growth_tips(
-            channel_sig["topics"], 
-            channel_sig["vibes"],
-            steps=6
-        )
+        repaired = []
+        if mode == "one_shot":
+            print("[YOUTUBE ANALYZER] ⚡ One-shot mode: signature, ideas and tips in one request...")
+            channel_sig, step_results, repaired = run_one_shot_analysis(analyzer, titles)
+            signature_strategy = "full"
+            if channel_id and channel_sig != FALLBACK_SIGNATURE:
+                # A one-shot signature is a full recompute: it is its own drift baseline
+                hashes = {title_hash(t) for t in titles}
+                save_signature_state(channel_id, channel_sig, hashes, hashes)
+        else:
+            # Extract channel signature, reusing the previous one when only a few titles changed
+            print("[YOUTUBE ANALYZER] 🎭 Extracting channel signature...")
+            channel_sig, signature_strategy = resolve_channel_signature(analyzer, titles, channel_id)
+            
+            # Generate video ideas, growth tips and any other signature-dependent steps in parallel
+            print(f"[YOUTUBE ANALYZER] 🎬 Running {', '.join(POST_SIGNATURE_STEPS)} in parallel...")
+            step_results = run_post_signature_steps(analyzer, channel_sig)
+        video_ideas = step_results.pop("video_ideas", [])
+        growth_tips = step_results.pop("growth_tips", [])
         
         print(f"[YOUTUBE ANALYZER] ✅ Analysis complete!")
         print(f"[YOUTUBE ANALYZER] - Channel vibes: {len(channel_sig['vibes'])}")
@@ -290,7 +735,12 @@ def run_youtube_analysis(csv_path):
             "video_ideas": video_ideas,
             "growth_tips": growth_tips,
             "video_count": len(titles),
-            "csv_file": os.path.basename(csv_path)
+            "csv_file": os.path.basename(csv_path) if csv_path and videos is None else None,
+            "mode": mode,
+            "repaired_sections": repaired,
+            "signature_strategy": signature_strategy,
+            "sample_coverage": analyzer.last_sample_coverage,
+            **step_results
         }
         
     except Exception as e:
@@ -302,12 +752,12 @@ def run_youtube_analysis(csv_path):
 def analyze_from_scraper_result(scraper_result):
     """Analyze data directly from scraper result object - enhanced integration"""
     try:
-        csv_path = scraper_result.get("csv_path")
-        if not csv_path:
-            return {"error": "No CSV path provided in scraper result"}
+        channel_id = scraper_result.get("channel_id")
+        if not channel_id:
+            return {"error": "No channel id provided in scraper result"}
         
         print(f"[YOUTUBE ANALYZER] Analyzing data from scraper result...")
-        analysis_result = run_youtube_analysis(csv_path)
+        analysis_result = run_youtube_analysis(channel_id=channel_id, videos=scraper_result.get("videos"))
         
         if "error" in analysis_result:
             return analysis_result
@@ -325,10 +775,10 @@ def analyze_from_scraper_result(scraper_result):
             "signature": analysis_result.get("signature", {}),
             "video_ideas": analysis_result.get("video_ideas", []),
             "growth_tips": analysis_result.get("growth_tips", []),
-            "csv_file": scraper_result.get("csv_file"),
+            "run_id": scraper_result.get("run_id"),
             "analysis_metadata": {
                 "analyzed_videos": analysis_result.get("video_count", 0),
-                "csv_source": analysis_result.get("csv_file")
+                "signature_strategy": analysis_result.get("signature_strategy")
             }
         }
         
@@ -345,12 +795,12 @@ def full_channel_analysis(channel_id):
         # Import and run scraper
         try:
             import importlib.util
-            spec = importlib.util.spec_from_file_location("scraper_yt", "scraper-yt.py")
+            spec = importlib.util.spec_from_file_location("scraper_yt", "scraper_yt.py")
             scraper_yt = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(scraper_yt)
             scrape_youtube_channel = scraper_yt.scrape_youtube_channel
         except ImportError:
-            return {"error": "YouTube scraper not available. Please ensure scraper-yt.py is in the current directory."}
+            return {"error": "YouTube scraper not available. Please ensure scraper_yt.py is in the current directory."}
         
         # Step 1: Scrape
         print("[YOUTUBE ANALYZER] Step 1: Scraping channel data...")
@@ -376,7 +826,10 @@ def analyze_channel(csv_path, image_path=None):
     print("🚀 Starting YouTube Channel Analysis...")
     
     # Load data
-    df, titles = analyzer.load_video_data(csv_path)
+    _, titles = analyzer.load_video_data(csv_path)
+    # load_video_data only reads the title column; legacy callers get every column under 'data'
+    df = read_video_csv(csv_path)
+    df.columns = df.columns.str.strip()
     
     # Extract channel signature
     print("\n🔍 Analyzing channel signature...")